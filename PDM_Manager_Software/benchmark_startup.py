@@ -0,0 +1,94 @@
+"""
+Startup benchmark for PDM Manager
+Measures time from process launch to the first drawn frame for main.py and,
+if built, the PyInstaller --onefile executable
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_EXE = os.path.join(SCRIPT_DIR, "dist", "PDM_Manager.exe" if os.name == "nt" else "PDM_Manager")
+DEFAULT_HISTORY = os.path.join(SCRIPT_DIR, "startup_history.json")
+
+
+def time_first_frame(cmd, timeout=60.0):
+    """Launch cmd once and return seconds until it reports its first frame"""
+    fd, marker_path = tempfile.mkstemp(prefix="pdm_first_frame_")
+    os.close(fd)
+    os.remove(marker_path)
+    env = dict(os.environ, PDM_STARTUP_BENCHMARK=marker_path)
+
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, env=env, cwd=SCRIPT_DIR)
+    try:
+        while time.perf_counter() - start < timeout:
+            if os.path.exists(marker_path):
+                return time.perf_counter() - start
+            if process.poll() is not None:
+                raise RuntimeError(f"{cmd[0]} exited with code {process.returncode} before drawing")
+            time.sleep(0.005)
+        raise RuntimeError(f"{cmd[0]} did not draw a frame within {timeout:.0f} s")
+    finally:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        if os.path.exists(marker_path):
+            os.remove(marker_path)
+
+
+def benchmark(name, cmd, runs):
+    """Time several launches and return a result record"""
+    times = [time_first_frame(cmd) for _ in range(runs)]
+    return {
+        "target": name,
+        "runs": runs,
+        "min_s": round(min(times), 3),
+        "median_s": round(statistics.median(times), 3),
+        "max_s": round(max(times), 3),
+        "timestamp": time.time()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure PDM Manager time-to-first-frame")
+    parser.add_argument("--runs", type=int, default=5, help="launches per target (default 5)")
+    parser.add_argument("--exe", default=DEFAULT_EXE, help="path of the --onefile build")
+    parser.add_argument("--history", default=DEFAULT_HISTORY,
+                        help="JSON file the results are appended to")
+    parser.add_argument("--no-history", action="store_true", help="do not record results")
+    args = parser.parse_args()
+
+    targets = [("main.py", [sys.executable, os.path.join(SCRIPT_DIR, "main.py")])]
+    if os.path.exists(args.exe):
+        targets.append(("onefile", [args.exe]))
+    else:
+        print(f"Skipping onefile build: {args.exe} not found (run build_installer.py)")
+
+    results = []
+    for name, cmd in targets:
+        result = benchmark(name, cmd, args.runs)
+        results.append(result)
+        print(f"{name:10s} first frame: median {result['median_s']:.3f} s "
+              f"(min {result['min_s']:.3f}, max {result['max_s']:.3f}, {args.runs} runs)")
+
+    if not args.no_history:
+        try:
+            with open(args.history, "r") as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            history = []
+        history.extend(results)
+        with open(args.history, "w") as f:
+            json.dump(history, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+PT Motorsport PDM command line client
+Headless counterpart of main.py: no Tk, JSON output
+
+Examples:
+    pdm.py status COM3 COM4
+    pdm.py apply profile.json COM3
+    pdm.py record COM3 --duration 60 --output run.jsonl
+    pdm.py flash firmware.hex COM3 COM4 COM5
+"""
+
+import sys
+import os
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from pdm_cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Bus Load Module
+CAN bus utilisation per ID and in total, measured from recorded traces or
+projected from planned message rates, at each CANSPEED setting
+
+Frame lengths count every bit on the wire: SOF to CRC with stuff bits
+(worked out from the actual ID and payload), the CRC/ACK delimiters, EOF
+and the 3-bit interframe space. Frames whose payload is not known (planned
+messages) are counted with worst-case stuffing.
+"""
+
+import functools
+from typing import Dict, Iterable, Optional, Tuple
+
+import pdm_can
+
+BITRATES_KBPS = (125, 250, 500, 1000)  # CANSPEED settings
+
+# CRC delimiter, ACK slot, ACK delimiter, 7-bit EOF, 3-bit interframe space
+TRAILER_BITS = 13
+
+# The PDM's own schedule (main.ino / CANHandler.cpp), in Hz
+PDM_TELEMETRY_HZ = 4.0      # TELRATE default
+PDM_DIAGNOSTICS_HZ = 1.0    # Extended telemetry diagnostics frame
+TELEMETRY_MODES = ("legacy", "extended", "both")  # TELMODE
+PDM_LED_HZ = 10.0
+KEYPAD_HEARTBEAT_HZ = 2.0   # 500 ms, set by the PDM's SDO write to 0x1017
+
+
+def _bits(value: int, count: int):
+    return [(value >> i) & 1 for i in range(count - 1, -1, -1)]
+
+
+def _crc15(bits) -> int:
+    crc = 0
+    for bit in bits:
+        feedback = bit ^ ((crc >> 14) & 1)
+        crc = (crc << 1) & 0x7FFF
+        if feedback:
+            crc ^= 0x4599
+    return crc
+
+
+def _stuff_bits(bits) -> int:
+    """Stuff bits a transmitter inserts into bits (a stuff bit starts the next run)"""
+    count = 0
+    run = 0
+    last = None
+    for bit in bits:
+        if bit == last:
+            run += 1
+        else:
+            last, run = bit, 1
+        if run == 5:
+            count += 1
+            last, run = 1 - bit, 1
+    return count
+
+
+@functools.lru_cache(maxsize=65536)
+def frame_bits(can_id: int, data: bytes, extended: Optional[bool] = None) -> int:
+    """On-wire length in bits of a data frame, including stuff bits and interframe space"""
+    if extended is None:
+        extended = can_id > 0x7FF
+    dlc = len(data)
+    if extended:
+        head = ([0] + _bits(can_id >> 18, 11) + [1, 1] + _bits(can_id & 0x3FFFF, 18) +
+                [0, 0, 0] + _bits(dlc, 4))
+    else:
+        head = [0] + _bits(can_id, 11) + [0, 0, 0] + _bits(dlc, 4)
+    body = head + _bits(int.from_bytes(data, "big"), 8 * dlc) if dlc else head
+    stuffed = body + _bits(_crc15(body), 15)
+    return len(stuffed) + _stuff_bits(stuffed) + TRAILER_BITS
+
+
+def worst_case_bits(dlc: int, extended: bool = False) -> int:
+    """Longest possible frame for a DLC (maximum stuffing)"""
+    stuffed = (54 if extended else 34) + 8 * dlc
+    return stuffed + (stuffed - 1) // 4 + TRAILER_BITS
+
+
+def load_pct(bits_per_s: float) -> Dict[int, float]:
+    """Utilisation in percent at each CANSPEED setting"""
+    return {kbps: round(100.0 * bits_per_s / (kbps * 1000), 2) for kbps in BITRATES_KBPS}
+
+
+def message_name(can_id: int) -> str:
+    kind, node = pdm_can.classify(can_id)
+    return f"{kind} 0x{node:02X}" if kind not in ("other", "nmt") else kind
+
+
+# -----------------------------------------------------------------------------
+# Message tables: {can_id: {"name", "rate", "bits", "dlc"}}, rate in Hz and
+# bits per frame (average measured, or worst case when planned)
+
+def measure(frames: Iterable, duration: Optional[float] = None) -> Tuple[Dict[int, Dict], float]:
+    """
+    Per-ID message table from traced frames (anything with t, id and data)
+
+    Returns:
+        The table and the traced duration in seconds
+    """
+    table: Dict[int, Dict] = {}
+    first = last = None
+    for frame in frames:
+        entry = table.get(frame.id)
+        if entry is None:
+            entry = table[frame.id] = {"name": message_name(frame.id), "count": 0, "total_bits": 0,
+                                       "max_bits": 0, "dlc": len(frame.data)}
+        bits = frame_bits(frame.id, bytes(frame.data))
+        entry["count"] += 1
+        entry["total_bits"] += bits
+        entry["max_bits"] = max(entry["max_bits"], bits)
+        first = frame.t if first is None else first
+        last = frame.t
+
+    if duration is None:
+        duration = (last - first) if first is not None else 0.0
+    duration = max(duration, 1e-6)
+    for entry in table.values():
+        entry["rate"] = entry["count"] / duration
+        entry["bits"] = entry["total_bits"] / entry["count"]
+    return table, duration
+
+
+def pdm_schedule(pdm_node: int = pdm_can.DEFAULT_NODE_ID, keypad_node: int = pdm_can.DEFAULT_NODE_ID,
+                 telemetry_hz: float = PDM_TELEMETRY_HZ, led_hz: float = PDM_LED_HZ,
+                 blinking: bool = False, telemetry_mode: str = "legacy") -> Dict[int, Dict]:
+    """
+    Message table for the PDM and its keypad as the firmware schedules them
+
+    telemetry_mode is the TELMODE setting: extended telemetry is a currents
+    and a states frame every period plus a diagnostics frame once a second.
+    """
+    table = {
+        pdm_can.cob_id("led", keypad_node): ("led", led_hz, 8),
+        pdm_can.cob_id("heartbeat", keypad_node): ("heartbeat", KEYPAD_HEARTBEAT_HZ, 1)
+    }
+    if telemetry_mode != "extended":
+        table[pdm_can.cob_id("telemetry", pdm_node)] = ("telemetry", telemetry_hz, 8)
+    if telemetry_mode != "legacy":
+        table[pdm_can.cob_id("telemetry_ext", pdm_node)] = (
+            "telemetry_ext", 2 * telemetry_hz + min(telemetry_hz, PDM_DIAGNOSTICS_HZ), 8)
+    if blinking:
+        table[pdm_can.cob_id("led_blink", keypad_node)] = ("led_blink", led_hz, 8)
+    return {can_id: planned(can_id, rate, dlc) for can_id, (_, rate, dlc) in table.items()}
+
+
+def planned(can_id: int, rate: float, dlc: int) -> Dict:
+    """Table entry for a planned message, assuming worst-case stuffing"""
+    return {"name": message_name(can_id), "rate": rate, "bits": worst_case_bits(dlc, can_id > 0x7FF),
+            "dlc": dlc}
+
+
+def project(table: Dict[int, Dict], rates: Optional[Dict[int, float]] = None,
+            added: Optional[Dict[int, Tuple[float, int]]] = None) -> Dict[int, Dict]:
+    """
+    Apply planned changes to a message table
+
+    Args:
+        table: Measured or scheduled messages
+        rates: New rate (Hz) per existing ID; 0 removes the message
+        added: New messages as {can_id: (rate, dlc)}
+    """
+    result = {can_id: dict(entry) for can_id, entry in table.items()}
+    for can_id, rate in (rates or {}).items():
+        if can_id in result:
+            result[can_id]["rate"] = rate
+        else:
+            result[can_id] = planned(can_id, rate, 8)
+    for can_id, (rate, dlc) in (added or {}).items():
+        result[can_id] = planned(can_id, rate, dlc)
+    return {can_id: entry for can_id, entry in result.items() if entry["rate"] > 0}
+
+
+def report(table: Dict[int, Dict]) -> Dict:
+    """Per-ID and total bits per second and utilisation at each bitrate"""
+    messages = {}
+    total = 0.0
+    for can_id in sorted(table):
+        entry = table[can_id]
+        bits_per_s = entry["rate"] * entry["bits"]
+        total += bits_per_s
+        messages[f"0x{can_id:03X}"] = {
+            "name": entry["name"],
+            "rate_hz": round(entry["rate"], 3),
+            "bits": round(entry["bits"], 1),
+            "bits_per_s": round(bits_per_s, 1),
+            "load_pct": load_pct(bits_per_s)
+        }
+    return {"messages": messages, "bits_per_s": round(total, 1), "load_pct": load_pct(total)}
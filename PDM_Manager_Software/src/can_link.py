@@ -0,0 +1,213 @@
+"""
+CAN Link Module
+Live ingest of PDM frames from a Linux SocketCAN interface
+
+On the car the USB port is usually not attached but a CAN interface is.
+PDMCommunication.connect() accepts a SocketCAN interface name (can0, vcan0)
+in place of a serial port; the PDM's telemetry (legacy and extended), keypad
+PDO and keypad heartbeat frames are then decoded into the same device state
+and event topics as the serial link, so the GUI, recorder and servers work
+unchanged. Commands need the serial link and return None.
+
+Once extended telemetry (TELMODE EXTENDED|BOTH) is seen, the coarser legacy
+frame is ignored so the two don't overwrite each other's values. The PDM
+sends both in the same telemetry period, so a few legacy frames in a row
+with no extended frame between them mean TELMODE LEGACY: legacy frames are
+applied again from then on.
+
+Kernel-side CAN_RAW filters pass only those frames, so other ECUs' traffic
+never reaches Python: even on a fully loaded 1 Mbit/s bus the reader wakes
+once per PDM frame, and each frame costs a dict lookup and a few byte reads.
+
+Test without hardware on a virtual bus:
+    sudo ip link add dev vcan0 type vcan && sudo ip link set up vcan0
+    cansend vcan0 395#05001A001F20D430
+"""
+
+import os
+import socket
+import struct
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import pdm_can
+
+# struct can_frame: id, dlc, 3 pad bytes, 8 data bytes
+CAN_FRAME = struct.Struct("=IB3x8s")
+CAN_FILTER = struct.Struct("=II")
+CAN_EFF_FLAG = 0x80000000
+CAN_RTR_FLAG = 0x40000000
+CAN_ERR_FLAG = 0x20000000
+CAN_SFF_MASK = 0x7FF
+ARPHRD_CAN = 280
+
+RECEIVE_BUFFER = 1024 * 1024   # Absorbs bursts while the reader is descheduled
+HEARTBEAT_TIMEOUT = 1.5        # Seconds, as the firmware's keypad watchdog
+EXTENDED_LAPSE = 3             # Legacy frames without an extended one before falling back
+
+
+def can_interfaces() -> List[str]:
+    """Names of the SocketCAN interfaces on this machine (empty off Linux)"""
+    try:
+        names = os.listdir("/sys/class/net")
+    except OSError:
+        return []
+    return sorted(name for name in names if is_can_interface(name))
+
+
+def is_can_interface(name: str) -> bool:
+    if not name or "/" in name or not hasattr(socket, "AF_CAN"):
+        return False
+    try:
+        with open(f"/sys/class/net/{name}/type") as f:
+            return int(f.read().strip()) == ARPHRD_CAN
+    except (OSError, ValueError):
+        return False
+
+
+class CANLink:
+    """Reads PDM frames from one interface and applies them as status updates"""
+
+    def __init__(self, interface: str, emit_status: Callable[[str, object], None], metrics,
+                 pdm_node: int = pdm_can.DEFAULT_NODE_ID, keypad_node: int = pdm_can.DEFAULT_NODE_ID):
+        self.interface = interface
+        self.emit_status = emit_status
+        self.metrics = metrics
+        self.handlers: Dict[int, Callable[[bytes], None]] = {
+            pdm_can.cob_id("telemetry", pdm_node): self._on_telemetry,
+            pdm_can.cob_id("telemetry_ext", pdm_node): self._on_telemetry_ext,
+            pdm_can.cob_id("keypad_pdo", keypad_node): self._on_keypad_pdo,
+            pdm_can.cob_id("heartbeat", keypad_node): self._on_heartbeat
+        }
+        self.sock: Optional[socket.socket] = None
+        self.frames = 0
+        self._last: Dict[str, object] = {}  # Last value emitted per field
+        self._last_heartbeat = 0.0
+        self._extended = False
+        self._legacy_skipped = 0  # Legacy frames since the last extended frame
+        self._counter: Optional[int] = None  # Last extended telemetry counter
+
+    def open(self):
+        """Open and bind the socket with kernel filters for the PDM's frames"""
+        sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        try:
+            filters = b"".join(CAN_FILTER.pack(can_id, CAN_SFF_MASK | CAN_EFF_FLAG | CAN_RTR_FLAG)
+                               for can_id in self.handlers)
+            sock.setsockopt(socket.SOL_CAN_RAW, socket.CAN_RAW_FILTER, filters)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+            sock.bind((self.interface,))
+            sock.settimeout(0.5)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def run(self, running: Callable[[], bool]):
+        """Reader thread body: receive and apply frames until running() is False"""
+        buffer = bytearray(CAN_FRAME.size)
+        handlers = self.handlers
+        metrics = self.metrics
+        while running() and self.sock:
+            try:
+                size = self.sock.recv_into(buffer)
+            except socket.timeout:
+                self._check_heartbeat()
+                continue
+            except OSError as e:
+                if running():
+                    metrics.count("read_errors")
+                    print(f"CAN read error: {e}", file=sys.stderr)
+                break
+            if size < CAN_FRAME.size:
+                continue
+            start = time.perf_counter()
+            metrics.received(size)
+            can_id, dlc, data = CAN_FRAME.unpack(buffer)
+            handler = handlers.get(can_id & (CAN_SFF_MASK | CAN_EFF_FLAG))
+            if handler:
+                self.frames += 1
+                handler(data[:dlc])
+            self._check_heartbeat()
+            metrics.line_handled(time.perf_counter() - start)
+
+    # -------------------------------------------------------------------------
+    # Frame handlers
+
+    def _emit_changed(self, key: str, update_type: str, data):
+        if self._last.get(key) != data:
+            self._last[key] = data
+            self.emit_status(update_type, data)
+
+    def _on_telemetry(self, data: bytes):
+        if self._extended:
+            self._legacy_skipped += 1
+            if self._legacy_skipped < EXTENDED_LAPSE:
+                return
+            self._extended = False  # Extended telemetry stopped (TELMODE LEGACY)
+            self._counter = None
+        telemetry = pdm_can.decode_telemetry(data)
+        if telemetry is None:
+            self.metrics.parse_failure("can_telemetry")
+            return
+        for ch in range(4):
+            self._emit_changed(f"ch{ch}", "channel_status", {
+                "channel": ch,
+                "current": telemetry["currents"][ch],
+                "faults": telemetry["faults"][ch]
+            })
+        self._emit_changed("temperature", "temperature", telemetry["temperature"])
+        self._emit_changed("battery_voltage", "battery_voltage", telemetry["battery_voltage"])
+
+    def _on_telemetry_ext(self, data: bytes):
+        telemetry = pdm_can.decode_telemetry_ext(data)
+        if telemetry is None:
+            self.metrics.parse_failure("can_telemetry_ext")
+            return
+        self._extended = True
+        self._legacy_skipped = 0
+        counter = telemetry["counter"]
+        if self._counter is not None and counter != (self._counter + 1) & 0xFF:
+            self.metrics.count("can_frames_lost", (counter - self._counter - 1) & 0xFF)
+        self._counter = counter
+
+        mux = telemetry["mux"]
+        if mux == pdm_can.MUX_CURRENTS:
+            for ch in range(4):
+                self._emit_changed(f"ch{ch}_current", "channel_status",
+                                   {"channel": ch, "current": telemetry["currents"][ch]})
+        elif mux == pdm_can.MUX_STATES:
+            for ch in range(4):
+                self._emit_changed(f"ch{ch}", "channel_status", {
+                    "channel": ch,
+                    "active": telemetry["active"][ch],
+                    "faults": telemetry["faults"][ch]
+                })
+            self._emit_changed("input_mode", "input_mode", telemetry["input_mode"])
+            self._emit_changed("can_ok", "can_status", telemetry["can_ok"])
+            self._emit_changed("digout_ok", "digout_status", telemetry["digout_ok"])
+        elif mux == pdm_can.MUX_DIAGNOSTICS:
+            self._emit_changed("temperature", "temperature", telemetry["temperature"])
+            self._emit_changed("battery_voltage", "battery_voltage", telemetry["battery_voltage"])
+        else:
+            self.metrics.parse_failure("can_telemetry_ext")
+
+    def _on_keypad_pdo(self, data: bytes):
+        keys = pdm_can.decode_keypad_pdo(data)
+        if keys and any(keys["pressed"]):
+            self._emit_changed("input_mode", "input_mode", "KEYPAD")
+
+    def _on_heartbeat(self, data: bytes):
+        if data and data[0] == 0x05:
+            self._last_heartbeat = time.monotonic()
+            self._emit_changed("can_ok", "can_status", True)
+
+    def _check_heartbeat(self):
+        if self._last_heartbeat and time.monotonic() - self._last_heartbeat > HEARTBEAT_TIMEOUT:
+            self._last_heartbeat = 0.0
+            self._emit_changed("can_ok", "can_status", False)
@@ -0,0 +1,232 @@
+"""
+CAN Trace Module
+Turns the firmware's LOG 2 CAN lines into a stream of frame records
+
+At log level 2 Logger::printCANMessage prints every frame the PDM sends or
+receives, e.g.
+
+    [CAN-TX] ID:0x00000395 LEN:8 DATA:[0x05,0x00,0x1A,0x00,0x1F,0x00,0xD4,0x30]
+
+CANTraceRecorder subscribes to those lines and packs each one into a fixed
+22-byte record (host time, direction, COB-ID, DLC, 8 payload bytes) in a
+preallocated ring, so a USB-connected PDM doubles as a CAN bus trace
+without a CAN adapter. The records are plain bytes; with NumPy installed
+they are also viewable in place as a structured array (FRAME_DTYPE).
+"""
+
+import collections
+import re
+import struct
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+import event_bus
+from pdm_can import decode_frame
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only needed for array views
+    np = None
+
+RX = 0
+TX = 1
+DIRECTIONS = ("RX", "TX")
+
+# One frame: time (s since epoch), direction, DLC, COB-ID, payload padded to 8 bytes
+FRAME_RECORD = struct.Struct("<dBBI8s")
+FRAME_DTYPE = np.dtype([("t", "<f8"), ("dir", "u1"), ("dlc", "u1"), ("id", "<u4"),
+                        ("data", "u1", (8,))]) if np else None
+
+# Binary trace file: this header, then FRAME_RECORD records
+TRACE_MAGIC = b"PDMTRC01"
+
+Frame = collections.namedtuple("Frame", "t dir id dlc data")
+
+DEFAULT_CAPACITY = 100000
+
+_LINE_RE = re.compile(r"\[CAN-([RT]X)\] ID:0x([0-9A-Fa-f]+) LEN:(\d+) DATA:\[([^\]]*)\]")
+
+
+def parse_log_line(line: str) -> Optional[Tuple[int, int, bytes]]:
+    """(direction, COB-ID, payload) from a [CAN-RX]/[CAN-TX] line, None if malformed"""
+    match = _LINE_RE.match(line)
+    if not match:
+        return None
+    direction, can_id, length, payload = match.groups()
+    try:
+        data = bytes.fromhex(payload.replace("0x", "").replace(",", ""))
+    except ValueError:
+        return None
+    if len(data) != int(length) or len(data) > 8:
+        return None
+    return TX if direction == "TX" else RX, int(can_id, 16), data
+
+
+class FrameBuffer:
+    """Preallocated ring of FRAME_RECORD records; the oldest are overwritten when full"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * FRAME_RECORD.size)
+        self.total = 0  # Frames ever appended
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    @property
+    def overwritten(self) -> int:
+        return max(0, self.total - self.capacity)
+
+    def append(self, t: float, direction: int, can_id: int, data: bytes):
+        with self._lock:
+            offset = (self.total % self.capacity) * FRAME_RECORD.size
+            FRAME_RECORD.pack_into(self.buffer, offset, t, direction, len(data), can_id, data)
+            self.total += 1
+
+    def clear(self):
+        with self._lock:
+            self.total = 0
+
+    def to_bytes(self) -> bytes:
+        """Records oldest first"""
+        with self._lock:
+            size = FRAME_RECORD.size
+            if self.total <= self.capacity:
+                return bytes(self.buffer[:self.total * size])
+            split = (self.total % self.capacity) * size
+            return bytes(self.buffer[split:] + self.buffer[:split])
+
+    def frames(self) -> Iterator[Frame]:
+        for t, direction, dlc, can_id, data in FRAME_RECORD.iter_unpack(self.to_bytes()):
+            yield Frame(t, direction, can_id, dlc, data[:dlc])
+
+    def to_array(self):
+        """Records oldest first as a FRAME_DTYPE array (requires NumPy)"""
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        return np.frombuffer(self.to_bytes(), dtype=FRAME_DTYPE)
+
+
+def write_candump(path: str, frames, interface: str = "pdm0") -> int:
+    """Write frames in candump -l format ("(t) pdm0 395#0102..."); returns the count"""
+    count = 0
+    with open(path, "w") as f:
+        for frame in frames:
+            can_id = f"{frame.id:03X}" if frame.id <= 0x7FF else f"{frame.id:08X}"
+            f.write(f"({frame.t:.6f}) {interface} {can_id}#{frame.data.hex().upper()}\n")
+            count += 1
+    return count
+
+
+def write_binary(path: str, buffer: FrameBuffer) -> int:
+    """Write TRACE_MAGIC followed by the raw records (memory-mappable); returns the count"""
+    records = buffer.to_bytes()
+    with open(path, "wb") as f:
+        f.write(TRACE_MAGIC)
+        f.write(records)
+    return len(records) // FRAME_RECORD.size
+
+
+def read_trace_file(path: str) -> Iterator[Frame]:
+    """
+    Every frame in a binary trace, Vector ASC (.asc) or candump -l log
+
+    Plain Python, one frame at a time; remote, error and CAN FD frames are
+    skipped. candump logs carry no direction, so their frames are RX.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(TRACE_MAGIC))
+        if magic == TRACE_MAGIC:
+            while True:
+                block = f.read(FRAME_RECORD.size * 65536)
+                if not block:
+                    return
+                for t, direction, dlc, can_id, data in FRAME_RECORD.iter_unpack(
+                        block[:len(block) - len(block) % FRAME_RECORD.size]):
+                    yield Frame(t, direction, can_id, dlc, data[:dlc])
+
+    asc = path.lower().endswith(".asc")
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            frame = _parse_asc_line(line) if asc else _parse_candump_line(line)
+            if frame is not None:
+                yield frame
+
+
+def _parse_candump_line(line: str) -> Optional[Frame]:
+    # "(1697712000.123456) can0 395#05001A001F20D430"
+    parts = line.split()
+    if len(parts) < 3 or not parts[0].startswith("("):
+        return None
+    can_id, sep, payload = parts[2].partition("#")
+    if not sep or payload.startswith(("R", "#")):
+        return None
+    try:
+        data = bytes.fromhex(payload)
+        return Frame(float(parts[0].strip("()")), RX, int(can_id, 16), len(data), data)
+    except ValueError:
+        return None
+
+
+def _parse_asc_line(line: str) -> Optional[Frame]:
+    # "   12.345678 1  395             Rx   d 8 05 00 1A 00 1F 20 D4 30 ..."
+    parts = line.split()
+    if len(parts) < 6 or parts[4] != "d" or parts[3] not in ("Rx", "Tx"):
+        return None
+    try:
+        dlc = int(parts[5])
+        data = bytes.fromhex("".join(parts[6:6 + dlc]))
+        can_id = int(parts[2].rstrip("x"), 16)
+        if len(data) != dlc:
+            return None
+        return Frame(float(parts[0]), TX if parts[3] == "Tx" else RX, can_id, dlc, data)
+    except ValueError:
+        return None
+
+
+class CANTraceRecorder:
+    """Records a PDMCommunication's LOG 2 CAN lines into a FrameBuffer"""
+
+    def __init__(self, pdm_comm, capacity: int = DEFAULT_CAPACITY):
+        self.pdm_comm = pdm_comm
+        self.frames = FrameBuffer(capacity)
+        self.malformed = 0
+        self.dropped = 0  # Lines lost before parsing (earlier recording runs)
+        self._subscription = None
+
+    def start(self):
+        if self._subscription is None:
+            self._subscription = self.pdm_comm.events.subscribe(
+                self._on_line, topics=(event_bus.CAN_LOG,), maxsize=8192, name="can-trace")
+
+    def stop(self):
+        if self._subscription is not None:
+            self.dropped += self._subscription.dropped
+            self.pdm_comm.events.unsubscribe(self._subscription)
+            self._subscription = None
+
+    def _on_line(self, event):
+        parsed = parse_log_line(event.data)
+        if parsed is None:
+            self.malformed += 1
+            return
+        self.frames.append(event.time, *parsed)
+
+    def decoded(self) -> List[dict]:
+        """Recorded frames with PDM frame kinds and decoded payloads"""
+        records = []
+        for frame in self.frames.frames():
+            kind, node, fields = decode_frame(frame.id, frame.data)
+            records.append({"t": round(frame.t, 6), "dir": DIRECTIONS[frame.dir], "id": frame.id,
+                            "data": frame.data.hex(), "kind": kind, "node": node, "fields": fields})
+        return records
+
+    def get_stats(self) -> dict:
+        return {
+            "frames": len(self.frames),
+            "total": self.frames.total,
+            "overwritten": self.frames.overwritten,
+            "malformed": self.malformed,
+            "dropped": self.dropped + (self._subscription.dropped if self._subscription else 0)
+        }
@@ -0,0 +1,304 @@
+"""
+Communication Metrics Module
+Low-overhead counters and latency histograms for the serial link, readable
+as a snapshot dict or as Prometheus text (to a file or a local HTTP port)
+"""
+
+import bisect
+import collections
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+# Command round-trip histogram bucket bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Reader thread time per received line, in seconds
+READER_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01, 0.1)
+
+# Distinct command names tracked before the rest are counted as "OTHER"
+MAX_COMMAND_NAMES = 64
+
+# Throughput rates are averaged over at least this many seconds
+RATE_WINDOW = 10.0
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts are built on export)"""
+    __slots__ = ("buckets", "counts", "count", "total", "max")
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound below which a fraction q of observations fall"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self, scale: float = 1000.0) -> Dict:
+        """Count, average, p50, p95 and max, scaled (default: milliseconds)"""
+        return {
+            "count": self.count,
+            "avg": round(scale * self.total / self.count, 3) if self.count else 0.0,
+            "p50": round(scale * self.quantile(0.5), 3),
+            "p95": round(scale * self.quantile(0.95), 3),
+            "max": round(scale * self.max, 3)
+        }
+
+
+class CommMetrics:
+    """Metrics for one PDMCommunication"""
+
+    def __init__(self, gauges: Optional[Callable[[], Dict[str, object]]] = None):
+        self.gauges = gauges  # Queue depths etc., read at snapshot time
+        self.latency: Dict[str, Histogram] = {}
+        self.reader_time = Histogram(READER_BUCKETS)
+        self.timeouts = collections.Counter()
+        self.parse_failures = collections.Counter()
+        self.counters = dict.fromkeys(
+            ("rx_bytes", "rx_lines", "tx_bytes", "tx_lines", "event_gaps", "can_frames_lost", "connects",
+             "reconnects", "connect_failures", "disconnects", "read_errors", "write_errors"), 0)
+        self.started = time.time()
+        self._rate_base = (time.time(), 0, 0, 0, 0)
+
+    # -------------------------------------------------------------------------
+    # Recording (hot paths: keep these cheap)
+
+    def received(self, byte_count: int):
+        counters = self.counters
+        counters["rx_bytes"] += byte_count
+        counters["rx_lines"] += 1
+
+    def sent(self, byte_count: int):
+        counters = self.counters
+        counters["tx_bytes"] += byte_count
+        counters["tx_lines"] += 1
+
+    def line_handled(self, seconds: float):
+        """Record reader thread time spent framing, parsing and publishing one line"""
+        self.reader_time.observe(seconds)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def parse_failure(self, pattern: str):
+        self.parse_failures[pattern] += 1
+
+    def command_done(self, command: str, seconds: Optional[float]):
+        """Record a command round trip; None means it timed out"""
+        name = self._command_name(command)
+        if seconds is None:
+            self.timeouts[name] += 1
+            return
+        histogram = self.latency.get(name)
+        if histogram is None:
+            histogram = self.latency[name] = Histogram()
+        histogram.observe(seconds)
+
+    def _command_name(self, command: str) -> str:
+        name = command.split(None, 1)[0].upper() if command.strip() else "EMPTY"
+        if name not in self.latency and name not in self.timeouts and \
+                len(self.latency) + len(self.timeouts) >= MAX_COMMAND_NAMES:
+            return "OTHER"
+        return name
+
+    # -------------------------------------------------------------------------
+    # Reading
+
+    def snapshot(self) -> Dict:
+        """All metrics as plain data (latencies in milliseconds)"""
+        now = time.time()
+        c = self.counters
+        totals = (c["rx_bytes"], c["rx_lines"], c["tx_bytes"], c["tx_lines"])
+        base_time, *base = self._rate_base
+        elapsed = max(now - base_time, 1e-6)
+        rates = [(total - start) / elapsed for total, start in zip(totals, base)]
+        if elapsed >= RATE_WINDOW:
+            self._rate_base = (now,) + totals
+
+        return {
+            "uptime": round(now - self.started, 1),
+            "counters": dict(c),
+            "rates": {
+                "rx_bytes_per_s": round(rates[0], 1),
+                "rx_lines_per_s": round(rates[1], 1),
+                "tx_bytes_per_s": round(rates[2], 1),
+                "tx_lines_per_s": round(rates[3], 1)
+            },
+            "commands": {
+                name: dict({f"{key}_ms" if key != "count" else key: value
+                            for key, value in h.summary().items()},
+                           timeouts=self.timeouts.get(name, 0))
+                for name, h in list(self.latency.items())
+            },
+            "reader_us": self.reader_time.summary(1e6),
+            "timeouts": dict(self.timeouts),
+            "parse_failures": dict(self.parse_failures),
+            "gauges": self.gauges() if self.gauges else {}
+        }
+
+    def to_prometheus(self, prefix: str = "pdm") -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{prefix}_{name} {value}")
+
+        c = self.counters
+        for key, help_text in (("rx_bytes", "Bytes received"), ("rx_lines", "Lines received"),
+                               ("tx_bytes", "Bytes sent"), ("tx_lines", "Lines sent"),
+                               ("event_gaps", "Gaps in pushed event sequence numbers"),
+                               ("can_frames_lost", "Extended CAN telemetry frames missed (counter gaps)"),
+                               ("connects", "Successful connections"),
+                               ("reconnects", "Connections after the first"),
+                               ("connect_failures", "Failed connection attempts"),
+                               ("disconnects", "Disconnections"),
+                               ("read_errors", "Serial read errors"),
+                               ("write_errors", "Serial write errors")):
+            metric(f"{key}_total", "counter", help_text, [((), c[key])])
+
+        metric("command_timeouts_total", "counter", "Commands without a reply",
+               [((("command", name),), n) for name, n in self.timeouts.items()])
+        metric("parse_failures_total", "counter", "Lines that failed to parse",
+               [((("pattern", name),), n) for name, n in self.parse_failures.items()])
+
+        def histogram(name, help_text, series):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for label_text, h in series:
+                sep = "," if label_text else ""
+                cumulative = 0
+                for bound, n in zip(h.buckets + ("+Inf",), h.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_{name}_bucket{{{label_text}{sep}le="{bound}"}} {cumulative}')
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{prefix}_{name}_sum{suffix} {h.total:.6f}")
+                lines.append(f"{prefix}_{name}_count{suffix} {h.count}")
+
+        histogram("command_latency_seconds", "Command round trip time",
+                  [(f'command="{_escape(name)}"', h) for name, h in list(self.latency.items())])
+        histogram("reader_line_seconds", "Reader thread time per received line",
+                  [("", self.reader_time)])
+
+        for name, value in (self.gauges() if self.gauges else {}).items():
+            if isinstance(value, dict):  # Labelled gauge: {label_value: value}
+                label, values = value.get("label", "name"), value.get("values", {})
+                metric(name, "gauge", name.replace("_", " "),
+                       [(((label, key),), v) for key, v in values.items()])
+            else:
+                metric(name, "gauge", name.replace("_", " "), [((), _number(value))])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write the Prometheus text atomically (for a textfile collector)"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> float:
+    return float(value) if not isinstance(value, bool) else (1.0 if value else 0.0)
+
+
+class PrometheusExporter:
+    """Serves /metrics on a local port and/or rewrites a text file periodically"""
+
+    def __init__(self, metrics: CommMetrics, port: Optional[int] = None, path: Optional[str] = None,
+                 host: str = "127.0.0.1", interval: float = 15.0):
+        self.metrics = metrics
+        self.port = port
+        self.path = path
+        self.host = host
+        self.interval = interval
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> bool:
+        """Start exporting; False if the port could not be bound"""
+        if self.port is not None:
+            metrics = self.metrics
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = metrics.to_prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            try:
+                self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+            except OSError as e:
+                print(f"Metrics server failed to start: {e}", file=sys.stderr)
+                return False
+            self._httpd.daemon_threads = True
+            self.port = self._httpd.server_address[1]
+            self._threads.append(threading.Thread(target=self._httpd.serve_forever, daemon=True))
+
+        if self.path:
+            self._threads.append(threading.Thread(target=self._write_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self.path:
+            self._write()  # Final values
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    def _write_loop(self):
+        while not self._stop.is_set():
+            self._write()
+            self._stop.wait(self.interval)
+
+    def _write(self):
+        try:
+            self.metrics.write_prometheus(self.path)
+        except OSError as e:
+            print(f"Could not write metrics to {self.path}: {e}", file=sys.stderr)
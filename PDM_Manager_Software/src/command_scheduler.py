@@ -0,0 +1,169 @@
+"""
+Command Scheduler Module
+Runs serial command transactions one at a time on a single thread
+
+Every command/reply exchange with the device is submitted here and executed
+on the scheduler thread, so only that thread writes to the port and reads
+replies. Waiting transactions run most urgent class first:
+
+    USER    Interactive actions (buttons, console, scripts)
+    CONFIG  Bulk configuration load/apply
+    POLL    Background status and statistics polling
+
+Polls with the same key share one queued transaction, and polls submitted
+with skip_if_busy return None straight away while more urgent work is queued
+or running. A transaction already in progress is never interrupted; bulk
+operations are submitted one command at a time, so user commands slot in
+between them.
+"""
+
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+USER = 0
+CONFIG = 1
+POLL = 2
+CLASS_NAMES = {USER: "user", CONFIG: "config", POLL: "poll"}
+
+
+class _Transaction:
+    __slots__ = ("priority", "key", "fn", "submitted", "done", "result", "error")
+
+    def __init__(self, priority: int, key, fn: Callable):
+        self.priority = priority
+        self.key = key
+        self.fn = fn
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class CommandScheduler:
+    """Single owner of a serial link, executing transactions by priority"""
+
+    def __init__(self, name: str = "pdm-serial"):
+        self.name = name
+        self._heap = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._polls: Dict[object, _Transaction] = {}  # Queued polls by key
+        self._running: Optional[_Transaction] = None
+        self._thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self.stats = {cls: {"submitted": 0, "executed": 0, "skipped": 0, "coalesced": 0,
+                            "total_wait": 0.0, "max_wait": 0.0}
+                      for cls in CLASS_NAMES}
+
+    @contextlib.contextmanager
+    def priority(self, priority: int, skip_if_busy: bool = False):
+        """Run transactions submitted by this thread at a priority class"""
+        previous = getattr(self._local, "context", None)
+        self._local.context = (priority, skip_if_busy)
+        try:
+            yield
+        finally:
+            self._local.context = previous
+
+    def run(self, fn: Callable, key=None, priority: Optional[int] = None):
+        """
+        Execute fn on the scheduler thread and return its result
+
+        Args:
+            fn: Transaction to run; exceptions are re-raised in the caller
+            key: Identifies equivalent polls, which are coalesced
+            priority: Class to use instead of the thread's priority() context
+
+        Returns:
+            fn's result, or None if a skip_if_busy poll was skipped
+        """
+        if threading.current_thread() is self._thread:
+            return fn()  # Nested call from inside a transaction
+
+        context_priority, skip_if_busy = getattr(self._local, "context", None) or (USER, False)
+        if priority is None:
+            priority = context_priority
+
+        with self._cond:
+            stats = self.stats[priority]
+            stats["submitted"] += 1
+            if skip_if_busy and self._busy_above(priority):
+                stats["skipped"] += 1
+                return None
+            transaction = self._polls.get(key) if priority == POLL and key is not None else None
+            if transaction is not None:
+                stats["coalesced"] += 1
+            else:
+                transaction = _Transaction(priority, key, fn)
+                heapq.heappush(self._heap, (priority, next(self._order), transaction))
+                if priority == POLL and key is not None:
+                    self._polls[key] = transaction
+                self._ensure_thread()
+                self._cond.notify()
+
+        transaction.done.wait()
+        if transaction.error is not None:
+            raise transaction.error
+        return transaction.result
+
+    def _busy_above(self, priority: int) -> bool:
+        """Whether more urgent work is queued or running (call with _cond held)"""
+        if self._running is not None and self._running.priority < priority:
+            return True
+        return bool(self._heap) and self._heap[0][0] < priority
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._work, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, transaction = heapq.heappop(self._heap)
+                if self._polls.get(transaction.key) is transaction:
+                    del self._polls[transaction.key]
+                self._running = transaction
+                stats = self.stats[transaction.priority]
+                wait = time.perf_counter() - transaction.submitted
+                stats["total_wait"] += wait
+                stats["max_wait"] = max(stats["max_wait"], wait)
+
+            try:
+                transaction.result = transaction.fn()
+            except BaseException as e:
+                transaction.error = e
+
+            with self._cond:
+                self._running = None
+                stats["executed"] += 1
+            transaction.done.set()
+
+    def thread_ident(self) -> Optional[int]:
+        """Ident of the scheduler thread, None before the first transaction"""
+        return self._thread.ident if self._thread and self._thread.is_alive() else None
+
+    def queued(self) -> int:
+        """Number of transactions waiting to run"""
+        return len(self._heap)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-class counters and queue wait times in milliseconds"""
+        with self._cond:
+            return {
+                CLASS_NAMES[cls]: {
+                    "submitted": s["submitted"],
+                    "executed": s["executed"],
+                    "skipped": s["skipped"],
+                    "coalesced": s["coalesced"],
+                    "avg_wait_ms": round(1000 * s["total_wait"] / s["executed"], 2) if s["executed"] else 0.0,
+                    "max_wait_ms": round(1000 * s["max_wait"], 2)
+                }
+                for cls, s in self.stats.items()
+            }
@@ -0,0 +1,315 @@
+"""
+Direct Upload Module
+Calls the board's upload tool (dfu-util, bossac, ...) directly, using the
+upload recipe resolved once through Arduino CLI and cached on disk
+
+Several units can be flashed at once only if each command picks its own
+unit. Tools given the serial port do. dfu-util is given the unit's USB serial
+number (-S) or bus path (--path) from its serial port's USB descriptor. When
+neither is known, unit_selector() returns None and the caller must upload
+to one unit at a time.
+"""
+
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from typing import Optional, Callable, Dict, List
+
+from firmware_image import FirmwareImage
+
+RECIPE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pdm_manager", "upload_recipes.json")
+
+# Placeholders only known at upload time; left in the cached pattern
+RUNTIME_KEYS = ("serial.port", "serial.port.file", "build.path", "build.project_name")
+
+PROJECT_NAME = "firmware"
+
+
+def split_quoted(command_line: str) -> List[str]:
+    """Split a recipe command line on whitespace, honouring double and single quotes"""
+    args = []
+    current = ""
+    quote = None
+    in_arg = False
+    for char in command_line:
+        if quote:
+            if char == quote:
+                quote = None
+            else:
+                current += char
+        elif char in "\"'":
+            quote = char
+            in_arg = True
+        elif char.isspace():
+            if in_arg:
+                args.append(current)
+                current = ""
+                in_arg = False
+        else:
+            current += char
+            in_arg = True
+    if in_arg:
+        args.append(current)
+    return args
+
+
+def usb_path(location: Optional[str]) -> Optional[str]:
+    """dfu-util --path ("1-1.2") from a pyserial port location ("1-1.2:1.0")"""
+    if not location:
+        return None
+    return location.split(":", 1)[0] or None
+
+
+def same_unit(a, b) -> bool:
+    """Whether two list_ports entries belong to the same USB device"""
+    if a.serial_number and a.serial_number == b.serial_number:
+        return True
+    return bool(a.location and usb_path(a.location) == usb_path(b.location))
+
+
+def _comports() -> list:
+    import serial.tools.list_ports
+    return serial.tools.list_ports.comports()
+
+
+def expand_properties(value: str, properties: Dict[str, str], max_passes: int = 10) -> str:
+    """Replace {key} placeholders from properties until nothing changes"""
+    pattern = re.compile(r"\{([^{}]+)\}")
+    for _ in range(max_passes):
+        expanded = pattern.sub(lambda m: properties.get(m.group(1), m.group(0)), value)
+        if expanded == value:
+            break
+        value = expanded
+    return value
+
+
+class DirectUploader:
+    """Resolves and runs a board's upload tool without going through arduino-cli upload"""
+
+    def __init__(self, fqbn: str, cli_path_getter: Callable[[], Optional[str]],
+                 cache_path: str = RECIPE_CACHE_PATH, recipe: Optional[Dict] = None):
+        self.fqbn = fqbn
+        self.cli_path_getter = cli_path_getter
+        self.cache_path = cache_path
+        self._recipe: Optional[Dict] = recipe  # Override; still checked by _recipe_valid()
+        self._lock = threading.Lock()  # Fleet uploads share one resolution
+        self.list_ports: Callable[[], list] = _comports
+
+    def get_recipe(self) -> Optional[Dict]:
+        """Get the upload recipe from memory, the disk cache, or Arduino CLI (in that order)"""
+        with self._lock:
+            if self._recipe and self._recipe_valid(self._recipe):
+                return self._recipe
+
+            recipe = self._load_cached_recipe()
+            if recipe is None:
+                recipe = self.resolve_recipe()
+                if recipe is not None:
+                    self._save_cached_recipe(recipe)
+            self._recipe = recipe
+            return recipe
+
+    def has_cached_recipe(self) -> bool:
+        """Check for a usable recipe without running Arduino CLI"""
+        return self._load_cached_recipe() is not None
+
+    def invalidate(self):
+        """Forget the cached recipe, e.g. after the board package was updated"""
+        self._recipe = None
+        cache = self._read_cache()
+        if cache.pop(self.fqbn, None) is not None:
+            self._write_cache(cache)
+
+    def resolve_recipe(self) -> Optional[Dict]:
+        """Ask Arduino CLI for the board properties and build the upload recipe"""
+        cli_path = self.cli_path_getter()
+        if not cli_path:
+            return None
+
+        try:
+            result = subprocess.run(
+                [cli_path, "board", "details", "-b", self.fqbn, "--show-properties=expanded"],
+                capture_output=True,
+                text=True,
+                timeout=60
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if result.returncode != 0:
+            return None
+
+        return self.recipe_from_properties(self.parse_properties(result.stdout))
+
+    @staticmethod
+    def parse_properties(text: str) -> Dict[str, str]:
+        """Parse key=value lines of 'board details --show-properties' output"""
+        properties = {}
+        for line in text.splitlines():
+            key, sep, value = line.partition("=")
+            if sep and key and not key.startswith("#"):
+                properties[key.strip()] = value.strip()
+        return properties
+
+    def recipe_from_properties(self, properties: Dict[str, str]) -> Optional[Dict]:
+        """
+        Build an upload recipe from board properties
+
+        Mirrors how Arduino CLI assembles the upload command: the upload
+        tool's "tools.<tool>." subtree is merged into the board properties
+        and upload.pattern is expanded from the result. Runtime placeholders
+        (port and build paths) are left for build_command().
+        """
+        tool = properties.get("upload.tool.default") or properties.get("upload.tool")
+        if not tool:
+            return None
+
+        merged = dict(properties)
+        prefix = f"tools.{tool}."
+        for key, value in properties.items():
+            if key.startswith(prefix):
+                merged[key[len(prefix):]] = value
+        merged.setdefault("upload.verbose", merged.get("upload.params.quiet", ""))
+        merged.setdefault("upload.verify", merged.get("upload.params.verify", ""))
+        for key in RUNTIME_KEYS:
+            merged.pop(key, None)
+
+        pattern = merged.get("upload.pattern")
+        if not pattern:
+            return None
+
+        return {
+            "fqbn": self.fqbn,
+            "tool": tool,
+            "pattern": expand_properties(pattern, merged),
+            "use_1200bps_touch": merged.get("upload.use_1200bps_touch", "false") == "true",
+            "wait_for_upload_port": merged.get("upload.wait_for_upload_port", "false") == "true",
+            "resolved_at": time.time()
+        }
+
+    def build_command(self, recipe: Dict, port: str, build_path: str,
+                      project_name: str = PROJECT_NAME) -> List[str]:
+        """Fill the runtime placeholders of a recipe and split it into arguments"""
+        runtime = {
+            "serial.port": port,
+            "serial.port.file": os.path.basename(port),
+            "build.path": build_path,
+            "build.project_name": project_name
+        }
+        return split_quoted(expand_properties(recipe["pattern"], runtime))
+
+    def port_info(self, port: str):
+        """list_ports entry for a serial port, or None"""
+        for info in self.list_ports():
+            if info.device == port:
+                return info
+        return None
+
+    def unit_selector(self, recipe: Dict, port: str) -> Optional[List[str]]:
+        """
+        Extra tool arguments that make the upload reach the unit on port
+
+        Returns [] when the command already names the port, and None when the
+        unit cannot be told apart from others (upload one unit at a time).
+        """
+        info = self.port_info(port)
+        known = bool(info and (info.serial_number or usb_path(info.location)))
+        if "{serial.port" in recipe["pattern"]:
+            # A bootloader that re-enumerates must be matched to its unit
+            return [] if known or not recipe["wait_for_upload_port"] else None
+        if recipe["tool"] != "dfu-util" or not known:
+            return None
+        if info.serial_number:
+            return ["-S", info.serial_number]
+        return ["--path", usb_path(info.location)]
+
+    def prepare_upload(self, recipe: Dict, image: FirmwareImage, port: str, build_path: str,
+                       dry_run: bool = False, selector: Optional[List[str]] = None) -> List[str]:
+        """
+        Write the image where the recipe expects it, put the board into its
+        bootloader and return the upload command
+
+        Args:
+            recipe: Recipe from get_recipe()
+            image: Parsed firmware image
+            port: Serial port of the running board
+            build_path: Scratch directory for the .bin/.hex files
+            dry_run: Only build the command; do not touch the port
+            selector: Arguments from unit_selector(), appended to the command
+        """
+        base = os.path.join(build_path, PROJECT_NAME)
+        with open(base + ".bin", "wb") as f:
+            f.write(image.data)
+        if image.source_path and os.path.exists(image.source_path):
+            with open(image.source_path, "rb") as src, open(base + ".hex", "wb") as dst:
+                dst.write(src.read())
+
+        upload_port = port
+        if recipe["use_1200bps_touch"] and not dry_run:
+            upload_port = self._enter_bootloader(port, recipe["wait_for_upload_port"])
+        return self.build_command(recipe, upload_port, build_path) + list(selector or [])
+
+    def _enter_bootloader(self, port: str, wait_for_port: bool) -> str:
+        """Open and close the port at 1200 baud, then wait for the bootloader"""
+        import serial
+
+        ports = self.list_ports()
+        before = {p.device for p in ports}
+        unit = next((p for p in ports if p.device == port), None)
+        try:
+            ser = serial.Serial(port, 1200)
+            ser.dtr = False
+            ser.close()
+        except serial.SerialException:
+            pass  # Board may already be in its bootloader
+
+        if not wait_for_port:
+            time.sleep(1.0)  # Give the bootloader time to enumerate
+            return port
+
+        # Bootloader may come up on a different port name; other units being
+        # flashed at the same time may add ports too, so match this unit's
+        deadline = time.time() + 10.0
+        while time.time() < deadline:
+            time.sleep(0.25)
+            new_ports = [p for p in self.list_ports() if p.device not in before]
+            if unit is not None:
+                new_ports = [p for p in new_ports if same_unit(p, unit)]
+            if len(new_ports) == 1:
+                return new_ports[0].device
+        return port
+
+    def _recipe_valid(self, recipe: Dict) -> bool:
+        """A cached recipe is only trusted while its tool executable still exists"""
+        if recipe.get("fqbn") != self.fqbn:
+            return False
+        args = split_quoted(recipe.get("pattern", ""))
+        return bool(args) and "{" not in args[0] and os.path.exists(args[0])
+
+    def _load_cached_recipe(self) -> Optional[Dict]:
+        recipe = self._read_cache().get(self.fqbn)
+        if recipe and self._recipe_valid(recipe):
+            return recipe
+        return None
+
+    def _save_cached_recipe(self, recipe: Dict):
+        cache = self._read_cache()
+        cache[self.fqbn] = recipe
+        self._write_cache(cache)
+
+    def _read_cache(self) -> Dict:
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, cache: Dict):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, "w") as f:
+                json.dump(cache, f, indent=1)
+        except OSError:
+            pass  # Cache is an optimisation only
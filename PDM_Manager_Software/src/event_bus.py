@@ -0,0 +1,202 @@
+"""
+Event Bus Module
+Topic-based publish/subscribe for device updates
+
+The serial reader thread only appends each event to the bounded queue of
+every subscriber interested in its topic. Subscribers are delivered on their
+own thread (or an executor they supply), so a slow consumer fills and then
+drops from its own queue instead of holding up serial reading or any other
+subscriber. A subscriber without a callback is polled instead: nothing wakes
+up per event and the consumer takes whole batches from the queue itself.
+"""
+
+import collections
+import sys
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Topics
+TEMPERATURE = "temperature"
+BATTERY = "battery"
+CHANNEL = "channel"
+FAULT = "fault"
+SYSTEM = "system"      # Input mode, CAN and digital output status
+RAW_LINE = "raw_line"  # Every line received from the device
+CAN_LOG = "can_log"    # Firmware [CAN-RX]/[CAN-TX] log lines (LOG 2)
+
+STATE_TOPICS = (TEMPERATURE, BATTERY, CHANNEL, FAULT, SYSTEM)
+ALL_TOPICS = STATE_TOPICS + (RAW_LINE, CAN_LOG)
+
+# device_state update type -> topic
+UPDATE_TOPICS = {
+    "temperature": TEMPERATURE,
+    "battery_voltage": BATTERY,
+    "channel_status": CHANNEL,
+    "input_mode": SYSTEM,
+    "can_status": SYSTEM,
+    "digout_status": SYSTEM
+}
+
+Event = collections.namedtuple("Event", "topic type data time")
+
+
+class Subscription:
+    """One subscriber's queue, filter and delivery"""
+
+    def __init__(self, callback: Optional[Callable[[Event], None]], topics: Iterable[str],
+                 predicate: Optional[Callable[[Event], bool]], maxsize: int,
+                 executor: Optional[Executor], name: str):
+        self.callback = callback
+        self.topics = frozenset(topics)
+        self.predicate = predicate
+        self.executor = executor
+        self.name = name
+        self.queue = collections.deque(maxlen=maxsize)
+        self.dropped = 0
+        self.delivered = 0
+        self.errors = 0
+        self.active = True
+
+        self._wakeup = threading.Event()
+        self._scheduled = False
+        self._schedule_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        if executor is None and callback is not None:
+            self._thread = threading.Thread(target=self._run, name=f"events-{name}", daemon=True)
+            self._thread.start()
+
+    def offer(self, event: Event):
+        """Queue an event (publisher thread); the oldest is dropped when full"""
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(event)
+        if self.callback is None:
+            return  # Polled with take()
+        if self.executor is None:
+            self._wakeup.set()
+            return
+        with self._schedule_lock:
+            if not self._scheduled:
+                self._scheduled = True
+                self.executor.submit(self._drain_scheduled)
+
+    def take(self, limit: int = 0) -> List[Event]:
+        """Remove and return queued events, oldest first (polled subscribers)"""
+        queue = self.queue
+        count = len(queue)
+        if limit:
+            count = min(count, limit)
+        events = []
+        for _ in range(count):
+            try:
+                event = queue.popleft()
+            except IndexError:
+                break
+            if self.predicate is None or self.predicate(event):
+                events.append(event)
+        self.delivered += len(events)
+        return events
+
+    def cancel(self):
+        """Stop delivery; events still queued are discarded"""
+        self.active = False
+        self.queue.clear()
+        self._wakeup.set()
+
+    def _run(self):
+        while self.active:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self._drain()
+
+    def _drain_scheduled(self):
+        self._drain()
+        with self._schedule_lock:
+            if self.queue and self.active:
+                self.executor.submit(self._drain_scheduled)
+            else:
+                self._scheduled = False
+
+    def _drain(self):
+        queue = self.queue
+        while queue and self.active:
+            try:
+                event = queue.popleft()
+            except IndexError:
+                break
+            try:
+                # Filters run here rather than on the publisher thread
+                if self.predicate is None or self.predicate(event):
+                    self.callback(event)
+                    self.delivered += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Event subscriber '{self.name}' failed: {e}", file=sys.stderr)
+
+
+class EventBus:
+    """Routes published events to subscribers by topic"""
+
+    def __init__(self):
+        self._by_topic: Dict[str, tuple] = {topic: () for topic in ALL_TOPICS}
+        self._lock = threading.Lock()  # Serialises (un)subscribe; publish is lock-free
+
+    def subscribe(self, callback: Optional[Callable[[Event], None]], topics: Optional[Iterable[str]] = None,
+                  predicate: Optional[Callable[[Event], bool]] = None, maxsize: int = 256,
+                  executor: Optional[Executor] = None, name: str = "") -> Subscription:
+        """
+        Register a subscriber
+
+        Args:
+            callback: Called with each Event, in publish order; None to poll
+                with Subscription.take() instead
+            topics: Topics to receive (default: all)
+            predicate: Optional filter; events for which it returns False are skipped
+            maxsize: Queue length; the oldest events are dropped beyond it
+            executor: Deliver through this executor instead of a dedicated thread
+            name: Label for stats and error messages
+        """
+        topics = ALL_TOPICS if topics is None else tuple(topics)
+        unknown = set(topics) - set(ALL_TOPICS)
+        if unknown:
+            raise ValueError(f"unknown topics: {', '.join(sorted(unknown))}")
+        subscription = Subscription(callback, topics, predicate, maxsize, executor,
+                                    name or getattr(callback, "__name__", "subscriber"))
+        with self._lock:
+            # Tuples are replaced, never mutated, so publish can iterate without locking
+            for topic in subscription.topics:
+                self._by_topic[topic] = self._by_topic[topic] + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Optional[Subscription]):
+        """Stop delivering to a subscriber (None is ignored)"""
+        if subscription is None:
+            return
+        with self._lock:
+            for topic in subscription.topics:
+                self._by_topic[topic] = tuple(s for s in self._by_topic[topic] if s is not subscription)
+        subscription.cancel()
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._by_topic.get(topic))
+
+    def publish(self, topic: str, update_type: str, data):
+        """Queue an event for every subscriber of topic"""
+        subscribers = self._by_topic.get(topic)
+        if not subscribers:
+            return
+        event = Event(topic, update_type, data, time.time())
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def get_stats(self) -> List[Dict]:
+        """Per-subscriber queue depth and counters"""
+        seen = {}
+        for subscribers in self._by_topic.values():
+            for s in subscribers:
+                seen[id(s)] = s
+        return [{"name": s.name, "topics": sorted(s.topics), "queued": len(s.queue),
+                 "delivered": s.delivered, "dropped": s.dropped, "errors": s.errors}
+                for s in seen.values()]
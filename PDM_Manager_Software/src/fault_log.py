@@ -0,0 +1,90 @@
+"""
+Fault Event Store Module
+Keeps a local history of the PDM fault log, merged incrementally on connect
+"""
+
+import json
+import os
+import re
+import time
+from typing import Dict, List
+
+STORE_DIR = os.path.join(os.path.expanduser("~"), ".pdm_manager")
+
+
+class FaultEventStore:
+    """Persistent per-device history of FAULTLOG entries"""
+
+    def __init__(self, port: str, directory: str = STORE_DIR):
+        safe_port = re.sub(r"[^\w.-]", "_", port) or "device"
+        self.path = os.path.join(directory, f"fault_log_{safe_port}.json")
+        self.events: List[Dict] = []
+        self.cursor = 0   # Last device sequence number merged
+        self.boot = 0     # Increments each time the device sequence restarts
+        self.dropped = 0  # Entries overwritten on the device before they were fetched
+        self.last_now = 0 # Device millis() at the last merge, to spot resets
+        self.load()
+
+    def load(self):
+        """Load the store from disk, starting empty if missing or unreadable"""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.events = data.get("events", [])
+            self.cursor = int(data.get("cursor", 0))
+            self.boot = int(data.get("boot", 0))
+            self.dropped = int(data.get("dropped", 0))
+            self.last_now = int(data.get("last_now", 0))
+        except (OSError, ValueError):
+            self.events = []
+
+    def save(self):
+        """Write the store to disk"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "cursor": self.cursor,
+                "boot": self.boot,
+                "dropped": self.dropped,
+                "last_now": self.last_now,
+                "events": self.events
+            }, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def start_new_boot(self):
+        """Device sequence numbers restarted; following entries start a new boot"""
+        self.boot += 1
+        self.cursor = 0
+        self.last_now = 0
+
+    def merge(self, report: Dict) -> int:
+        """Merge a fetch_fault_log() report and save
+
+        Returns:
+            Number of events added
+        """
+        fetched_at = time.time()
+        known = {(e["boot"], e["seq"]) for e in self.events}
+        added = 0
+
+        for entry in report["entries"]:
+            if entry["seq"] <= self.cursor or (self.boot, entry["seq"]) in known:
+                continue
+            event = dict(entry, boot=self.boot)
+            # Device only has millis(); estimate wall time from the report's "now"
+            event["time"] = fetched_at - (report["now"] - entry["ms"]) / 1000.0
+            self.events.append(event)
+            added += 1
+
+        self.cursor = max(self.cursor, report["next"] - 1)
+        self.dropped += report.get("dropped", 0)
+        self.last_now = report["now"]
+        self.save()
+        return added
+
+    def get_events(self, active_only: bool = False) -> List[Dict]:
+        """Get stored events, oldest first"""
+        if active_only:
+            return [e for e in self.events if e["set"]]
+        return list(self.events)
@@ -0,0 +1,199 @@
+"""
+Firmware Image Module
+Intel HEX parsing, image hashing and a local index of known firmware images
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Optional, Dict, Iterable, List
+
+INDEX_PATH = os.path.join(os.path.expanduser("~"), ".pdm_manager", "firmware_index.json")
+
+# Marker embedded by the firmware (UARTHandler.cpp), followed by the build id
+BUILD_MARKER = b"PDM-BUILD:"
+
+# Intel HEX record types
+REC_DATA = 0x00
+REC_EOF = 0x01
+REC_EXT_SEGMENT = 0x02
+REC_START_SEGMENT = 0x03
+REC_EXT_LINEAR = 0x04
+REC_START_LINEAR = 0x05
+
+# Largest image accepted (UNO R4 Minima has 256 KB of code flash)
+MAX_IMAGE_SIZE = 256 * 1024
+
+
+class HexFormatError(ValueError):
+    """Raised when an Intel HEX file is malformed"""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"line {line_number}: {message}")
+        self.line_number = line_number
+
+
+class FirmwareImage:
+    """Binary firmware image built from an Intel HEX file"""
+
+    def __init__(self, data: bytes, base_address: int, start_address: Optional[int] = None,
+                 source_path: str = ""):
+        self.data = data
+        self.base_address = base_address
+        self.start_address = start_address
+        self.source_path = source_path
+        self.sha256 = hashlib.sha256(data).hexdigest()
+        self.build_id = self._find_build_id(data)
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @staticmethod
+    def _find_build_id(data: bytes) -> Optional[str]:
+        """Read the NUL-terminated build id that follows the firmware marker"""
+        pos = data.find(BUILD_MARKER)
+        if pos < 0:
+            return None
+        start = pos + len(BUILD_MARKER)
+        end = data.find(b"\0", start, start + 64)
+        if end < 0:
+            return None
+        return data[start:end].decode("ascii", errors="replace")
+
+
+def parse_hex_lines(lines: Iterable[str], source_path: str = "") -> FirmwareImage:
+    """
+    Parse Intel HEX records into a contiguous image
+
+    Every record is checked for syntax, length and checksum. Data may arrive
+    in any address order; gaps are filled with 0xFF (erased flash) and
+    overlapping records are rejected.
+
+    Raises:
+        HexFormatError: if any record is invalid or the EOF record is missing
+    """
+    chunks: List[tuple] = []
+    upper = 0  # Extended address (segment << 4 or linear << 16)
+    start_address = None
+    seen_eof = False
+    line_number = 0
+
+    for line_number, raw in enumerate(lines, 1):
+        line = raw.strip()
+        if not line:
+            continue
+        if seen_eof:
+            raise HexFormatError(line_number, "data after EOF record")
+        if line[0] != ":":
+            raise HexFormatError(line_number, "record does not start with ':'")
+
+        try:
+            record = bytes.fromhex(line[1:])
+        except ValueError:
+            raise HexFormatError(line_number, "invalid hex digits")
+        if len(record) < 5 or len(record) != record[0] + 5:
+            raise HexFormatError(line_number, "record length mismatch")
+        if sum(record) & 0xFF:
+            raise HexFormatError(line_number, "checksum mismatch")
+
+        length = record[0]
+        offset = (record[1] << 8) | record[2]
+        rec_type = record[3]
+        payload = record[4:4 + length]
+
+        if rec_type == REC_DATA:
+            chunks.append((upper + offset, payload))
+        elif rec_type == REC_EOF:
+            seen_eof = True
+        elif rec_type == REC_EXT_SEGMENT and length == 2:
+            upper = int.from_bytes(payload, "big") << 4
+        elif rec_type == REC_EXT_LINEAR and length == 2:
+            upper = int.from_bytes(payload, "big") << 16
+        elif rec_type in (REC_START_SEGMENT, REC_START_LINEAR) and length == 4:
+            start_address = int.from_bytes(payload, "big")
+        else:
+            raise HexFormatError(line_number, f"unsupported record type {rec_type:02X}")
+
+    if not seen_eof:
+        raise HexFormatError(line_number, "missing EOF record")
+    if not chunks:
+        raise HexFormatError(line_number, "no data records")
+
+    chunks.sort(key=lambda c: c[0])
+    base = chunks[0][0]
+    end = max(addr + len(payload) for addr, payload in chunks)
+    if end - base > MAX_IMAGE_SIZE:
+        raise HexFormatError(line_number, f"image spans {end - base} bytes")
+
+    image = bytearray(b"\xFF" * (end - base))
+    last_end = base
+    for addr, payload in chunks:
+        if addr < last_end:
+            raise HexFormatError(line_number, f"overlapping data at 0x{addr:08X}")
+        image[addr - base:addr - base + len(payload)] = payload
+        last_end = addr + len(payload)
+
+    return FirmwareImage(bytes(image), base, start_address, source_path)
+
+
+def parse_hex_file(hex_file_path: str) -> FirmwareImage:
+    """Parse an Intel HEX file, streaming it line by line"""
+    with open(hex_file_path, "r", encoding="ascii", errors="replace") as f:
+        return parse_hex_lines(f, hex_file_path)
+
+
+class FirmwareIndex:
+    """Local index of known firmware images, keyed by image hash"""
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self.images: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        """Load the index from disk, starting empty if missing or unreadable"""
+        try:
+            with open(self.path, "r") as f:
+                self.images = json.load(f).get("images", {})
+        except (OSError, ValueError):
+            self.images = {}
+
+    def save(self):
+        """Write the index to disk"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"images": self.images}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def add(self, image: FirmwareImage) -> Dict:
+        """Record an image (or refresh its entry) and save"""
+        entry = self.images.get(image.sha256, {})
+        entry.update({
+            "path": os.path.abspath(image.source_path) if image.source_path else entry.get("path", ""),
+            "size": image.size,
+            "base_address": image.base_address,
+            "build_id": image.build_id,
+            "last_seen": time.time()
+        })
+        entry.setdefault("added", entry["last_seen"])
+        self.images[image.sha256] = entry
+        self.save()
+        return entry
+
+    def find_by_build_id(self, build_id: str) -> List[str]:
+        """Get hashes of all known images carrying a build id"""
+        return [sha for sha, entry in self.images.items() if entry.get("build_id") == build_id]
+
+    def is_installed(self, image: FirmwareImage, device_build_id: Optional[str]) -> bool:
+        """
+        Check whether a device reporting device_build_id already runs image
+
+        Build ids are only trusted when they identify a single known image, so
+        two different builds that happen to share an id are always flashed.
+        """
+        if not image.build_id or not device_build_id or image.build_id != device_build_id:
+            return False
+        return self.find_by_build_id(device_build_id) == [image.sha256]
@@ -4,20 +4,63 @@ Handles PDM firmware updates using Arduino CLI
 """
 
 import os
+import re
 import subprocess
 import threading
 import time
-from typing import Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, List
 import tempfile
 import shutil
 
+from firmware_image import FirmwareImage, FirmwareIndex, HexFormatError, parse_hex_file
+from direct_uploader import DirectUploader, RECIPE_CACHE_PATH
+
+# Upload tools (dfu-util, bossac) report progress as "... 45% ..."
+PERCENT_PATTERN = re.compile(r"(\d{1,3})\s*%")
+
+# Share of the progress bar used by the upload tool's own percentage
+UPLOAD_PROGRESS_START = 10
+UPLOAD_PROGRESS_END = 95
+
 class FirmwareUpdater:
     """Manages PDM firmware updates"""
     
-    def __init__(self):
-        self.arduino_cli_path = self._find_arduino_cli()
+    def __init__(self, cache_path: str = RECIPE_CACHE_PATH, recipe: Optional[Dict] = None):
+        """
+        Args:
+            cache_path: Upload recipe cache file
+            recipe: Upload recipe to use instead of the cached or resolved one
+        """
+        self._arduino_cli_path: Optional[str] = None
+        self._arduino_cli_searched = False
         self.update_callback: Optional[Callable] = None
         self.is_updating = False
+        self.image_index = FirmwareIndex()
+        self._active_uploads = 0
+        self._upload_lock = threading.Lock()
+        # Held from bootloader entry to upload end by uploads that cannot pick their unit
+        self._exclusive_upload = threading.Lock()
+        
+        # Call the board's upload tool directly once its recipe is known;
+        # arduino-cli is then only needed to resolve the recipe the first time
+        self.use_direct_upload = True
+        self.dry_run = False
+        self.direct_uploader = DirectUploader(self.get_board_fqbn(), lambda: self.arduino_cli_path,
+                                              cache_path, recipe)
+        
+    @property
+    def arduino_cli_path(self) -> Optional[str]:
+        """Arduino CLI executable, looked up on first use"""
+        if not self._arduino_cli_searched:
+            self._arduino_cli_path = self._find_arduino_cli()
+            self._arduino_cli_searched = True
+        return self._arduino_cli_path
+        
+    @arduino_cli_path.setter
+    def arduino_cli_path(self, path: Optional[str]):
+        self._arduino_cli_path = path
+        self._arduino_cli_searched = True
         
     def _find_arduino_cli(self) -> Optional[str]:
         """Find Arduino CLI executable"""
@@ -25,7 +68,7 @@ class FirmwareUpdater:
         common_paths = [
             "arduino-cli.exe",
             "C:\\Program Files\\Arduino IDE\\arduino-cli.exe",
-            "C:\\Users\\*\\AppData\\Local\\Arduino15\\arduino-cli.exe",
+            os.path.join(os.path.expanduser("~"), "AppData", "Local", "Arduino15", "arduino-cli.exe"),
             os.path.join(os.path.dirname(__file__), "..", "tools", "arduino-cli.exe")
         ]
         
@@ -33,19 +76,13 @@ class FirmwareUpdater:
             if os.path.exists(path):
                 return path
                 
-        # Try to find in PATH
-        try:
-            result = subprocess.run(["where", "arduino-cli"], 
-                                  capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                return result.stdout.strip().split('\n')[0]
-        except:
-            pass
-            
-        return None
+        # Search PATH in-process rather than spawning 'where'
+        return shutil.which("arduino-cli")
     
     def is_available(self) -> bool:
         """Check if firmware update capability is available"""
+        if self.use_direct_upload and self.direct_uploader.has_cached_recipe():
+            return True
         return self.arduino_cli_path is not None
     
     def get_board_fqbn(self) -> str:
@@ -53,7 +90,9 @@ class FirmwareUpdater:
         return "arduino:renesas_uno:unor4minima"
     
     def update_firmware(self, hex_file_path: str, port: str, 
-                       progress_callback: Optional[Callable] = None) -> bool:
+                       progress_callback: Optional[Callable] = None,
+                       device_build_id: Optional[str] = None,
+                       skip_installed: bool = False) -> bool:
         """
         Update PDM firmware
         
@@ -61,61 +100,104 @@ class FirmwareUpdater:
             hex_file_path: Path to firmware .hex file
             port: COM port (e.g., "COM3")
             progress_callback: Function to call with progress updates
+            device_build_id: Build id reported by the device (VERSION command)
+            skip_installed: Skip flashing when device_build_id identifies this
+                            image (opt-in: ids are not proof of identical images)
             
         Returns:
-            True if update successful, False otherwise
+            True if update successful (or skipped as identical), False otherwise
         """
-        if not self.arduino_cli_path:
-            if progress_callback:
-                progress_callback("error", "Arduino CLI not found")
+        image = self._load_image(hex_file_path, progress_callback)
+        if image is None:
             return False
-            
+        return self._flash_image(image, port, progress_callback, device_build_id, skip_installed)
+        
+    def is_installed(self, hex_file_path: str, device_build_id: Optional[str]) -> bool:
+        """Whether device_build_id identifies the image in hex_file_path (for asking the user)"""
+        image = self._load_image(hex_file_path)
+        return bool(image and self.image_index.is_installed(image, device_build_id))
+        
+    def _load_image(self, hex_file_path: str,
+                    progress_callback: Optional[Callable] = None) -> Optional[FirmwareImage]:
+        """Parse and index a firmware file, reporting problems through the callback"""
         if not os.path.exists(hex_file_path):
             if progress_callback:
                 progress_callback("error", f"Firmware file not found: {hex_file_path}")
+            return None
+            
+        try:
+            image = parse_hex_file(hex_file_path)
+        except (OSError, HexFormatError) as e:
+            if progress_callback:
+                progress_callback("error", f"Invalid firmware file: {e}")
+            return None
+        self.image_index.add(image)
+        return image
+        
+    def _flash_image(self, image: FirmwareImage, port: str,
+                     progress_callback: Optional[Callable] = None,
+                     device_build_id: Optional[str] = None,
+                     skip_installed: bool = False) -> bool:
+        """Upload a parsed image to one port, unless skip_installed and it is already installed"""
+        if skip_installed and self.image_index.is_installed(image, device_build_id):
+            if progress_callback:
+                progress_callback("progress", 100)
+                progress_callback("success", f"Device already runs this firmware (build {image.build_id}), update skipped")
+            return True
+            
+        recipe = self.direct_uploader.get_recipe() if self.use_direct_upload else None
+        if not recipe and not self.arduino_cli_path:
+            if progress_callback:
+                progress_callback("error", "Arduino CLI not found")
             return False
             
-        self.is_updating = True
+        self._set_uploading(True)
+        build_dir = tempfile.mkdtemp(prefix="pdm_upload_")
         
         try:
-            # Prepare upload command
-            cmd = [
-                self.arduino_cli_path,
-                "upload",
-                "-p", port,
-                "--fqbn", self.get_board_fqbn(),
-                "--input-file", hex_file_path,
-                "--verify"
-            ]
-            
             if progress_callback:
                 progress_callback("info", "Starting firmware update...")
-                progress_callback("progress", 10)
-            
-            # Execute upload
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                universal_newlines=True
-            )
-            
-            # Monitor progress
-            while process.poll() is None:
+                progress_callback("progress", UPLOAD_PROGRESS_START)
+                
+            # arduino-cli upload does not pass the port to dfu-util either
+            selector = self.direct_uploader.unit_selector(recipe, port) if recipe else None
+            if selector is None and not self._exclusive_upload.acquire(blocking=False):
                 if progress_callback:
-                    progress_callback("progress", None)  # Indeterminate progress
-                time.sleep(0.5)
-            
-            stdout, stderr = process.communicate()
+                    progress_callback("info", "Waiting for another unit's upload (tool cannot select a unit)...")
+                self._exclusive_upload.acquire()
+            try:
+                # Prepare upload command
+                if recipe:
+                    cmd = self.direct_uploader.prepare_upload(recipe, image, port, build_dir,
+                                                              self.dry_run, selector)
+                else:
+                    cmd = [
+                        self.arduino_cli_path,
+                        "upload",
+                        "-p", port,
+                        "--fqbn", self.get_board_fqbn(),
+                        "--input-file", image.source_path,
+                        "--verify"
+                    ]
+                    
+                if self.dry_run:
+                    if progress_callback:
+                        progress_callback("info", "Dry run: " + subprocess.list2cmdline(cmd))
+                        progress_callback("success", "Dry run complete, nothing was flashed")
+                    return True
+                
+                returncode, output_tail = self._run_upload(cmd, progress_callback)
+            finally:
+                if selector is None:
+                    self._exclusive_upload.release()
             
-            if process.returncode == 0:
+            if returncode == 0:
                 if progress_callback:
                     progress_callback("progress", 100)
                     progress_callback("success", "Firmware update completed successfully!")
                 return True
             else:
-                error_msg = stderr or stdout or "Unknown error"
+                error_msg = "\n".join(output_tail) or "Unknown error"
                 if progress_callback:
                     progress_callback("error", f"Upload failed: {error_msg}")
                 return False
@@ -125,10 +207,144 @@ class FirmwareUpdater:
                 progress_callback("error", f"Update failed: {str(e)}")
             return False
         finally:
-            self.is_updating = False
+            shutil.rmtree(build_dir, ignore_errors=True)
+            self._set_uploading(False)
+            
+    def _set_uploading(self, active: bool):
+        """Track concurrent uploads so is_updating stays true until all finish"""
+        with self._upload_lock:
+            self._active_uploads += 1 if active else -1
+            self.is_updating = self._active_uploads > 0
+            
+    def _run_upload(self, cmd: List[str], progress_callback: Optional[Callable] = None) -> tuple:
+        """
+        Run an upload tool, streaming its output as it arrives
+        
+        Tools redraw their progress bar with carriage returns, so output is
+        split on both CR and LF and every percentage seen is forwarded.
+        
+        Returns:
+            (return code, last few output lines for error reporting)
+        """
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
+        )
+        
+        tail: List[str] = []
+        last_percent = -1
+        pending = b""
+        while True:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                break
+            pending += chunk
+            *lines, pending = re.split(rb"[\r\n]", pending)
+            for raw in lines:
+                line = raw.decode("utf-8", errors="replace").strip()
+                if not line:
+                    continue
+                match = PERCENT_PATTERN.search(line)
+                if match:
+                    percent = min(int(match.group(1)), 100)
+                    if percent != last_percent and progress_callback:
+                        last_percent = percent
+                        span = UPLOAD_PROGRESS_END - UPLOAD_PROGRESS_START
+                        progress_callback("progress", UPLOAD_PROGRESS_START + percent * span // 100)
+                else:
+                    tail = (tail + [line])[-5:]
+                    
+        process.stdout.close()
+        if pending.strip():
+            tail = (tail + [pending.decode("utf-8", errors="replace").strip()])[-5:]
+        return process.wait(), tail
+        
+    def flash_fleet(self, hex_file_path: str, ports: List[str],
+                    progress_callback: Optional[Callable] = None,
+                    max_workers: int = 4, retries: int = 2,
+                    check_installed: bool = False) -> Dict[str, Dict]:
+        """
+        Flash the same firmware to several PDMs in parallel
+        
+        Args:
+            hex_file_path: Path to firmware .hex file
+            ports: Ports of the units to update
+            progress_callback: Called as callback(port, msg_type, message),
+                               from worker threads
+            max_workers: Number of simultaneous uploads
+            retries: Extra attempts for a unit whose upload fails
+            check_installed: Ask each unit for its build id first and skip
+                             units that already run the image (opt-in)
+                             
+        Returns:
+            Summary dict keyed by port with "result" ("updated", "skipped",
+            "dry_run", "failed"), "attempts", "seconds" and "error"
+        """
+        def unit_callback(port):
+            if not progress_callback:
+                return None
+            return lambda msg_type, message: progress_callback(port, msg_type, message)
+            
+        image = self._load_image(hex_file_path, unit_callback(ports[0]) if ports else None)
+        if image is None:
+            return {port: {"result": "failed", "attempts": 0, "seconds": 0.0,
+                           "error": "Invalid firmware file"} for port in ports}
+                           
+        def flash_unit(port: str) -> Dict:
+            callback = unit_callback(port)
+            start = time.time()
+            build_id = read_device_build_id(port) if check_installed else None
+            
+            errors = []
+            def record_error(msg_type, message):
+                if msg_type == "error":
+                    errors.append(message)
+                elif callback:
+                    callback(msg_type, message)
+                    
+            for attempt in range(1, retries + 2):
+                if attempt > 1 and callback:
+                    callback("info", f"Retrying (attempt {attempt} of {retries + 1})...")
+                    time.sleep(2.0)  # Let the bootloader port re-enumerate
+                if self._flash_image(image, port, record_error, build_id, check_installed):
+                    if check_installed and self.image_index.is_installed(image, build_id):
+                        result = "skipped"
+                    else:
+                        result = "dry_run" if self.dry_run else "updated"
+                    return {"result": result, "attempts": attempt,
+                            "seconds": time.time() - start, "error": None}
+                    
+            if callback:
+                callback("error", errors[-1] if errors else "Upload failed")
+            return {"result": "failed", "attempts": retries + 1,
+                    "seconds": time.time() - start, "error": errors[-1] if errors else None}
+                    
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            results = dict(zip(ports, pool.map(flash_unit, ports)))
+        return results
+        
+    @staticmethod
+    def format_fleet_summary(results: Dict[str, Dict]) -> str:
+        """One line per unit plus totals, for display or logging"""
+        lines = []
+        for port, result in results.items():
+            line = f"{port}: {result['result']} ({result['attempts']} attempt(s), {result['seconds']:.1f} s)"
+            if result["error"]:
+                line += f" - {result['error']}"
+            lines.append(line)
+        counts = {key: sum(1 for r in results.values() if r["result"] == key)
+                  for key in ("updated", "skipped", "dry_run", "failed")}
+        totals = f"Updated {counts['updated']}, skipped {counts['skipped']}, failed {counts['failed']}"
+        if counts["dry_run"]:
+            totals += f", dry run {counts['dry_run']} (not flashed)"
+        lines.append(totals)
+        return "\n".join(lines)
     
     def update_firmware_async(self, hex_file_path: str, port: str,
-                             progress_callback: Optional[Callable] = None) -> threading.Thread:
+                             progress_callback: Optional[Callable] = None,
+                             device_build_id: Optional[str] = None,
+                             skip_installed: bool = False) -> threading.Thread:
         """
         Update firmware asynchronously
         
@@ -137,7 +353,7 @@ class FirmwareUpdater:
         """
         thread = threading.Thread(
             target=self.update_firmware,
-            args=(hex_file_path, port, progress_callback),
+            args=(hex_file_path, port, progress_callback, device_build_id, skip_installed),
             daemon=True
         )
         thread.start()
@@ -151,25 +367,20 @@ class FirmwareUpdater:
             hex_file_path: Path to hex file
             
         Returns:
-            True if file appears to be a valid Intel HEX file
+            True if every record parses with a valid checksum and the file
+            ends with an EOF record
         """
         try:
-            with open(hex_file_path, 'r') as f:
-                first_line = f.readline().strip()
-                
-            # Intel HEX files start with ':'
-            if not first_line.startswith(':'):
-                return False
-                
-            # Check for reasonable file size (should be 10KB - 2MB for Arduino)
-            file_size = os.path.getsize(hex_file_path)
-            if file_size < 1000 or file_size > 2000000:
-                return False
-                
-            return True
+            image = parse_hex_file(hex_file_path)
+        except (OSError, HexFormatError):
+            return False
             
-        except Exception:
+        # Anything under 1 KB cannot be a complete PDM firmware
+        if image.size < 1000:
             return False
+            
+        self.image_index.add(image)
+        return True
     
     def get_arduino_cli_version(self) -> Optional[str]:
         """Get Arduino CLI version info"""
@@ -190,4 +401,28 @@ class FirmwareUpdater:
                 return None
                 
         except Exception:
-            return None
\ No newline at end of file
+            return None
+
+
+def read_device_build_id(port: str, timeout: float = 4.0) -> Optional[str]:
+    """
+    Ask a PDM for its build id (VERSION command) without a full connection
+    
+    Returns:
+        Build id string, or None if the unit does not answer
+    """
+    try:
+        import serial
+        with serial.Serial(port, 115200, timeout=0.2) as ser:
+            time.sleep(2)  # Opening the port resets the board
+            ser.reset_input_buffer()
+            ser.write(b"VERSION\r\n")
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                line = ser.readline().decode("utf-8", errors="ignore").strip()
+                match = re.match(r"VERSION\s+\S+\s+build=(.+)", line)
+                if match:
+                    return match.group(1).strip()
+    except Exception:
+        pass
+    return None
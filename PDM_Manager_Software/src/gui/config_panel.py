@@ -9,6 +9,8 @@ from tkinter import messagebox
 from typing import Optional, Dict, Any, Callable
 import threading
 
+from command_scheduler import CONFIG
+
 class ConfigurationPanel:
     """PDM Configuration Interface"""
     
@@ -34,7 +36,9 @@ class ConfigurationPanel:
             "can_speed": 1000,
             "pdm_node_id": 0x15,
             "keypad_node_id": 0x15,
-            "digital_out_id": 0x680
+            "digital_out_id": 0x680,
+            "telemetry_rate": 4,
+            "telemetry_mode": "LEGACY"
         }
         
         # Configuration widgets
@@ -330,6 +334,34 @@ class ConfigurationPanel:
         ctk.CTkLabel(can_grid, text="(hex)").grid(row=3, column=2, padx=5, pady=5, sticky="w")
         
         self.config_widgets["digital_out_id"] = digital_out_var
+        
+        # Telemetry rate and frame set
+        ctk.CTkLabel(can_grid, text="Telemetry Rate:", font=ctk.CTkFont(weight="bold")).grid(
+            row=4, column=0, padx=10, pady=5, sticky="w"
+        )
+        
+        telemetry_rate_var = tk.IntVar(value=self.config_data["telemetry_rate"])
+        telemetry_rate_entry = ctk.CTkEntry(can_grid, textvariable=telemetry_rate_var, width=80)
+        telemetry_rate_entry.grid(row=4, column=1, padx=5, pady=5)
+        
+        ctk.CTkLabel(can_grid, text="Hz").grid(row=4, column=2, padx=5, pady=5, sticky="w")
+        
+        self.config_widgets["telemetry_rate"] = telemetry_rate_var
+        
+        ctk.CTkLabel(can_grid, text="Telemetry Frames:", font=ctk.CTkFont(weight="bold")).grid(
+            row=5, column=0, padx=10, pady=5, sticky="w"
+        )
+        
+        telemetry_mode_var = tk.StringVar(value=self.config_data["telemetry_mode"])
+        telemetry_mode_combo = ctk.CTkComboBox(
+            can_grid,
+            variable=telemetry_mode_var,
+            values=["LEGACY", "EXTENDED", "BOTH"],
+            width=120
+        )
+        telemetry_mode_combo.grid(row=5, column=1, padx=5, pady=5)
+        
+        self.config_widgets["telemetry_mode"] = telemetry_mode_var
     
     def setup_control_buttons(self):
         """Setup control buttons"""
@@ -402,7 +434,8 @@ class ConfigurationPanel:
         def load_thread():
             try:
                 # Get current configuration by sending CONFIG command
-                response = self.pdm_comm.send_command("CONFIG")
+                with self.pdm_comm.scheduler.priority(CONFIG):
+                    response = self.pdm_comm.send_command("CONFIG")
                 
                 if response:
                     # Parse configuration response
@@ -449,6 +482,8 @@ class ConfigurationPanel:
         self.config_widgets["pdm_node_id"].set(f"0x{self.config_data['pdm_node_id']:02X}")
         self.config_widgets["keypad_node_id"].set(f"0x{self.config_data['keypad_node_id']:02X}")
         self.config_widgets["digital_out_id"].set(f"0x{self.config_data['digital_out_id']:03X}")
+        self.config_widgets["telemetry_rate"].set(self.config_data["telemetry_rate"])
+        self.config_widgets["telemetry_mode"].set(self.config_data["telemetry_mode"])
     
     def apply_configuration(self):
         """Apply configuration to device"""
@@ -463,7 +498,7 @@ class ConfigurationPanel:
         self.config_status_label.configure(text="Applying configuration to device...")
         self.apply_btn.configure(state="disabled")
         
-        def apply_thread():
+        def apply_commands():
             try:
                 success_count = 0
                 total_commands = 0
@@ -508,7 +543,9 @@ class ConfigurationPanel:
                         f"CANSPEED {can_speed}",
                         f"PDMNODE {pdm_node:02X}",
                         f"KEYPADNODE {keypad_node:02X}",
-                        f"DIGITALOUT {digital_out:03X}"
+                        f"DIGITALOUT {digital_out:03X}",
+                        f"TELRATE {self.config_widgets['telemetry_rate'].get()}",
+                        f"TELMODE {self.config_widgets['telemetry_mode'].get()}"
                     ]
                     
                     for cmd in can_commands:
@@ -531,6 +568,11 @@ class ConfigurationPanel:
             finally:
                 self.main_frame.after(0, lambda: self.apply_btn.configure(state="normal"))
                 
+        def apply_thread():
+            # One command per transaction, so user actions can run in between
+            with self.pdm_comm.scheduler.priority(CONFIG):
+                apply_commands()
+                
         threading.Thread(target=apply_thread, daemon=True).start()
     
     def validate_configuration(self) -> bool:
@@ -579,6 +621,14 @@ class ConfigurationPanel:
                 messagebox.showerror("Validation Error", "CAN speed must be 125, 250, 500, or 1000 kbps")
                 return False
             
+            if not (1 <= self.config_widgets["telemetry_rate"].get() <= 50):
+                messagebox.showerror("Validation Error", "Telemetry rate must be between 1 and 50 Hz")
+                return False
+                
+            if self.config_widgets["telemetry_mode"].get() not in ("LEGACY", "EXTENDED", "BOTH"):
+                messagebox.showerror("Validation Error", "Telemetry frames must be LEGACY, EXTENDED or BOTH")
+                return False
+            
             # Validate hex values
             int(self.config_widgets["pdm_node_id"].get(), 16)
             int(self.config_widgets["keypad_node_id"].get(), 16)
@@ -679,5 +729,7 @@ class ConfigurationPanel:
             "can_speed": 1000,
             "pdm_node_id": 0x15,
             "keypad_node_id": 0x15,
-            "digital_out_id": 0x680
+            "digital_out_id": 0x680,
+            "telemetry_rate": 4,
+            "telemetry_mode": "LEGACY"
         }
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Link Dashboard for PDM Manager
+Live serial link and GUI performance figures for the Diagnostics tab
+"""
+
+import customtkinter as ctk
+from tkinter import ttk
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List
+
+from command_scheduler import POLL
+from profiling import PROFILE_DIR, start_profile
+
+REFRESH_MS = 1000
+CAPTURE_SECONDS = 10
+PROFILE_SECONDS = 10
+
+
+class LinkDashboard:
+    """Throughput, latency, queue and UI loop figures, refreshed while visible"""
+
+    def __init__(self, parent_frame, pdm_comm, ui_monitor, is_visible: Callable[[], bool]):
+        self.parent_frame = parent_frame
+        self.pdm_comm = pdm_comm
+        self.ui_monitor = ui_monitor
+        self.is_visible = is_visible
+
+        self.capture_samples: List[Dict] = []
+        self.capture_end = 0.0
+        self._shown_text: Dict[str, str] = {}
+
+        self.setup_widgets()
+        self.parent_frame.after(REFRESH_MS, self.refresh)
+
+    def setup_widgets(self):
+        """Create dashboard widgets"""
+        frame = ctk.CTkFrame(self.parent_frame)
+        frame.pack(fill="x", padx=20, pady=10)
+
+        header = ctk.CTkFrame(frame)
+        header.pack(fill="x", padx=10, pady=5)
+
+        ctk.CTkLabel(
+            header,
+            text="Link Performance",
+            font=ctk.CTkFont(size=16, weight="bold")
+        ).pack(side="left", padx=10)
+
+        self.capture_btn = ctk.CTkButton(
+            header,
+            text=f"Capture {CAPTURE_SECONDS} s Snapshot",
+            width=160,
+            command=self.start_capture
+        )
+        self.capture_btn.pack(side="right", padx=5)
+
+        self.profile_btn = ctk.CTkButton(
+            header,
+            text=f"Profile Threads {PROFILE_SECONDS} s",
+            width=150,
+            command=self.start_profile
+        )
+        self.profile_btn.pack(side="right", padx=5)
+
+        self.capture_label = ctk.CTkLabel(header, text="")
+        self.capture_label.pack(side="right", padx=10)
+
+        self.labels = {}
+        for key in ("throughput", "reader", "buffers", "ui", "errors"):
+            label = ctk.CTkLabel(frame, text="--", anchor="w", justify="left")
+            label.pack(fill="x", padx=20, pady=1)
+            self.labels[key] = label
+
+        columns = ("count", "p50", "p95", "max", "timeouts")
+        self.latency_table = ttk.Treeview(frame, columns=columns, height=5)
+        self.latency_table.heading("#0", text="Command")
+        self.latency_table.column("#0", width=140)
+        for column, title in zip(columns, ("Count", "p50 ms", "p95 ms", "Max ms", "Timeouts")):
+            self.latency_table.heading(column, text=title)
+            self.latency_table.column(column, width=90, anchor="e")
+        self.latency_table.pack(fill="x", padx=20, pady=(5, 10))
+
+    def refresh(self):
+        """Update the figures once per REFRESH_MS while visible or capturing"""
+        capturing = bool(self.capture_end)
+        if self.is_visible() or capturing:
+            self.ui_monitor.start_heartbeat()
+            sample = self.take_sample()
+            self.show(sample)
+            if capturing:
+                self.capture_samples.append(sample)
+                remaining = self.capture_end - time.time()
+                if remaining <= 0:
+                    self.finish_capture()
+                else:
+                    self.capture_label.configure(text=f"Capturing... {remaining:.0f} s")
+        else:
+            self.ui_monitor.stop_heartbeat()
+        self.parent_frame.after(REFRESH_MS, self.refresh)
+
+    def take_sample(self) -> Dict:
+        return {
+            "t": round(time.time(), 3),
+            "link": self.pdm_comm.metrics.snapshot(),
+            "ui": self.ui_monitor.snapshot(),
+            "scheduler": self.pdm_comm.scheduler.get_stats(),
+            "subscribers": self.pdm_comm.events.get_stats()
+        }
+
+    def show(self, sample: Dict):
+        """Render a sample, touching only widgets whose text changed"""
+        link = sample["link"]
+        rates = link["rates"]
+        reader = link["reader_us"]
+        gauges = link["gauges"]
+        counters = link["counters"]
+        ui = sample["ui"]
+        event_drops = sum(s["dropped"] for s in sample["subscribers"])
+
+        self.set_text("throughput",
+                      f"Serial: RX {rates['rx_bytes_per_s']:.0f} B/s ({rates['rx_lines_per_s']:.0f} lines/s)"
+                      f"  |  TX {rates['tx_bytes_per_s']:.0f} B/s ({rates['tx_lines_per_s']:.0f} lines/s)")
+        self.set_text("reader",
+                      f"Reader thread: {reader['avg']:.0f} µs avg, {reader['p95']:.0f} µs p95, "
+                      f"{reader['max']:.0f} µs max per line  |  unread in OS buffer: "
+                      f"{gauges.get('rx_backlog_bytes', 0)} B")
+        self.set_text("buffers",
+                      f"Reply queue: {gauges.get('reply_queue_depth', 0)} (high {gauges.get('reply_queue_high_water', 0)}, "
+                      f"dropped {gauges.get('reply_lines_dropped', 0)})  |  log dropped {gauges.get('log_lines_dropped', 0)}"
+                      f"  |  scheduler queued {gauges.get('scheduler_queued', 0)}  |  event drops {event_drops}")
+        self.set_text("ui",
+                      f"GUI: backlog {ui['pending']} (max {ui['max_pending']}), {ui['dispatched']} updates, "
+                      f"wait {ui['avg_delay_ms']:.1f}/{ui['max_delay_ms']:.1f} ms, "
+                      f"run {ui['avg_run_ms']:.2f}/{ui['max_run_ms']:.1f} ms (avg/max), "
+                      f"timer lag {ui['tick_lag_ms']:.0f} ms")
+        self.set_text("errors",
+                      f"Timeouts {sum(link['timeouts'].values())}  |  parse failures "
+                      f"{sum(link['parse_failures'].values())}  |  event gaps {counters['event_gaps']}  |  "
+                      f"reconnects {counters['reconnects']}  |  read/write errors "
+                      f"{counters['read_errors']}/{counters['write_errors']}")
+
+        for name, values in sorted(link["commands"].items()):
+            row = (values["count"], f"{values['p50_ms']:.1f}", f"{values['p95_ms']:.1f}",
+                   f"{values['max_ms']:.1f}", values["timeouts"])
+            if self.latency_table.exists(name):
+                if tuple(str(v) for v in self.latency_table.item(name, "values")) != tuple(str(v) for v in row):
+                    self.latency_table.item(name, values=row)
+            else:
+                self.latency_table.insert("", "end", iid=name, text=name, values=row)
+
+    def set_text(self, key: str, text: str):
+        if self._shown_text.get(key) != text:
+            self._shown_text[key] = text
+            self.labels[key].configure(text=text)
+
+    # -------------------------------------------------------------------------
+    # Thread profiling
+
+    def start_profile(self):
+        """Sample the reader, scheduler and UI thread stacks for PROFILE_SECONDS"""
+        def on_done(path: str):
+            self.parent_frame.after(0, lambda: self.on_profile_written(path))
+
+        if start_profile(self.pdm_comm, PROFILE_SECONDS, on_done=on_done) is None:
+            self.capture_label.configure(text="A profile is already running")
+            return
+        self.profile_btn.configure(state="disabled")
+        self.capture_label.configure(text=f"Profiling for {PROFILE_SECONDS} s...")
+
+    def on_profile_written(self, path: str):
+        self.capture_label.configure(text=f"Profile saved to {os.path.basename(path)}" if path
+                                     else "Profile could not be saved")
+        self.profile_btn.configure(state="normal")
+
+    # -------------------------------------------------------------------------
+    # Timed capture
+
+    def start_capture(self):
+        """Record one sample per second for CAPTURE_SECONDS, then write them to disk"""
+        if self.capture_end:
+            return
+        self.capture_samples = [self.take_sample()]
+        self.capture_end = time.time() + CAPTURE_SECONDS
+        self.capture_btn.configure(state="disabled")
+        self.capture_label.configure(text=f"Capturing... {CAPTURE_SECONDS} s")
+
+    def finish_capture(self):
+        samples = self.capture_samples
+        self.capture_samples = []
+        self.capture_end = 0.0
+        port = self.pdm_comm.port_name
+
+        def write_thread():
+            loop_stats = None
+            if self.pdm_comm.is_connected:
+                with self.pdm_comm.scheduler.priority(POLL):
+                    loop_stats = self.pdm_comm.get_loop_stats(reset=False)
+            try:
+                path = self.write_capture(port, samples, loop_stats)
+                message = f"Saved {os.path.basename(path)}"
+            except OSError as e:
+                message = f"Save failed: {e}"
+            self.parent_frame.after(0, lambda: self.on_capture_written(message))
+
+        threading.Thread(target=write_thread, daemon=True).start()
+
+    def on_capture_written(self, message: str):
+        self.capture_label.configure(text=message)
+        self.capture_btn.configure(state="normal")
+
+    @staticmethod
+    def write_capture(port: str, samples: List[Dict], loop_stats) -> str:
+        """Write samples plus counter deltas over the window as JSON"""
+        first, last = samples[0], samples[-1]
+        elapsed = max(last["t"] - first["t"], 1e-6)
+        deltas = {key: last["link"]["counters"][key] - first["link"]["counters"][key]
+                  for key in first["link"]["counters"]}
+        capture = {
+            "port": port,
+            "start": first["t"],
+            "seconds": round(elapsed, 3),
+            "counter_deltas": deltas,
+            "rates": {f"{key}_per_s": round(value / elapsed, 1)
+                      for key, value in deltas.items() if key.endswith(("_bytes", "_lines"))},
+            "loop_stats": loop_stats,
+            "samples": samples
+        }
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = os.path.basename(port) or "offline"
+        path = os.path.join(PROFILE_DIR, f"link_{name}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, "w") as f:
+            json.dump(capture, f, indent=1)
+        return path
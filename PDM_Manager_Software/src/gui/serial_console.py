@@ -0,0 +1,319 @@
+"""
+Serial Console for PDM Manager
+Raw serial log view that keeps up with LOG 2 CAN traffic
+
+Received lines reach the console through a polled event bus subscription
+(a fixed-size ring the reader appends to). Once per frame the console takes
+the whole batch, files each line into a per-category history, trims old
+lines and redraws only the rows that fit in the window. Category filters
+combine the per-category histories by sequence number, so changing a filter
+never rescans the full history.
+"""
+
+import customtkinter as ctk
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+import bisect
+import heapq
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import event_bus
+
+FRAME_MS = 50              # Batch interval
+HISTORY_LINES = 50000      # Lines kept across all categories
+FEED_LINES = 16384         # Reader-side ring; lines beyond it between frames are dropped
+
+# (prefix, category, colour); lines matching none are "OTHER"
+CATEGORY_PREFIXES = (
+    ("[STATE] ", "STATE", "#1f6aa5"),
+    ("[INPUT] ", "INPUT", "#2e7d32"),
+    ("[CAN-TX]", "CAN-TX", "#8e44ad"),
+    ("[CAN-RX]", "CAN-RX", "#b9770e"),
+)
+CATEGORIES = tuple(category for _, category, _ in CATEGORY_PREFIXES) + ("OTHER",)
+
+
+class ConsoleHistory:
+    """Recent lines split by category, addressable as one filtered sequence"""
+
+    def __init__(self, capacity: int = HISTORY_LINES):
+        self.capacity = capacity
+        self.next_seq = 0
+        self.trimmed = 0  # Lines dropped from the oldest end
+        # Per category: parallel lists of sequence numbers and lines
+        self.seqs: Dict[str, List[int]] = {category: [] for category in CATEGORIES}
+        self.lines: Dict[str, List[str]] = {category: [] for category in CATEGORIES}
+        self._trim_at = capacity + capacity // 4
+
+    def clear(self):
+        for category in CATEGORIES:
+            self.seqs[category].clear()
+            self.lines[category].clear()
+        self._trim_at = self.next_seq + self.capacity + self.capacity // 4
+
+    def extend(self, lines: Iterable[str]):
+        """Append a batch of lines"""
+        seqs, texts = self.seqs, self.lines
+        seq = self.next_seq
+        for line in lines:
+            category = "OTHER"
+            if line.startswith("["):
+                for prefix, name, _ in CATEGORY_PREFIXES:
+                    if line.startswith(prefix):
+                        category = name
+                        break
+            seqs[category].append(seq)
+            texts[category].append(line)
+            seq += 1
+        self.next_seq = seq
+        if seq >= self._trim_at:
+            self._trim()
+
+    def _trim(self):
+        """Drop lines older than the newest capacity lines (amortised: every capacity/4 lines)"""
+        floor = self.next_seq - self.capacity
+        for category in CATEGORIES:
+            seqs = self.seqs[category]
+            cut = bisect.bisect_left(seqs, floor)
+            if cut:
+                del seqs[:cut]
+                del self.lines[category][:cut]
+                self.trimmed += cut
+        self._trim_at = self.next_seq + self.capacity // 4
+
+    def count(self, categories: Tuple[str, ...]) -> int:
+        return sum(len(self.seqs[category]) for category in categories)
+
+    def rank(self, categories: Tuple[str, ...], seq: int) -> int:
+        """Position in the filtered sequence of the first line at or after seq"""
+        return sum(bisect.bisect_left(self.seqs[category], seq) for category in categories)
+
+    def window(self, categories: Tuple[str, ...], start: int, rows: int) -> List[Tuple[int, str, str]]:
+        """(seq, category, line) for filtered positions start .. start+rows"""
+        if rows <= 0:
+            return []
+        if len(categories) == 1:
+            category = categories[0]
+            return [(seq, category, line) for seq, line in
+                    zip(self.seqs[category][start:start + rows], self.lines[category][start:start + rows])]
+
+        # Smallest sequence number with exactly `start` filtered lines before it
+        lo = min((self.seqs[category][0] for category in categories if self.seqs[category]),
+                 default=self.next_seq)
+        hi = self.next_seq
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.rank(categories, mid) < start:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        streams = []
+        for category in categories:
+            seqs = self.seqs[category]
+            i = bisect.bisect_left(seqs, lo)
+            lines = self.lines[category]
+            streams.append([(seq, category, line) for seq, line in zip(seqs[i:i + rows], lines[i:i + rows])])
+        merged = heapq.merge(*streams)
+        return [item for _, item in zip(range(rows), merged)]
+
+
+class SerialConsole:
+    """Virtualised console pane: batched feed, filtered, drawing visible rows only"""
+
+    def __init__(self, parent_frame, pdm_comm, is_visible: Callable[[], bool]):
+        self.parent_frame = parent_frame
+        self.pdm_comm = pdm_comm
+        self.is_visible = is_visible
+
+        self.history = ConsoleHistory()
+        self.feed = pdm_comm.events.subscribe(None, topics=(event_bus.RAW_LINE,),
+                                              maxsize=FEED_LINES, name="console")
+        self.follow = True
+        self.anchor_seq = 0  # First visible line while not following
+        self.dirty = True
+        self._shown = None
+        self._rate_base = (time.time(), 0)
+        self._rate = 0.0
+
+        self.setup_widgets()
+        self.parent_frame.after(FRAME_MS, self.tick)
+
+    def setup_widgets(self):
+        """Create console widgets"""
+        toolbar = ctk.CTkFrame(self.parent_frame)
+        toolbar.pack(fill="x", padx=10, pady=(10, 5))
+
+        self.filters: Dict[str, tk.BooleanVar] = {}
+        for category in CATEGORIES:
+            var = tk.BooleanVar(value=True)
+            ctk.CTkCheckBox(
+                toolbar,
+                text=category.title() if category == "OTHER" else category,
+                variable=var,
+                width=80,
+                command=self.on_filter_changed
+            ).pack(side="left", padx=5)
+            self.filters[category] = var
+
+        ctk.CTkButton(toolbar, text="Clear", width=70, command=self.clear).pack(side="right", padx=5)
+        self.follow_btn = ctk.CTkButton(toolbar, text="Follow", width=70, state="disabled",
+                                        command=self.resume_follow)
+        self.follow_btn.pack(side="right", padx=5)
+
+        self.log_level = tk.StringVar(value="Log level")
+        ctk.CTkOptionMenu(
+            toolbar,
+            values=["LOG 0", "LOG 1", "LOG 2"],
+            variable=self.log_level,
+            width=90,
+            command=self.set_log_level
+        ).pack(side="right", padx=5)
+
+        body = ctk.CTkFrame(self.parent_frame)
+        body.pack(fill="both", expand=True, padx=10, pady=5)
+
+        self.font = tkfont.Font(family="Courier", size=10)
+        self.text = tk.Text(body, font=self.font, wrap="none", height=1, state="disabled",
+                            borderwidth=0, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(body, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.text.pack(side="left", fill="both", expand=True)
+        for _, category, colour in CATEGORY_PREFIXES:
+            self.text.tag_configure(category, foreground=colour)
+
+        self.text.bind("<MouseWheel>", lambda e: self.scroll_lines(-3 if e.delta > 0 else 3))
+        self.text.bind("<Button-4>", lambda e: self.scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda e: self.scroll_lines(3))
+        self.text.bind("<Configure>", lambda e: self.mark_dirty())
+
+        self.status_label = ctk.CTkLabel(self.parent_frame, text="", anchor="w")
+        self.status_label.pack(fill="x", padx=20, pady=(0, 5))
+
+    # -------------------------------------------------------------------------
+    # Feed
+
+    def tick(self):
+        """Take the batch received since the last frame and redraw if needed"""
+        events = self.feed.take()
+        if events:
+            self.history.extend([event.data for event in events])
+            self.dirty = True
+        if self.is_visible():
+            if self.dirty:
+                self.render()
+            self.update_status()
+        self.parent_frame.after(FRAME_MS, self.tick)
+
+    # -------------------------------------------------------------------------
+    # View
+
+    def categories(self) -> Tuple[str, ...]:
+        return tuple(category for category in CATEGORIES if self.filters[category].get())
+
+    def visible_rows(self) -> int:
+        height = self.text.winfo_height()
+        return max(1, height // self.font.metrics("linespace")) if height > 1 else 40
+
+    def view_start(self, categories: Tuple[str, ...], total: int, rows: int) -> int:
+        if self.follow:
+            return max(0, total - rows)
+        return min(self.history.rank(categories, self.anchor_seq), max(0, total - rows))
+
+    def render(self):
+        """Draw the visible window, skipping Tk calls when nothing on screen changed"""
+        self.dirty = False
+        categories = self.categories()
+        total = self.history.count(categories)
+        rows = self.visible_rows()
+        start = self.view_start(categories, total, rows)
+        window = self.history.window(categories, start, rows)
+
+        shown = (window[0][0], window[-1][0], len(window)) if window else None
+        if shown != self._shown:
+            self._shown = shown
+            chunks = []
+            for _, category, line in window:
+                chunks.extend((line + "\n", category))
+            self.text.configure(state="normal")
+            self.text.delete("1.0", "end")
+            if chunks:
+                self.text.insert("1.0", *chunks)
+            self.text.configure(state="disabled")
+
+        if total:
+            self.scrollbar.set(start / total, min(1.0, (start + len(window)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def scroll_to(self, start: int):
+        """Show filtered position start; reaching the end resumes following"""
+        categories = self.categories()
+        total = self.history.count(categories)
+        rows = self.visible_rows()
+        start = max(0, min(start, total - rows))
+        if start >= total - rows:
+            self.resume_follow()
+            return
+        window = self.history.window(categories, start, 1)
+        self.follow = False
+        self.anchor_seq = window[0][0] if window else 0
+        self.follow_btn.configure(state="normal")
+        self.render()
+
+    def scroll_lines(self, amount: int):
+        categories = self.categories()
+        total = self.history.count(categories)
+        rows = self.visible_rows()
+        self.scroll_to(self.view_start(categories, total, rows) + amount)
+
+    def on_scrollbar(self, action: str, *args):
+        categories = self.categories()
+        total = self.history.count(categories)
+        rows = self.visible_rows()
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * total))
+        elif action == "scroll":
+            step = rows if args[1] == "pages" else 1
+            self.scroll_to(self.view_start(categories, total, rows) + int(args[0]) * step)
+
+    def resume_follow(self):
+        self.follow = True
+        self.follow_btn.configure(state="disabled")
+        self.render()
+
+    def on_filter_changed(self):
+        self._shown = None
+        self.render()
+
+    def clear(self):
+        self.history.clear()
+        self._shown = None
+        self.resume_follow()
+
+    def update_status(self):
+        now = time.time()
+        base_time, base_count = self._rate_base
+        if now - base_time >= 1.0:
+            self._rate = (self.history.next_seq - base_count) / (now - base_time)
+            self._rate_base = (now, self.history.next_seq)
+        text = (f"{self.history.count(CATEGORIES)} lines kept, {self._rate:.0f} lines/s, "
+                f"{self.feed.dropped} dropped before display"
+                + ("" if self.follow else "  |  paused (scrolled back)"))
+        if self.status_label.cget("text") != text:
+            self.status_label.configure(text=text)
+
+    # -------------------------------------------------------------------------
+    # Device
+
+    def set_log_level(self, choice: str):
+        """Send LOG n so the firmware emits state and/or CAN log lines"""
+        if not self.pdm_comm.is_connected:
+            return
+        threading.Thread(target=lambda: self.pdm_comm.send_command(choice), daemon=True).start()
@@ -0,0 +1,90 @@
+"""
+UI Monitor for PDM Manager
+Measures the Tk event loop: callbacks posted from background threads
+(backlog, queue delay, run time) and how late timer ticks fire
+"""
+
+import threading
+import time
+from typing import Callable, Dict
+
+
+class UIMonitor:
+    """Wraps root.after(0, ...) posting with backlog and timing counters"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self.pending = 0
+        self._reset_window()
+        self._heartbeat_ms = 0
+        self._heartbeat_due = 0.0
+
+    def _reset_window(self):
+        self.max_pending = self.pending
+        self.dispatched = 0
+        self.delay_total = 0.0
+        self.delay_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+        self.tick_lag_max = 0.0
+
+    def post(self, callback: Callable[[], None]):
+        """Run callback on the Tk thread (safe to call from any thread)"""
+        posted = time.perf_counter()
+        with self._lock:
+            self.pending += 1
+            if self.pending > self.max_pending:
+                self.max_pending = self.pending
+        self.root.after(0, lambda: self._dispatch(callback, posted))
+
+    def _dispatch(self, callback: Callable[[], None], posted: float):
+        start = time.perf_counter()
+        try:
+            callback()
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.pending -= 1
+                self.dispatched += 1
+                self.delay_total += start - posted
+                self.delay_max = max(self.delay_max, start - posted)
+                self.run_total += end - start
+                self.run_max = max(self.run_max, end - start)
+
+    def start_heartbeat(self, interval_ms: int = 100):
+        """Measure timer lateness while something is watching (see stop_heartbeat)"""
+        if self._heartbeat_ms:
+            return
+        self._heartbeat_ms = interval_ms
+        self._heartbeat_due = time.perf_counter() + interval_ms / 1000
+        self.root.after(interval_ms, self._tick)
+
+    def stop_heartbeat(self):
+        self._heartbeat_ms = 0
+
+    def _tick(self):
+        if not self._heartbeat_ms:
+            return
+        now = time.perf_counter()
+        self.tick_lag_max = max(self.tick_lag_max, now - self._heartbeat_due)
+        self._heartbeat_due = now + self._heartbeat_ms / 1000
+        self.root.after(self._heartbeat_ms, self._tick)
+
+    def snapshot(self, reset: bool = True) -> Dict:
+        """Backlog and timings (ms) since the previous reset"""
+        with self._lock:
+            n = self.dispatched
+            stats = {
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "dispatched": n,
+                "avg_delay_ms": round(1000 * self.delay_total / n, 2) if n else 0.0,
+                "max_delay_ms": round(1000 * self.delay_max, 2),
+                "avg_run_ms": round(1000 * self.run_total / n, 3) if n else 0.0,
+                "max_run_ms": round(1000 * self.run_max, 2),
+                "tick_lag_ms": round(1000 * self.tick_lag_max, 1)
+            }
+            if reset:
+                self._reset_window()
+        return stats
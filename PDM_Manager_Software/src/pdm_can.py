@@ -0,0 +1,172 @@
+"""
+PDM CAN Module
+COB-IDs and payload layouts of the CAN frames the PDM sends and receives
+(see CANHandler.cpp), shared by the trace, offline and live CAN decoders
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_NODE_ID = 0x15  # Factory PDM and keypad node IDs
+
+# CANopen function codes (COB-ID = function code + node ID)
+NMT = 0x000             # Start node (PDM -> keypad)
+KEYPAD_PDO = 0x180      # Key states, byte 0 bits 0-3 (keypad -> PDM)
+KEYPAD_LED = 0x200      # LED colours (PDM -> keypad, 10 Hz)
+KEYPAD_BLINK = 0x300    # LED blink mask (PDM -> keypad, 10 Hz)
+TELEMETRY = 0x380       # Currents, temperature, faults, battery (PDM, TELRATE, 4 Hz default)
+TELEMETRY_EXT = 0x480   # Multiplexed high-resolution telemetry (PDM, TELMODE EXTENDED|BOTH)
+KEYPAD_BACKLIGHT = 0x500
+KEYPAD_SDO = 0x600      # Heartbeat enable (PDM -> keypad)
+HEARTBEAT = 0x700       # Boot-up (0x00) and operational (0x05) heartbeats
+
+FRAME_KINDS = {
+    KEYPAD_PDO: "keypad_pdo",
+    KEYPAD_LED: "led",
+    KEYPAD_BLINK: "led_blink",
+    TELEMETRY: "telemetry",
+    TELEMETRY_EXT: "telemetry_ext",
+    KEYPAD_BACKLIGHT: "backlight",
+    KEYPAD_SDO: "sdo",
+    HEARTBEAT: "heartbeat"
+}
+KIND_CODES = {kind: code for code, kind in FRAME_KINDS.items()}
+
+HEARTBEAT_STATES = {0x00: "BOOT", 0x04: "STOPPED", 0x05: "OPERATIONAL", 0x7F: "PRE-OPERATIONAL"}
+
+# Telemetry scaling (CANHandler::sendTelemetry)
+TELEMETRY_CURRENT_SCALE = 0.2    # A per bit, bytes 0-3
+TELEMETRY_BATTERY_SCALE = 0.001  # V per bit, bytes 6-7 little-endian
+
+# Extended telemetry: byte 0 selects the layout, byte 7 is a rolling counter
+MUX_CURRENTS = 0x01      # Four 12-bit currents in bytes 1-6
+MUX_STATES = 0x02        # On/overcurrent/undercurrent/thermal masks, input mode, link flags
+MUX_DIAGNOSTICS = 0x03   # Temperature, battery, longest loop (1 Hz)
+EXT_CURRENT_SCALE = 0.02         # A per bit
+EXT_TEMPERATURE_SCALE = 0.1      # degC per bit, signed
+INPUT_MODES = ("NONE", "DIGITAL", "KEYPAD", "DIGOUT")  # CANHandler InputMode order
+
+# Keypad LED bytes per colour (CANHandler::sendKeypadLEDStatus)
+LED_COLOURS = {(0, 0, 0): "OFF", (0, 1, 0): "GREEN", (0, 0, 1): "BLUE", (1, 1, 0): "AMBER", (1, 0, 0): "RED"}
+
+
+def classify(can_id: int) -> Tuple[str, int]:
+    """(kind, node) for a COB-ID; kind is "other" outside the PDM's frame set"""
+    if can_id == NMT:
+        return "nmt", 0
+    node = can_id & 0x7F
+    kind = FRAME_KINDS.get(can_id & 0x780) if can_id <= 0x7FF else None
+    return (kind, node) if kind and node else ("other", 0)
+
+
+def cob_id(kind: str, node: int = DEFAULT_NODE_ID) -> int:
+    return KIND_CODES[kind] + node
+
+
+def telemetry_faults(flags: int) -> List[List[str]]:
+    """Per-channel fault names from the telemetry fault byte (bits 8-11: thermal, extended only)"""
+    faults = []
+    for ch in range(4):
+        channel_faults = []
+        if flags & (1 << (ch + 4)):
+            channel_faults.append("OVERCURRENT")
+        if flags & (1 << ch):
+            channel_faults.append("UNDERCURRENT")
+        if flags & (1 << (ch + 8)):
+            channel_faults.append("THERMAL")
+        faults.append(channel_faults)
+    return faults
+
+
+def decode_telemetry(data: bytes) -> Optional[Dict]:
+    """Currents (A), temperature (degC), per-channel faults and battery (V)"""
+    if len(data) < 8:
+        return None
+    return {
+        "currents": [round(data[ch] * TELEMETRY_CURRENT_SCALE, 1) for ch in range(4)],
+        "temperature": float(data[4]),
+        "faults": telemetry_faults(data[5]),
+        "battery_voltage": round((data[6] | data[7] << 8) * TELEMETRY_BATTERY_SCALE, 3)
+    }
+
+
+def ext_currents(data: bytes) -> List[int]:
+    """Raw 12-bit counts from a MUX_CURRENTS payload (two channels per 3 bytes)"""
+    return [data[1] | (data[2] & 0x0F) << 8, data[2] >> 4 | data[3] << 4,
+            data[4] | (data[5] & 0x0F) << 8, data[5] >> 4 | data[6] << 4]
+
+
+def _mask(value: int) -> List[bool]:
+    return [bool(value & (1 << ch)) for ch in range(4)]
+
+
+def decode_telemetry_ext(data: bytes) -> Optional[Dict]:
+    """One extended telemetry frame; the fields depend on the mux byte"""
+    if len(data) < 8:
+        return None
+    mux = data[0]
+    fields = {"mux": mux, "counter": data[7]}
+    if mux == MUX_CURRENTS:
+        fields["currents"] = [round(raw * EXT_CURRENT_SCALE, 2) for raw in ext_currents(data)]
+    elif mux == MUX_STATES:
+        faults = []
+        for ch in range(4):
+            bit = 1 << ch
+            faults.append([name for name, mask in (("OVERCURRENT", data[2]), ("UNDERCURRENT", data[3]),
+                                                   ("THERMAL", data[4])) if mask & bit])
+        fields.update({
+            "active": _mask(data[1]),
+            "faults": faults,
+            "input_mode": INPUT_MODES[data[5]] if data[5] < len(INPUT_MODES) else f"0x{data[5]:02X}",
+            "can_ok": bool(data[6] & 0x01),
+            "digout_ok": not data[6] & 0x02,
+            "temp_sensor_error": bool(data[6] & 0x04)
+        })
+    elif mux == MUX_DIAGNOSTICS:
+        fields.update({
+            "temperature": round(int.from_bytes(data[1:3], "little", signed=True) * EXT_TEMPERATURE_SCALE, 1),
+            "battery_voltage": round((data[3] | data[4] << 8) * TELEMETRY_BATTERY_SCALE, 3),
+            "loop_max_us": data[5] | data[6] << 8
+        })
+    return fields
+
+
+def decode_keypad_pdo(data: bytes) -> Optional[Dict]:
+    if not data:
+        return None
+    return {"pressed": [bool(data[0] & (1 << ch)) for ch in range(4)]}
+
+
+def decode_led(data: bytes) -> Optional[Dict]:
+    if len(data) < 3:
+        return None
+    return {"leds": [LED_COLOURS.get(tuple((data[i] >> ch) & 1 for i in range(3)), "?")
+                     for ch in range(4)]}
+
+
+def decode_led_blink(data: bytes) -> Optional[Dict]:
+    if not data:
+        return None
+    return {"blink": [bool(data[0] & (1 << ch)) for ch in range(4)]}
+
+
+def decode_heartbeat(data: bytes) -> Optional[Dict]:
+    if not data:
+        return None
+    return {"state": HEARTBEAT_STATES.get(data[0], f"0x{data[0]:02X}")}
+
+
+DECODERS = {
+    "telemetry": decode_telemetry,
+    "telemetry_ext": decode_telemetry_ext,
+    "keypad_pdo": decode_keypad_pdo,
+    "led": decode_led,
+    "led_blink": decode_led_blink,
+    "heartbeat": decode_heartbeat
+}
+
+
+def decode_frame(can_id: int, data: bytes) -> Tuple[str, int, Optional[Dict]]:
+    """(kind, node, fields); fields is None for frames without a payload decoder"""
+    kind, node = classify(can_id)
+    decoder = DECODERS.get(kind)
+    return kind, node, decoder(data) if decoder else None
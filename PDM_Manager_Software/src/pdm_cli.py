@@ -0,0 +1,411 @@
+"""
+PDM Command Line Client
+Headless access to one or more PDMs without starting the GUI
+
+Only the standard library is imported at startup; the serial layer is
+imported when a command needs it, so 'pdm --help' and argument errors
+return immediately.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+
+def _connect(port: str):
+    """Open a PDMCommunication on port, or raise RuntimeError"""
+    from pdm_communication import PDMCommunication
+    comm = PDMCommunication()
+    if not comm.connect(port):
+        raise RuntimeError(f"could not connect to {port}")
+    return comm
+
+
+def _for_each_port(ports: List[str], action: Callable[[str], Dict]) -> Dict[str, Dict]:
+    """Run action(port) for every port in parallel and collect results"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def run(port):
+        try:
+            return dict(action(port), ok=True)
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, len(ports))) as pool:
+        return dict(zip(ports, pool.map(run, ports)))
+
+
+def cmd_ports(args) -> Dict:
+    from pdm_communication import PDMCommunication
+    return {"ok": True, "ports": PDMCommunication().get_available_ports()}
+
+
+def cmd_status(args) -> Dict:
+    def status(port):
+        comm = _connect(port)
+        try:
+            result = comm.get_device_status()
+            if not result:
+                raise RuntimeError("no STATUS reply")
+            version = comm.get_firmware_version()
+            if version:
+                result["firmware"] = version
+            return {"status": result}
+        finally:
+            comm.disconnect()
+
+    return {"ports": _for_each_port(args.ports, status)}
+
+
+def cmd_apply(args) -> Dict:
+    from pdm_communication import profile_commands
+
+    with open(args.profile, "r") as f:
+        commands = profile_commands(json.load(f))
+    if not args.no_save:
+        commands.append("SAVE")
+
+    def apply(port):
+        comm = _connect(port)
+        try:
+            failed = []
+            for command in commands:
+                if not comm.send_config_command(command):
+                    failed.append(command)
+            if failed:
+                raise RuntimeError(f"{len(failed)} of {len(commands)} commands failed: {failed}")
+            return {"commands": len(commands)}
+        finally:
+            comm.disconnect()
+
+    return {"ports": _for_each_port(args.ports, apply)}
+
+
+def cmd_record(args) -> Dict:
+    """Stream state changes as JSON lines until --duration elapses or Ctrl-C"""
+    out = open(args.output, "a") if args.output else sys.stdout
+    write_lock = threading.Lock()
+    stop = threading.Event()
+    counts = {port: 0 for port in args.ports}
+
+    def record(port):
+        import event_bus
+        from command_scheduler import POLL
+        comm = _connect(port)
+
+        def on_update(event):
+            line = json.dumps({"t": round(event.time, 3), "port": port,
+                               "type": event.type, "data": event.data})
+            with write_lock:
+                out.write(line + "\n")
+                out.flush()
+                counts[port] += 1
+
+        comm.events.subscribe(on_update, topics=event_bus.STATE_TOPICS, maxsize=4096,
+                              name=f"record-{port}")
+        try:
+            # Events carry on/off and fault changes; poll for analog readings
+            while not stop.wait(args.interval):
+                with comm.scheduler.priority(POLL):
+                    comm.resync_state()
+            return {"records": counts[port]}
+        finally:
+            comm.disconnect()
+
+    results: Dict[str, Dict] = {}
+    runner = threading.Thread(target=lambda: results.update(_for_each_port(args.ports, record)),
+                              daemon=True)
+    runner.start()
+    try:
+        runner.join(args.duration if args.duration > 0 else None)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    runner.join()
+    if out is not sys.stdout:
+        out.close()
+    return {"ports": results}
+
+
+def cmd_trace(args) -> Dict:
+    """Record the CAN frames the unit logs at LOG 2 and write them as a bus trace"""
+    import can_trace
+
+    comm = _connect(args.port)
+    recorder = can_trace.CANTraceRecorder(comm, capacity=args.capacity)
+    try:
+        reply = comm.send_command("LOG") or ""
+        previous = reply.rsplit(":", 1)[-1].strip() if reply.startswith("Current log level") else "0"
+        recorder.start()
+        if not comm.send_command("LOG 2"):
+            raise OSError("no reply to LOG 2")
+        try:
+            if args.duration > 0:
+                time.sleep(args.duration)
+            else:
+                threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        comm.send_command(f"LOG {previous}")
+        time.sleep(0.2)  # Let lines already received reach the recorder
+        recorder.stop()
+    finally:
+        comm.disconnect()
+
+    if args.format == "binary":
+        count = can_trace.write_binary(args.output, recorder.frames)
+    elif args.format == "json":
+        records = recorder.decoded()
+        with open(args.output, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        count = len(records)
+    else:
+        count = can_trace.write_candump(args.output, recorder.frames.frames())
+    return {"ok": True, "frames": count, "output": args.output, "stats": recorder.get_stats()}
+
+
+def cmd_decode(args) -> Dict:
+    """Summarise the PDM telemetry frames in recorded CAN logs"""
+    import telemetry_decoder
+
+    if telemetry_decoder.np is None:
+        return {"ok": False, "error": "NumPy is required for decode (pip install numpy)"}
+    out = open(args.records, "w") if args.records else None
+    start = time.perf_counter()
+    try:
+        result = telemetry_decoder.decode_logs(args.logs, node=args.node, records=out,
+                                               interval=args.interval)
+    finally:
+        if out:
+            out.close()
+    return dict(result, ok=True, seconds=round(time.perf_counter() - start, 2))
+
+
+def cmd_busload(args) -> Dict:
+    """Measure CAN bus load from traces (or the PDM's schedule) and project planned changes"""
+    import bus_load
+    import itertools
+    from can_trace import read_trace_file
+
+    if args.traces:
+        frames = itertools.chain.from_iterable(read_trace_file(path) for path in args.traces)
+        table, duration = bus_load.measure(frames)
+        result = {"ok": True, "source": "traces", "seconds": round(duration, 3)}
+    else:
+        table = bus_load.pdm_schedule(args.pdm_node, args.keypad_node, telemetry_hz=args.telemetry_rate,
+                                      blinking=args.blinking, telemetry_mode=args.telemetry_mode)
+        result = {"ok": True, "source": "pdm schedule"}
+    result["current"] = bus_load.report(table)
+
+    rates = {}
+    for change in args.set:
+        can_id, _, rate = change.partition("=")
+        rates[int(can_id, 0)] = float(rate)
+    added = {}
+    for message in args.add:
+        can_id, dlc, rate = message.split(":")
+        added[int(can_id, 0)] = (float(rate), int(dlc))
+    if rates or added:
+        result["projected"] = bus_load.report(bus_load.project(table, rates, added))
+    return result
+
+
+def cmd_serve(args) -> Dict:
+    """Share one unit's live data over HTTP/WebSocket until --duration or Ctrl-C"""
+    from command_scheduler import POLL
+    from telemetry_server import TelemetryServer
+
+    comm = _connect(args.port)
+    server = TelemetryServer(comm, host=args.host, port=args.http_port)
+    rpc = None
+    publisher = None
+    exporter = None
+    try:
+        if not server.start():
+            raise OSError(f"could not listen on {args.host}:{args.http_port}")
+        if args.rpc:
+            from rpc_server import RPCServer
+            rpc = RPCServer(comm)
+            if not rpc.start():
+                raise OSError("could not open the RPC socket")
+            print(f"RPC on {rpc.address}", file=sys.stderr, flush=True)
+        if args.shm:
+            from shm_snapshot import SnapshotPublisher
+            publisher = SnapshotPublisher(comm, name=args.shm)
+            if not publisher.start():
+                raise OSError(f"shared memory block '{args.shm}' is already in use")
+            print(f"Snapshot in shared memory '{publisher.name}'", file=sys.stderr, flush=True)
+        if args.metrics_port is not None or args.metrics_file:
+            from comm_metrics import PrometheusExporter
+            exporter = PrometheusExporter(comm.metrics, port=args.metrics_port, path=args.metrics_file)
+            if not exporter.start():
+                raise OSError(f"could not listen on port {args.metrics_port} for metrics")
+            if args.metrics_port is not None:
+                print(f"Metrics on http://{exporter.host}:{exporter.port}/metrics",
+                      file=sys.stderr, flush=True)
+        if args.profile:
+            from profiling import start_profile
+            start_profile(comm, args.profile, main_name="main",
+                          on_done=lambda path: print(f"Profile written to {path}",
+                                                     file=sys.stderr, flush=True))
+        print(f"Serving {args.port} on http://{server.host}:{server.port}/snapshot "
+              f"and ws://{server.host}:{server.port}/ws", file=sys.stderr, flush=True)
+        deadline = time.time() + args.duration if args.duration > 0 else None
+        try:
+            while deadline is None or time.time() < deadline:
+                # RPC clients' commands go first; a skipped poll is retried next interval
+                with comm.scheduler.priority(POLL, skip_if_busy=True):
+                    comm.resync_state()
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+        return {"ok": True, "stats": server.get_stats(), "metrics": comm.metrics.snapshot()}
+    finally:
+        server.stop()
+        if rpc:
+            rpc.stop()
+        if publisher:
+            publisher.stop()
+        if exporter:
+            exporter.stop()
+        comm.disconnect()
+
+
+def cmd_rpc(args) -> Dict:
+    """Call a method on a running PDM Manager (GUI or 'serve --rpc')"""
+    from rpc_server import rpc_call, RPCError
+
+    params = json.loads(args.params) if args.params else {}
+    try:
+        return {"ok": True, "result": rpc_call(args.method, params, args.address)}
+    except RPCError as e:
+        return {"ok": False, "error": str(e), "code": e.code}
+
+
+def cmd_flash(args) -> Dict:
+    from firmware_updater import FirmwareUpdater
+
+    updater = FirmwareUpdater()
+    updater.dry_run = args.dry_run
+
+    def progress(port, msg_type, message):
+        if args.verbose and msg_type != "progress":
+            print(json.dumps({"port": port, "type": msg_type, "message": message}),
+                  file=sys.stderr, flush=True)
+
+    results = updater.flash_fleet(args.hex_file, args.ports, progress,
+                                  max_workers=args.workers, retries=args.retries,
+                                  check_installed=args.skip_installed)
+    for result in results.values():
+        result["ok"] = result["result"] != "failed"
+    return {"ports": results}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pdm", description="PT Motorsport PDM command line client")
+    parser.add_argument("--pretty", action="store_true", help="indent JSON output")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ports", help="list serial ports")
+    p.set_defaults(func=cmd_ports)
+
+    p = sub.add_parser("status", help="read STATUS and firmware version")
+    p.add_argument("ports", nargs="+")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("apply", help="apply a JSON configuration profile and save it")
+    p.add_argument("profile")
+    p.add_argument("ports", nargs="+")
+    p.add_argument("--no-save", action="store_true", help="do not SAVE to EEPROM afterwards")
+    p.set_defaults(func=cmd_apply)
+
+    p = sub.add_parser("record", help="stream state updates as JSON lines")
+    p.add_argument("ports", nargs="+")
+    p.add_argument("--duration", type=float, default=0, help="seconds to record (default: until Ctrl-C)")
+    p.add_argument("--interval", type=float, default=2.0, help="STATUS poll interval in seconds")
+    p.add_argument("--output", help="append records to this file instead of stdout")
+    p.set_defaults(func=cmd_record)
+
+    p = sub.add_parser("trace", help="record the unit's CAN traffic from its LOG 2 output")
+    p.add_argument("port")
+    p.add_argument("output", help="trace file to write")
+    p.add_argument("--duration", type=float, default=0, help="seconds to record (default: until Ctrl-C)")
+    p.add_argument("--format", choices=("candump", "binary", "json"), default="candump",
+                   help="candump -l text, raw frame records, or decoded JSON lines")
+    p.add_argument("--capacity", type=int, default=1000000, help="frames kept (oldest are overwritten)")
+    p.set_defaults(func=cmd_trace)
+
+    p = sub.add_parser("decode", help="summarise PDM telemetry in candump/ASC/binary CAN logs")
+    p.add_argument("logs", nargs="+", help="log files, in time order")
+    p.add_argument("--node", type=lambda value: int(value, 0), help="PDM node ID, e.g. 0x15 (default: all)")
+    p.add_argument("--records", metavar="PATH", help="also write state updates as 'record' JSON lines")
+    p.add_argument("--interval", type=float, default=2.0,
+                   help="seconds between routine records per node (fault changes are always written)")
+    p.set_defaults(func=cmd_decode)
+
+    p = sub.add_parser("busload", help="CAN bus load per ID at each CANSPEED, measured or planned")
+    p.add_argument("traces", nargs="*", help="candump/ASC/binary traces (default: the PDM's own schedule)")
+    p.add_argument("--set", action="append", default=[], metavar="ID=HZ",
+                   help="planned rate for a message, e.g. 0x395=10 (0 removes it)")
+    p.add_argument("--add", action="append", default=[], metavar="ID:DLC:HZ",
+                   help="planned new message, e.g. 0x495:8:20")
+    p.add_argument("--pdm-node", type=lambda value: int(value, 0), default=0x15)
+    p.add_argument("--keypad-node", type=lambda value: int(value, 0), default=0x15)
+    p.add_argument("--blinking", action="store_true", help="include the LED blink frame in the schedule")
+    p.add_argument("--telemetry-rate", type=float, default=4.0, metavar="HZ", help="TELRATE setting (default 4)")
+    p.add_argument("--telemetry-mode", choices=("legacy", "extended", "both"), default="legacy",
+                   help="TELMODE setting (default legacy)")
+    p.set_defaults(func=cmd_busload)
+
+    p = sub.add_parser("serve", help="share live data over HTTP/WebSocket")
+    p.add_argument("port")
+    p.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    p.add_argument("--http-port", type=int, default=8765)
+    p.add_argument("--duration", type=float, default=0, help="seconds to serve (default: until Ctrl-C)")
+    p.add_argument("--interval", type=float, default=2.0, help="STATUS poll interval in seconds")
+    p.add_argument("--rpc", action="store_true", help="also accept commands on the RPC socket")
+    p.add_argument("--shm", nargs="?", const="pdm_snapshot", default=None, metavar="NAME",
+                   help="also publish the latest state to shared memory (default name: pdm_snapshot)")
+    p.add_argument("--metrics-port", type=int, metavar="PORT",
+                   help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    p.add_argument("--metrics-file", metavar="PATH",
+                   help="rewrite Prometheus metrics to PATH every 15 s")
+    p.add_argument("--profile", type=float, default=0, metavar="SECONDS",
+                   help="sample reader/scheduler/main thread stacks for SECONDS after start")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("rpc", help="call a method on a running PDM Manager")
+    p.add_argument("method", help="command, config, status, snapshot, version, loop_stats, fault_log, metrics, profile")
+    p.add_argument("params", nargs="?", help='JSON object, e.g. \'{"command": "STATUS"}\'')
+    p.add_argument("--address", help="socket path or 127.0.0.1:<port>")
+    p.set_defaults(func=cmd_rpc)
+
+    p = sub.add_parser("flash", help="flash a .hex file to one or more units")
+    p.add_argument("hex_file")
+    p.add_argument("ports", nargs="+")
+    p.add_argument("--workers", type=int, default=4, help="simultaneous uploads")
+    p.add_argument("--retries", type=int, default=2, help="extra attempts per failed unit")
+    p.add_argument("--skip-installed", action="store_true",
+                   help="skip units whose build id identifies this image as already installed")
+    p.add_argument("--dry-run", action="store_true", help="print upload commands only")
+    p.add_argument("-v", "--verbose", action="store_true", help="progress messages on stderr")
+    p.set_defaults(func=cmd_flash)
+    return parser
+
+
+def main(argv=None) -> int:
+    """Run the CLI; prints one JSON document and returns 0 only if every port succeeded"""
+    args = build_parser().parse_args(argv)
+    try:
+        result = args.func(args)
+    except (OSError, ValueError) as e:
+        result = {"ok": False, "error": str(e)}
+
+    if "ports" in result and isinstance(result["ports"], dict):
+        result["ok"] = all(r.get("ok") for r in result["ports"].values())
+    print(json.dumps(result, indent=2 if args.pretty else None))
+    return 0 if result.get("ok") else 1
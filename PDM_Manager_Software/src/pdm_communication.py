@@ -3,44 +3,151 @@ PDM Serial Communication Module
 Handles all serial communication with PDM devices
 """
 
+import collections
+import functools
 import serial
 import serial.tools.list_ports
+import sys
 import threading
 import time
 import re
 from typing import Optional, Dict, List, Callable
 import queue
 
+import can_link
+import event_bus
+import pdm_can
+from comm_metrics import CommMetrics
+from command_scheduler import CommandScheduler, POLL
+from event_bus import EventBus
+
+# STATUS "Last Input Mode" text -> event (EVT INPUT) name
+INPUT_MODE_NAMES = {
+    "NONE": "NONE",
+    "DIGITAL BUTTONS": "DIGITAL",
+    "CAN KEYPAD": "KEYPAD",
+    "CAN DIGITAL OUTPUT": "DIGOUT"
+}
+
+# Firmware log chatter (LOG 1 / LOG 2), kept apart from command replies
+LOG_LINE_PREFIXES = ("[STATE] ", "[INPUT] ", "[CAN-")
+
+# Reply lines held while nobody reads them, and log lines kept for viewing;
+# the oldest lines are dropped beyond these
+REPLY_QUEUE_SIZE = 256
+LOG_RING_SIZE = 1000
+
+# EVT FAULT kind -> STATUS fault name
+EVENT_FAULT_NAMES = {
+    "OC": "OVERCURRENT",
+    "THERMAL": "THERMAL",
+    "UNDER": "UNDERCURRENT"
+}
+
+def profile_commands(profile: Dict) -> List[str]:
+    """
+    Translate a configuration profile into firmware commands
+
+    The profile uses the configuration panel's layout: a "channels" list of
+    dicts (oc_threshold, inrush_threshold, inrush_time, underwarn_threshold,
+    mode, group) plus temp_warn, temp_trip, can_speed, pdm_node_id,
+    keypad_node_id, digital_out_id, telemetry_rate (Hz) and telemetry_mode
+    (LEGACY, EXTENDED or BOTH). Missing keys are left unchanged on the device.
+    """
+    channel_keys = (
+        ("oc_threshold", "OC"),
+        ("inrush_threshold", "INRUSH"),
+        ("inrush_time", "INRUSHTIME"),
+        ("underwarn_threshold", "UNDERWARN"),
+        ("mode", "MODE"),
+        ("group", "GROUP")
+    )
+    commands = []
+    for ch, channel in enumerate(profile.get("channels", [])[:4]):
+        for key, command in channel_keys:
+            if key in channel:
+                commands.append(f"{command} {ch + 1} {channel[key]}")
+
+    if "temp_warn" in profile:
+        commands.append(f"TEMPWARN {profile['temp_warn']}")
+    if "temp_trip" in profile:
+        commands.append(f"TEMPTRIP {profile['temp_trip']}")
+    if "can_speed" in profile:
+        commands.append(f"CANSPEED {profile['can_speed']}")
+    if "pdm_node_id" in profile:
+        commands.append(f"NODEID PDM {int(profile['pdm_node_id'])}")
+    if "keypad_node_id" in profile:
+        commands.append(f"NODEID KEYPAD {int(profile['keypad_node_id'])}")
+    if "digital_out_id" in profile:
+        commands.append(f"DIGOUT {int(profile['digital_out_id'])}")
+    if "telemetry_rate" in profile:
+        commands.append(f"TELRATE {int(profile['telemetry_rate'])}")
+    if "telemetry_mode" in profile:
+        commands.append(f"TELMODE {str(profile['telemetry_mode']).upper()}")
+    return commands
+
+def _transaction(method):
+    """Run a command/reply exchange on the scheduler thread, so replies are
+    not mixed up when several threads use one connection"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.scheduler.run(lambda: method(self, *args, **kwargs),
+                                  key=(method.__name__, args, tuple(sorted(kwargs.items()))))
+    return wrapper
+
 class PDMCommunication:
     """Manages serial communication with PDM devices"""
     
     def __init__(self):
         self.serial_port: Optional[serial.Serial] = None
+        self.can_link: Optional[can_link.CANLink] = None
         self.is_connected = False
         self.port_name = ""
         self.read_thread: Optional[threading.Thread] = None
         self.running = False
-        self.response_queue = queue.Queue()
-        self.status_callback: Optional[Callable] = None
+        self.response_queue = queue.Queue(maxsize=REPLY_QUEUE_SIZE)
+        self.log_lines = collections.deque(maxlen=LOG_RING_SIZE)
+        self.buffer_stats = {"reply_dropped": 0, "reply_high_water": 0,
+                             "log_lines": 0, "log_dropped": 0}
+        self.scheduler = CommandScheduler()
+        # Status updates, raw lines and CAN log lines are published here
+        self.events = EventBus()
+        self._status_subscription = None
+        self.metrics = CommMetrics(gauges=self._metric_gauges)
+        
+        # Device state, kept up to date from STATUS output and pushed events
+        self.device_state = self._empty_device_state()
+        self.events_enabled = False
+        self.last_event_seq: Optional[int] = None
+        self._resync_lock = threading.Lock()
         
         # Communication settings
         self.baudrate = 115200
         self.timeout = 2.0
         self.command_timeout = 3.0
         
-    def get_available_ports(self) -> List[str]:
-        """Get list of available COM ports"""
+        # Node IDs whose frames are decoded on a SocketCAN link
+        self.can_pdm_node = pdm_can.DEFAULT_NODE_ID
+        self.can_keypad_node = pdm_can.DEFAULT_NODE_ID
+        
+    def get_available_ports(self, include_can: bool = False) -> List[str]:
+        """Get list of available COM ports, optionally followed by SocketCAN interfaces"""
         ports = []
         for port in serial.tools.list_ports.comports():
             ports.append(port.device)
+        if include_can:
+            ports.extend(can_link.can_interfaces())
         return ports
     
     def connect(self, port: str) -> bool:
-        """Connect to PDM on specified port"""
+        """Connect to PDM on specified port (or SocketCAN interface)"""
         try:
             if self.is_connected:
                 self.disconnect()
                 
+            if can_link.is_can_interface(port):
+                return self._connect_can(port)
+                
             self.serial_port = serial.Serial(
                 port=port,
                 baudrate=self.baudrate,
@@ -55,10 +162,9 @@ class PDMCommunication:
             self.serial_port.flushInput()
             self.serial_port.flushOutput()
             
-            # Try to get a response
+            # Flush any partial command left in the firmware's line buffer
             self.serial_port.write(b"\r\n")
             time.sleep(0.5)
-            self.serial_port.write(b"STATUS\r\n")
             
             # Start read thread
             self.running = True
@@ -67,19 +173,52 @@ class PDMCommunication:
             
             self.is_connected = True
             self.port_name = port
+            
+            if self.metrics.counters["connects"]:
+                self.metrics.count("reconnects")
+            self.metrics.count("connects")
+            
+            # Prefer change-driven event push over polling when supported
+            if self.enable_events():
+                self._request_resync()
             return True
             
         except Exception as e:
             if self.serial_port:
                 self.serial_port.close()
+            if self.can_link:
+                self.can_link.close()
+                self.can_link = None
             self.is_connected = False
-            print(f"Connection failed: {e}")
+            self.metrics.count("connect_failures")
+            print(f"Connection failed: {e}", file=sys.stderr)
             return False
     
+    def _connect_can(self, interface: str) -> bool:
+        """Listen to the PDM's frames on a SocketCAN interface (read-only link)"""
+        self.can_link = can_link.CANLink(interface, self._emit_status, self.metrics,
+                                         pdm_node=self.can_pdm_node, keypad_node=self.can_keypad_node)
+        self.can_link.open()
+        self.running = True
+        self.read_thread = threading.Thread(target=self.can_link.run, args=(lambda: self.running,),
+                                            daemon=True)
+        self.read_thread.start()
+        
+        self.is_connected = True
+        self.port_name = interface
+        if self.metrics.counters["connects"]:
+            self.metrics.count("reconnects")
+        self.metrics.count("connects")
+        return True
+    
     def disconnect(self):
         """Disconnect from PDM"""
+        if self.is_connected:
+            self.metrics.count("disconnects")
         self.running = False
         self.is_connected = False
+        self.events_enabled = False
+        self.last_event_seq = None
         
         if self.read_thread and self.read_thread.is_alive():
             self.read_thread.join(timeout=1.0)
@@ -87,6 +226,9 @@ class PDMCommunication:
         if self.serial_port:
             self.serial_port.close()
             self.serial_port = None
+        if self.can_link:
+            self.can_link.close()
+            self.can_link = None
             
         self.port_name = ""
     
@@ -94,31 +236,119 @@ class PDMCommunication:
         """Background thread for reading serial data"""
         while self.running and self.serial_port and self.serial_port.is_open:
             try:
-                line = self.serial_port.readline().decode('utf-8', errors='ignore').strip()
+                raw = self.serial_port.readline()
+                if not raw:
+                    continue
+                start = time.perf_counter()
+                self.metrics.received(len(raw))
+                line = raw.decode('utf-8', errors='ignore').strip()
                 if line:
-                    self.response_queue.put(line)
-                    
-                    # Parse status updates if callback is set
-                    if self.status_callback:
-                        self._parse_status_line(line)
+                    self._dispatch_line(line)
+                self.metrics.line_handled(time.perf_counter() - start)
                         
             except Exception as e:
                 if self.running:  # Only log if we're supposed to be running
-                    print(f"Read error: {e}")
+                    self.metrics.count("read_errors")
+                    print(f"Read error: {e}", file=sys.stderr)
                 break
     
+    def _dispatch_line(self, line: str):
+        """Route one received line: log ring, pushed event, or command reply"""
+        self.events.publish(event_bus.RAW_LINE, "line", line)
+        
+        # Log output and pushed events are not command replies
+        if line.startswith(LOG_LINE_PREFIXES):
+            self._buffer_log_line(line)
+        elif line.startswith("EVT "):
+            self._handle_event_line(line)
+        else:
+            self._queue_reply(line)
+            self._parse_status_line(line)
+    
+    def _queue_reply(self, line: str):
+        """Queue a reply line, dropping the oldest if nobody has been reading"""
+        stats = self.buffer_stats
+        try:
+            self.response_queue.put_nowait(line)
+        except queue.Full:
+            try:
+                self.response_queue.get_nowait()
+                stats["reply_dropped"] += 1
+            except queue.Empty:
+                pass
+            self.response_queue.put_nowait(line)
+        depth = self.response_queue.qsize()
+        if depth > stats["reply_high_water"]:
+            stats["reply_high_water"] = depth
+    
+    def _buffer_log_line(self, line: str):
+        """Keep a log line in the ring, dropping the oldest when full"""
+        if len(self.log_lines) == self.log_lines.maxlen:
+            self.buffer_stats["log_dropped"] += 1
+        self.log_lines.append(line)
+        self.buffer_stats["log_lines"] += 1
+        if line.startswith("[CAN-"):
+            self.events.publish(event_bus.CAN_LOG, "can_log", line)
+    
+    def get_log_lines(self, count: Optional[int] = None) -> List[str]:
+        """Get the most recent firmware log lines (all buffered lines by default)"""
+        lines = list(self.log_lines)
+        return lines[-count:] if count else lines
+    
+    def get_buffer_stats(self) -> Dict:
+        """Reply queue and log ring depth, capacity, high-water marks and drop counters"""
+        return dict(self.buffer_stats,
+                    reply_queued=self.response_queue.qsize(),
+                    reply_capacity=REPLY_QUEUE_SIZE,
+                    log_buffered=len(self.log_lines),
+                    log_capacity=LOG_RING_SIZE)
+    
+    def _metric_gauges(self) -> Dict:
+        """Queue depths and link state for CommMetrics snapshots"""
+        buffers = self.get_buffer_stats()
+        subscribers = self.events.get_stats()
+        try:
+            # Bytes the OS has received but the reader has not consumed yet
+            rx_backlog = self.serial_port.in_waiting if self.serial_port else 0
+        except Exception:
+            rx_backlog = 0
+        return {
+            "connected": self.is_connected,
+            "rx_backlog_bytes": rx_backlog,
+            "events_enabled": self.events_enabled,
+            "reply_queue_depth": buffers["reply_queued"],
+            "reply_queue_high_water": buffers["reply_high_water"],
+            "reply_lines_dropped": buffers["reply_dropped"],
+            "log_lines_dropped": buffers["log_dropped"],
+            "scheduler_queued": self.scheduler.queued(),
+            "event_queue_depth": {"label": "subscriber",
+                                  "values": {s["name"]: s["queued"] for s in subscribers}},
+            "event_queue_dropped": {"label": "subscriber",
+                                    "values": {s["name"]: s["dropped"] for s in subscribers}}
+        }
+    
     def _parse_status_line(self, line: str):
         """Parse incoming status data and call callback"""
         # Parse various status patterns
         if "Board Temperature:" in line:
             match = re.search(r"Board Temperature:\s*([-\d.]+)", line)
-            if match and self.status_callback:
-                self.status_callback("temperature", float(match.group(1)))
+            if match:
+                self._emit_status("temperature", float(match.group(1)))
+            else:
+                self.metrics.parse_failure("temperature")
                 
         elif "Battery Voltage:" in line:
             match = re.search(r"Battery Voltage:\s*([\d.]+)", line)
-            if match and self.status_callback:
-                self.status_callback("battery_voltage", float(match.group(1)))
+            if match:
+                self._emit_status("battery_voltage", float(match.group(1)))
+            else:
+                self.metrics.parse_failure("battery_voltage")
+                
+        elif line.startswith("OK: Events ON"):
+            # Next event will carry this sequence number
+            match = re.search(r"seq=(\d+)", line)
+            if match:
+                self.last_event_seq = (int(match.group(1)) - 1) & 0xFFFF
                 
         elif "|" in line and ("ON" in line or "OFF" in line):
             # Channel status line
@@ -126,29 +356,157 @@ class PDMCommunication:
     
     def _parse_channel_status(self, line: str):
         """Parse channel status from STATUS command output"""
+        channel = self._parse_channel_row(line)
+        if channel:
+            self._emit_status("channel_status", channel)
+    
+    def _parse_channel_row(self, line: str) -> Optional[Dict]:
+        """Parse one channel row of the STATUS table, None if not a channel row"""
         try:
             # Example: "1  |   ON   | 2.50 A |  L  |   1   |   GREEN  | OK"
             parts = [p.strip() for p in line.split("|")]
             if len(parts) >= 6:
-                ch = int(parts[0]) - 1  # Convert to 0-based index
-                state = parts[1] == "ON"
-                current = float(parts[2].replace("A", "").strip())
-                mode = parts[3].strip()
-                group = int(parts[4])
-                led_state = parts[5].strip()
-                
-                if self.status_callback:
-                    self.status_callback("channel_status", {
-                        "channel": ch,
-                        "active": state,
-                        "current": current,
-                        "mode": mode,
-                        "group": group,
-                        "led_state": led_state
-                    })
+                return {
+                    "channel": int(parts[0]) - 1,  # Convert to 0-based index
+                    "active": parts[1] == "ON",
+                    "current": float(parts[2].replace("A", "").strip()),
+                    "mode": parts[3].strip(),
+                    "group": int(parts[4]),
+                    "led_state": parts[5].strip(),
+                    "faults": parts[6].split() if len(parts) > 6 and parts[6] != "OK" else []
+                }
         except (ValueError, IndexError):
-            pass  # Ignore malformed lines
+            self.metrics.parse_failure("channel_row")
+        return None
     
+    def _empty_device_state(self) -> Dict:
+        """Device state before anything has been received"""
+        return {
+            "channels": [
+                {"active": False, "current": 0.0, "mode": "L", "group": i + 1,
+                 "led_state": "OFF", "faults": []}
+                for i in range(4)
+            ],
+            "temperature": 0.0,
+            "battery_voltage": 0.0,
+            "uptime": 0,
+            "input_mode": "NONE",
+            "can_ok": True,
+            "digout_ok": True
+        }
+    
+    def _emit_status(self, update_type: str, data):
+        """Apply a status update to device_state and publish it"""
+        state = self.device_state
+        if update_type == "channel_status":
+            ch = data.get("channel", -1)
+            if not 0 <= ch < 4:
+                return
+            channel = state["channels"][ch]
+            if "faults" in data and data["faults"] != channel.get("faults", []):
+                self.events.publish(event_bus.FAULT, "faults", {"channel": ch, "faults": data["faults"]})
+            channel.update({k: v for k, v in data.items() if k != "channel"})
+        elif update_type in ("temperature", "battery_voltage", "input_mode"):
+            state[update_type] = data
+        elif update_type == "can_status":
+            state["can_ok"] = data
+        elif update_type == "digout_status":
+            state["digout_ok"] = data
+            
+        self.events.publish(event_bus.UPDATE_TOPICS.get(update_type, event_bus.SYSTEM), update_type, data)
+    
+    def _handle_event_line(self, line: str):
+        """Apply one pushed 'EVT <seq> <millis> <KIND> <args...>' line"""
+        parts = line.split()
+        try:
+            seq = int(parts[1])
+            kind = parts[3]
+            args = parts[4:]
+        except (IndexError, ValueError):
+            self.metrics.parse_failure("event_header")
+            return
+            
+        # Sequence gap means lines were lost: fall back to a full STATUS
+        if self.last_event_seq is not None and seq != (self.last_event_seq + 1) & 0xFFFF:
+            self.metrics.count("event_gaps")
+            self._request_resync()
+        self.last_event_seq = seq
+        
+        try:
+            if kind == "CH":
+                self._emit_status("channel_status", {
+                    "channel": int(args[0]) - 1,
+                    "active": args[1] == "ON"
+                })
+            elif kind == "FAULT":
+                ch = int(args[0]) - 1
+                if not 0 <= ch < 4:
+                    return
+                fault = EVENT_FAULT_NAMES.get(args[1], args[1])
+                faults = [f for f in self.device_state["channels"][ch].get("faults", []) if f != fault]
+                if args[2] == "SET":
+                    faults.append(fault)
+                self._emit_status("channel_status", {"channel": ch, "faults": faults})
+            elif kind == "INPUT":
+                self._emit_status("input_mode", args[0])
+            elif kind == "CAN":
+                self._emit_status("can_status", args[0] == "OK")
+            elif kind == "DIGOUT":
+                self._emit_status("digout_status", args[0] == "OK")
+        except (IndexError, ValueError):
+            self.metrics.parse_failure(f"event_{kind.lower()}")
+    
+    @_transaction
+    def enable_events(self) -> bool:
+        """Ask the firmware to push EVT lines on state changes
+
+        Lines of a report still being emitted (STATUS, SHOW) can arrive
+        before the reply, so lines are read until one answers the command.
+        The send and those reads are one transaction, so another command's
+        reply cannot be taken for ours or consumed here.
+        """
+        response = self.send_command("EVENTS ON")
+        deadline = time.time() + self.command_timeout
+        while response is not None and not response.startswith(("OK: Events", "ERR")):
+            try:
+                response = self.response_queue.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                response = None
+        self.events_enabled = bool(response and response.startswith("OK: Events ON"))
+        return self.events_enabled
+    
+    def resync_state(self) -> Optional[Dict]:
+        """Rebuild device_state from a full STATUS report"""
+        status = self.get_device_status()
+        if not status:
+            return None
+            
+        for ch, channel in enumerate(status["channels"]):
+            self._emit_status("channel_status", dict(channel, channel=ch))
+        self._emit_status("temperature", status["temperature"])
+        self._emit_status("battery_voltage", status["battery_voltage"])
+        self.device_state["uptime"] = status["uptime"]
+        if "input_mode" in status:
+            self._emit_status("input_mode", status["input_mode"])
+        if "can_ok" in status:
+            self._emit_status("can_status", status["can_ok"])
+        return status
+    
+    def _request_resync(self):
+        """Run resync_state in the background unless one is already running"""
+        if not self._resync_lock.acquire(blocking=False):
+            return
+            
+        def resync_thread():
+            try:
+                with self.scheduler.priority(POLL):
+                    self.resync_state()
+            finally:
+                self._resync_lock.release()
+                
+        threading.Thread(target=resync_thread, daemon=True).start()
+    
+    @_transaction
     def send_command(self, command: str) -> Optional[str]:
         """Send command and wait for response"""
         if not self.is_connected or not self.serial_port:
@@ -160,8 +518,15 @@ class PDMCommunication:
                 self.response_queue.get_nowait()
                 
             # Send command
-            self.serial_port.write(f"{command}\r\n".encode())
-            self.serial_port.flush()
+            data = f"{command}\r\n".encode()
+            start = time.perf_counter()
+            try:
+                self.serial_port.write(data)
+                self.serial_port.flush()
+            except Exception:
+                self.metrics.count("write_errors")
+                raise
+            self.metrics.sent(len(data))
             
             # Wait for response
             start_time = time.time()
@@ -169,14 +534,16 @@ class PDMCommunication:
                 try:
                     response = self.response_queue.get(timeout=0.1)
                     if response and not response.startswith("Received:"):
+                        self.metrics.command_done(command, time.perf_counter() - start)
                         return response
                 except queue.Empty:
                     continue
                     
+            self.metrics.command_done(command, None)
             return None
             
         except Exception as e:
-            print(f"Command failed: {e}")
+            print(f"Command failed: {e}", file=sys.stderr)
             return None
     
     def send_config_command(self, command: str) -> bool:
@@ -186,7 +553,7 @@ class PDMCommunication:
     
     def get_current_configuration(self) -> Optional[Dict]:
         """Get current device configuration"""
-        if not self.is_connected:
+        if not self.is_connected or not self.serial_port:
             return None
             
         config_data = {}
@@ -202,15 +569,16 @@ class PDMCommunication:
         
         return config_data
     
+    @_transaction
     def get_device_status(self) -> Optional[Dict]:
-        """Get complete device status"""
-        if not self.is_connected:
+        """Get complete device status; None unless a whole STATUS block arrived"""
+        if not self.is_connected or not self.serial_port:
             return None
             
-        # Send STATUS command and parse multi-line response
-        self.send_command("STATUS")
+        # The firmware emits STATUS a line at a time across loop passes, so
+        # other output (command replies, log lines) may be interleaved with it
+        line = self.send_command("STATUS")
         
-        # Collect status lines
         status_data = {
             "channels": [{"active": False, "current": 0.0, "mode": "L", "group": 1} for _ in range(4)],
             "temperature": 0.0,
@@ -218,35 +586,219 @@ class PDMCommunication:
             "uptime": 0
         }
         
-        # Read multiple lines of status
+        # Collect lines between the STATUS header and footer
+        in_block = False
+        complete = False
         start_time = time.time()
         while time.time() - start_time < 2.0:  # 2 second timeout
+            if line:
+                if not in_block:
+                    in_block = "PDM SYSTEM STATUS" in line
+                elif self._parse_status_block_line(line, status_data):
+                    complete = True  # End of status block
+                    break
+                    
             try:
                 line = self.response_queue.get(timeout=0.1)
-                if "====" in line and "STATUS" in line:
-                    break  # End of status block
-                    
-                # Parse specific status lines
-                if "Board Temperature:" in line:
-                    match = re.search(r"([-\d.]+)\s*°?C", line)
-                    if match:
-                        status_data["temperature"] = float(match.group(1))
-                        
-                elif "Battery Voltage:" in line:
-                    match = re.search(r"([\d.]+)\s*V", line)
-                    if match:
-                        status_data["battery_voltage"] = float(match.group(1))
-                        
-                elif "System Uptime:" in line:
-                    match = re.search(r"(\d+)\s*seconds", line)
-                    if match:
-                        status_data["uptime"] = int(match.group(1))
-                        
             except queue.Empty:
-                continue
+                line = None
                 
+        # Defaults are not a status: a silent or truncated reply gives None
+        if not complete:
+            if in_block:
+                self.metrics.parse_failure("status")
+            return None
         return status_data
     
-    def set_status_callback(self, callback: Callable):
-        """Set callback for real-time status updates"""
-        self.status_callback = callback
\ No newline at end of file
+    def _parse_status_block_line(self, line: str, status_data: Dict) -> bool:
+        """Parse one line inside a STATUS block, return True at the footer"""
+        if line.startswith("====") and set(line) == {"="}:
+            return True
+            
+        # Parse specific status lines, anything else is interleaved output
+        if line.startswith("Board Temperature:"):
+            match = re.search(r"([-\d.]+)\s*°?C", line)
+            if match:
+                status_data["temperature"] = float(match.group(1))
+                
+        elif line.startswith("Battery Voltage:"):
+            match = re.search(r"([\d.]+)\s*V", line)
+            if match:
+                status_data["battery_voltage"] = float(match.group(1))
+                
+        elif line.startswith("System Uptime:"):
+            match = re.search(r"(\d+)\s*seconds", line)
+            if match:
+                status_data["uptime"] = int(match.group(1))
+                
+        elif line.startswith("Last Input Mode:"):
+            mode = line.split(":", 1)[1].strip()
+            status_data["input_mode"] = INPUT_MODE_NAMES.get(mode, mode)
+            
+        elif line.startswith("CAN Status:"):
+            status_data["can_ok"] = line.split(":", 1)[1].strip() == "OK"
+            
+        elif re.match(r"^\d\s+\|", line):
+            channel = self._parse_channel_row(line)
+            if channel and 0 <= channel["channel"] < 4:
+                status_data["channels"][channel["channel"]] = channel
+                
+        return False
+    
+    @_transaction
+    def get_loop_stats(self, reset: bool = True) -> Optional[Dict]:
+        """Get firmware loop timing statistics (LOOPSTAT command)
+
+        Args:
+            reset: Reset the device counters after reading, so each call
+                   reports a fresh measurement window
+
+        Returns:
+            Dict with "loop" and per-stage "stages" timings in microseconds,
+            or None if no complete report was received
+        """
+        if not self.is_connected or not self.serial_port:
+            return None
+
+        first_line = self.send_command("LOOPSTAT RESET" if reset else "LOOPSTAT")
+        if not first_line:
+            return None
+
+        stats = {"loop": None, "stages": {}, "window_ms": 0}
+        line = first_line
+        start_time = time.time()
+        while True:
+            if line.startswith("LOOPSTAT END"):
+                match = re.search(r"window_ms=(\d+)", line)
+                if match:
+                    stats["window_ms"] = int(match.group(1))
+                return stats if stats["loop"] else None
+
+            parsed = self._parse_loop_stat_line(line)
+            if parsed:
+                name, values = parsed
+                if name == "LOOP":
+                    stats["loop"] = values
+                else:
+                    stats["stages"][name] = values
+
+            # Read next line of the report
+            line = None
+            while line is None:
+                if time.time() - start_time > 2.0:
+                    return None
+                try:
+                    line = self.response_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+    def _parse_loop_stat_line(self, line: str) -> Optional[tuple]:
+        """Parse one 'LOOPSTAT <NAME> key=value ...' line"""
+        match = re.match(r"LOOPSTAT\s+(\w+)\s+(.*)", line)
+        if not match:
+            return None
+        values = {key: int(val) for key, val in re.findall(r"(\w+)=(\d+)", match.group(2))}
+        if "max" not in values:
+            return None
+        return match.group(1), values
+
+    def get_firmware_version(self) -> Optional[Dict]:
+        """Get firmware version and build id (VERSION command)
+
+        Returns:
+            Dict with "version" and "build_id", or None if not supported
+        """
+        response = self.send_command("VERSION")
+        if not response:
+            return None
+        match = re.match(r"VERSION\s+(\S+)\s+build=(.+)", response)
+        if not match:
+            return None
+        return {"version": match.group(1), "build_id": match.group(2).strip()}
+
+    @_transaction
+    def fetch_fault_log(self, since: int = 0) -> Optional[Dict]:
+        """Get fault log entries newer than a sequence number (FAULTLOG command)
+
+        Args:
+            since: Last sequence number already held by the caller
+
+        Returns:
+            Dict with "entries" (list of dicts with seq, ms, channel, type, set),
+            "next", "now" and "dropped", or None if no complete report was received
+        """
+        if not self.is_connected or not self.serial_port:
+            return None
+
+        line = self.send_command(f"FAULTLOG {since}")
+        entries = []
+        start_time = time.time()
+        while True:
+            if line:
+                if line.startswith("ERR"):
+                    return None  # Another report is running or the output queue is full
+                if line.startswith("FLOG END"):
+                    values = {key: int(val) for key, val in re.findall(r"(\w+)=(\d+)", line)}
+                    return {
+                        "entries": entries,
+                        "next": values.get("next", 1),
+                        "now": values.get("now", 0),
+                        "dropped": values.get("dropped", 0)
+                    }
+
+                match = re.match(r"FLOG\s+(\d+)\s+(\d+)\s+(\d+)\s+(\w+)\s+(SET|CLR)", line)
+                if match:
+                    entries.append({
+                        "seq": int(match.group(1)),
+                        "ms": int(match.group(2)),
+                        "channel": int(match.group(3)),
+                        "type": EVENT_FAULT_NAMES.get(match.group(4), match.group(4)),
+                        "set": match.group(5) == "SET"
+                    })
+
+            # Read next line of the report
+            line = None
+            while line is None:
+                if time.time() - start_time > 3.0:
+                    return None
+                try:
+                    line = self.response_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+    def sync_fault_log(self, store) -> Optional[int]:
+        """Fetch fault log entries the store has not seen yet and merge them
+
+        Args:
+            store: FaultEventStore for this device
+
+        Returns:
+            Number of new events stored, or None if the fetch failed
+        """
+        report = self.fetch_fault_log(store.cursor)
+        if report is None:
+            return None
+
+        # Sequence or uptime went backwards: the device was reset, so fetch everything
+        if report["next"] - 1 < store.cursor or report["now"] < store.last_now:
+            store.start_new_boot()
+            report = self.fetch_fault_log(0)
+            if report is None:
+                return None
+
+        return store.merge(report)
+
+    def set_status_callback(self, callback: Optional[Callable]):
+        """Set a callback(update_type, data) for status updates, replacing any previous one
+        
+        The callback runs on its own event bus thread; use events.subscribe()
+        directly for topic filtering or more than one consumer.
+        """
+        self.events.unsubscribe(self._status_subscription)
+        self._status_subscription = None
+        if callback:
+            self._status_subscription = self.events.subscribe(
+                lambda event: callback(event.type, event.data),
+                topics=(event_bus.TEMPERATURE, event_bus.BATTERY, event_bus.CHANNEL, event_bus.SYSTEM),
+                maxsize=1024,
+                name="status_callback")
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Profiling Module
+Timed sampling profiler for the serial reader, command scheduler and UI threads
+
+While a run is active a background thread samples the target threads' Python
+stacks with sys._current_frames() every few milliseconds. Nothing is hooked
+into the sampled threads, so there is no cost at all when no run is active.
+Each run writes, per thread, a collapsed-stack file (one "a;b;c count" line
+per distinct stack, the input format of flamegraph.pl and speedscope) and a
+plain-text summary of the functions seen most often on top of the stack.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".pdm_manager", "profiles")
+
+DEFAULT_INTERVAL = 0.005
+
+_active_lock = threading.Lock()
+_active: Optional["SamplingProfiler"] = None
+
+
+def profile_targets(pdm_comm, main_name: str = "ui") -> Dict[str, int]:
+    """Thread idents worth profiling: reader, scheduler and the main (Tk) thread"""
+    targets = {main_name: threading.main_thread().ident}
+    if pdm_comm.read_thread and pdm_comm.read_thread.is_alive():
+        targets["reader"] = pdm_comm.read_thread.ident
+    scheduler_ident = pdm_comm.scheduler.thread_ident()
+    if scheduler_ident:
+        targets["scheduler"] = scheduler_ident
+    return targets
+
+
+class SamplingProfiler:
+    """Samples target thread stacks for a fixed window and writes the results"""
+
+    def __init__(self, targets: Dict[str, int], seconds: float, interval: float = DEFAULT_INTERVAL,
+                 directory: Optional[str] = None, on_done: Optional[Callable[[str], None]] = None):
+        self.targets = targets
+        self.seconds = seconds
+        self.interval = interval
+        self.directory = directory or os.path.join(PROFILE_DIR, f"profile_{time.strftime('%Y%m%d-%H%M%S')}")
+        self.on_done = on_done
+        self.stacks: Dict[str, collections.Counter] = {name: collections.Counter() for name in targets}
+        self.samples = 0
+        self._labels = {}  # Code object -> frame label
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Start sampling in the background; False if another run is active"""
+        global _active
+        with _active_lock:
+            if _active is not None:
+                return False
+            _active = self
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        global _active
+        try:
+            idents = {ident: name for name, ident in self.targets.items()}
+            deadline = time.perf_counter() + self.seconds
+            while time.perf_counter() < deadline:
+                frames = sys._current_frames()
+                for ident, name in idents.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self.stacks[name][self._stack(frame)] += 1
+                self.samples += 1
+                del frames
+                time.sleep(self.interval)
+            path = self.write()
+        except OSError as e:
+            path = ""
+            print(f"Could not write profile: {e}", file=sys.stderr)
+        finally:
+            with _active_lock:
+                _active = None
+        if self.on_done:
+            self.on_done(path)
+
+    def _stack(self, frame) -> str:
+        labels = self._labels
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = (f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                                        f"{code.co_firstlineno})").replace(";", ":")
+            names.append(label)
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def write(self) -> str:
+        """Write <thread>.collapsed files and summary.txt; returns the directory"""
+        os.makedirs(self.directory, exist_ok=True)
+        lines = [f"{self.samples} samples over {self.seconds:g} s "
+                 f"({1000 * self.interval:g} ms interval)", ""]
+        for name, stacks in self.stacks.items():
+            with open(os.path.join(self.directory, f"{name}.collapsed"), "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+            total = sum(stacks.values())
+            leaves = collections.Counter()
+            for stack, count in stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            lines.append(f"[{name}] {total} samples")
+            for label, count in leaves.most_common(15):
+                lines.append(f"  {100 * count / total:5.1f}%  {label}")
+            lines.append("")
+
+        with open(os.path.join(self.directory, "summary.txt"), "w") as f:
+            f.write("\n".join(lines))
+        return self.directory
+
+
+def start_profile(pdm_comm, seconds: float, main_name: str = "ui",
+                  on_done: Optional[Callable[[str], None]] = None) -> Optional[SamplingProfiler]:
+    """Profile pdm_comm's threads and the main thread; None if a run is already active"""
+    profiler = SamplingProfiler(profile_targets(pdm_comm, main_name), seconds, on_done=on_done)
+    return profiler if profiler.start() else None
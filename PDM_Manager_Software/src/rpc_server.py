@@ -0,0 +1,379 @@
+"""
+RPC Server Module
+Lets other local programs send commands through the manager's open serial link
+
+Requests are JSON-RPC 2.0 objects, one per line, on a Unix domain socket
+(~/.pdm_manager/pdm.sock). Platforms without AF_UNIX (Windows) listen on
+TCP 127.0.0.1:8766 instead. A TCP client must first send an "auth" request
+carrying the token the server writes to ~/.pdm_manager/rpc_token (readable
+by the current user only); anything else closes the connection.
+
+Each client's requests are answered in order with the client's own ids;
+across clients a single worker thread takes one request from each waiting
+client in turn, so a busy script cannot starve the GUI or other clients.
+
+Methods:
+    command {"command": "..."}     First reply line of a raw command
+    config {"command": "..."}      True if the command was acknowledged with OK
+    status                         Full STATUS report
+    snapshot                       Latest device_state (no serial traffic)
+    version                        Firmware version and build id
+    loop_stats {"reset": bool}     LOOPSTAT report
+    fault_log {"since": int}       FAULTLOG entries after a sequence number
+    metrics                        Link counters and latencies (no serial traffic)
+    profile {"seconds": float}     Start sampling thread stacks; returns the output directory
+    auth {"token": "..."}          TCP only: must be the first request of a connection
+"""
+
+import asyncio
+import collections
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+from typing import Dict, Optional, Callable
+
+SOCKET_PATH = os.path.join(os.path.expanduser("~"), ".pdm_manager", "pdm.sock")
+TCP_FALLBACK_PORT = 8766
+TOKEN_PATH = os.path.join(os.path.expanduser("~"), ".pdm_manager", "rpc_token")
+
+# Pending requests allowed per client before it gets "busy" errors
+MAX_PENDING_PER_CLIENT = 32
+
+# Methods answered without the device
+OFFLINE_METHODS = ("snapshot", "metrics", "profile")
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+def has_unix_sockets() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def write_token(token: str, path: str = TOKEN_PATH):
+    """Store the token in a file only the current user can read"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)  # Recreate so the mode below applies
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+
+
+def read_token(path: str = TOKEN_PATH) -> str:
+    with open(path) as f:
+        return f.read().strip()
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class _Client:
+    """Pending requests of one connection"""
+
+    def __init__(self, writer: asyncio.StreamWriter, authenticated: bool):
+        self.writer = writer
+        self.authenticated = authenticated
+        self.pending = collections.deque()
+        self.closed = False
+
+
+class RPCServer:
+    """JSON-RPC endpoint forwarding requests into a PDMCommunication"""
+
+    def __init__(self, pdm_comm, path: str = SOCKET_PATH, port: int = TCP_FALLBACK_PORT,
+                 token_path: str = TOKEN_PATH):
+        self.pdm_comm = pdm_comm
+        self.path = path
+        self.port = port
+        self.token_path = token_path
+        self.address = ""
+        self._token: Optional[str] = None  # Set while listening on TCP
+
+        self.methods: Dict[str, Callable[[Dict], object]] = {
+            "command": lambda p: self.pdm_comm.send_command(self._require(p, "command")),
+            "config": lambda p: bool(self.pdm_comm.send_config_command(self._require(p, "command"))),
+            "status": lambda p: self.pdm_comm.get_device_status(),
+            "snapshot": lambda p: self.pdm_comm.device_state,
+            "version": lambda p: self.pdm_comm.get_firmware_version(),
+            "loop_stats": lambda p: self.pdm_comm.get_loop_stats(bool(p.get("reset", False))),
+            "fault_log": lambda p: self.pdm_comm.fetch_fault_log(int(p.get("since", 0))),
+            "metrics": lambda p: self.pdm_comm.metrics.snapshot(),
+            "profile": self._start_profile
+        }
+
+        # Round-robin over clients with pending requests
+        self._ready = collections.deque()
+        self._ready_lock = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._worker: Optional[threading.Thread] = None
+        self._running = False
+        self._started = threading.Event()
+
+    def _start_profile(self, params: Dict) -> Dict:
+        from profiling import start_profile
+        seconds = float(params.get("seconds", 10))
+        if not 0 < seconds <= 300:
+            raise RPCError(INVALID_PARAMS, "seconds must be between 0 and 300")
+        profiler = start_profile(self.pdm_comm, seconds)
+        if profiler is None:
+            raise RPCError(SERVER_ERROR, "a profile is already running")
+        return {"directory": profiler.directory, "seconds": seconds}
+
+    @staticmethod
+    def _require(params: Dict, name: str):
+        if name not in params:
+            raise RPCError(INVALID_PARAMS, f"missing parameter '{name}'")
+        return params[name]
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+
+    def start(self) -> bool:
+        """Start listening; False if the address is unavailable or already served"""
+        if self._running:
+            return True
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait(5.0)
+        if self._server is None:
+            self._running = False
+            return False
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+        return True
+
+    def stop(self):
+        """Stop listening and drop pending requests"""
+        self._running = False
+        with self._ready_lock:
+            self._ready.clear()
+            self._ready_lock.notify_all()
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        if has_unix_sockets() and self.address == self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        if self._token and os.path.exists(self.token_path):
+            os.remove(self.token_path)
+        self._token = None
+        self._server = None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(self._listen())
+        except OSError as e:
+            print(f"RPC server failed to start: {e}", file=sys.stderr)
+            self._server = None
+        self._started.set()
+        if self._server is None:
+            return
+        try:
+            self._loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    async def _listen(self):
+        if not has_unix_sockets():
+            # Any local user can reach a TCP port, so require the token file's contents.
+            # The file is only written once the port is ours.
+            self._token = secrets.token_hex(32)
+            try:
+                server = await asyncio.start_server(self._handle_client, "127.0.0.1", self.port)
+            except OSError:
+                self._token = None
+                raise
+            write_token(self._token, self.token_path)
+            self.address = f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            return server
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.path):
+            # A live socket means another manager owns it; otherwise it is stale
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                raise OSError(f"{self.path} is in use by another process")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(self.path)
+            finally:
+                probe.close()
+        server = await asyncio.start_unix_server(self._handle_client, self.path)
+        os.chmod(self.path, 0o600)
+        self.address = self.path
+        return server
+
+    # -------------------------------------------------------------------------
+    # Connection handling (event loop thread)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = _Client(writer, authenticated=self._token is None)
+        try:
+            while self._running:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if not client.authenticated:
+                    if not self._authenticate(client, line):
+                        await writer.drain()
+                        break
+                    continue
+                self._accept(client, line)
+        except (ConnectionError, asyncio.CancelledError, ValueError):
+            pass
+        finally:
+            client.closed = True
+            writer.close()
+
+    def _authenticate(self, client: _Client, line: bytes) -> bool:
+        """Check a connection's first request against the token"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            self._write(client, self._error(None, INVALID_REQUEST, "auth required"))
+            return False
+        params = request.get("params")
+        token = params.get("token") if isinstance(params, dict) else None
+        if (request.get("method") != "auth" or not isinstance(token, str)
+                or not secrets.compare_digest(token, self._token)):
+            self._write(client, self._error(request.get("id"), INVALID_REQUEST, "auth required"))
+            return False
+        client.authenticated = True
+        self._write(client, {"jsonrpc": "2.0", "id": request.get("id"), "result": True})
+        return True
+
+    def _accept(self, client: _Client, line: bytes):
+        """Validate a request and queue it, or answer errors straight away"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self._write(client, {"jsonrpc": "2.0", "id": None,
+                                 "error": {"code": PARSE_ERROR, "message": "invalid JSON"}})
+            return
+
+        request_id = request.get("id") if isinstance(request, dict) else None
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            self._write(client, self._error(request_id, INVALID_REQUEST, "method is required"))
+        elif request["method"] not in self.methods:
+            self._write(client, self._error(request_id, METHOD_NOT_FOUND,
+                                            f"unknown method '{request['method']}'"))
+        elif len(client.pending) >= MAX_PENDING_PER_CLIENT:
+            self._write(client, self._error(request_id, SERVER_ERROR, "too many pending requests"))
+        else:
+            with self._ready_lock:
+                client.pending.append(request)
+                if len(client.pending) == 1:
+                    self._ready.append(client)
+                    self._ready_lock.notify()
+
+    def _write(self, client: _Client, response: Dict):
+        if not client.closed:
+            client.writer.write((json.dumps(response) + "\n").encode())
+
+    @staticmethod
+    def _error(request_id, code: int, message: str) -> Dict:
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+    # -------------------------------------------------------------------------
+    # Worker thread: one request per waiting client per round
+
+    def _work(self):
+        while self._running:
+            with self._ready_lock:
+                while self._running and not self._ready:
+                    self._ready_lock.wait()
+                if not self._running:
+                    return
+                client = self._ready.popleft()
+                request = client.pending[0]
+
+            response = self._execute(request)
+
+            with self._ready_lock:
+                client.pending.popleft()
+                if client.pending and not client.closed:
+                    self._ready.append(client)  # Back of the line
+            if "id" in request:  # Notifications get no reply
+                self._loop.call_soon_threadsafe(self._write, client, response)
+
+    def _execute(self, request: Dict) -> Dict:
+        params = request.get("params") or {}
+        try:
+            if not isinstance(params, dict):
+                raise RPCError(INVALID_PARAMS, "params must be an object")
+            if not self.pdm_comm.is_connected and request["method"] not in OFFLINE_METHODS:
+                raise RPCError(SERVER_ERROR, "PDM not connected")
+            result = self.methods[request["method"]](params)
+            # Serialise now, on the worker, so device_state is not read mid-update later
+            return json.loads(json.dumps({"jsonrpc": "2.0", "id": request.get("id"), "result": result}))
+        except RPCError as e:
+            return self._error(request.get("id"), e.code, str(e))
+        except Exception as e:
+            return self._error(request.get("id"), SERVER_ERROR, str(e))
+
+
+def rpc_call(method: str, params: Optional[Dict] = None, address: Optional[str] = None,
+             timeout: float = 10.0, token_path: str = TOKEN_PATH):
+    """
+    Call a method on a running manager and return its result
+
+    TCP connections authenticate first with the token in token_path.
+
+    Raises:
+        RPCError: if the server returned an error
+        OSError: if no manager is listening
+    """
+    if address is None:
+        address = SOCKET_PATH if has_unix_sockets() else f"127.0.0.1:{TCP_FALLBACK_PORT}"
+    if has_unix_sockets() and not address.startswith("127.0.0.1:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        target = address
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        host, _, port = address.rpartition(":")
+        target = (host, int(port))
+
+    with sock:
+        sock.settimeout(timeout)
+        sock.connect(target)
+        replies = sock.makefile("rb")
+        if sock.family == socket.AF_INET:
+            _request(sock, replies, "auth", {"token": read_token(token_path)})
+        return _request(sock, replies, method, params or {})
+
+
+def _request(sock: socket.socket, replies, method: str, params: Dict):
+    sock.sendall((json.dumps({"jsonrpc": "2.0", "id": 1, "method": method,
+                              "params": params}) + "\n").encode())
+    reply = replies.readline()
+    if not reply:
+        raise OSError("connection closed without a reply")
+    response = json.loads(reply)
+    if "error" in response:
+        raise RPCError(response["error"]["code"], response["error"]["message"])
+    return response["result"]
@@ -0,0 +1,217 @@
+"""
+Shared Memory Snapshot Module
+Publishes the latest device state into a shared memory block that other
+processes on the same machine can read without any IPC round trip
+
+Block layout (little-endian, LAYOUT_VERSION 1):
+
+    offset  type     field
+    0       char[4]  magic "PDMS"
+    4       uint16   layout version
+    6       uint16   block size in bytes
+    8       uint32   seqlock counter (odd while the writer is updating)
+    12      uint32   update count
+    16      float64  time.time() of the last update
+    24      float32  temperature (C)
+    28      float32  battery voltage (V)
+    32      uint32   uptime (s)
+    36      uint8    CAN OK (0/1)
+    37      uint8    digital output OK (0/1)
+    38      uint8    input mode (INPUT_MODES index)
+    39      uint8    reserved
+    40      4 x channel, 12 bytes each:
+            +0 float32 current (A)
+            +4 uint8   active (0/1)
+            +5 uint8   mode (0 = LATCH, 1 = MOMENTARY)
+            +6 uint8   group
+            +7 uint8   LED state (LED_STATES index)
+            +8 uint8   fault bits (FAULT_BITS)
+            +9 uint8[3] reserved
+    88      end
+
+Readers copy the counter, read the fields, and read the counter again; the
+read is consistent only if both values are equal and even.
+"""
+
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+import event_bus
+
+DEFAULT_NAME = "pdm_snapshot"
+MAGIC = b"PDMS"
+LAYOUT_VERSION = 1
+
+HEADER = struct.Struct("<4sHHIId")
+SEQ_OFFSET = 8
+SEQ = struct.Struct("<I")
+BODY = struct.Struct("<ffIBBBx")
+CHANNEL = struct.Struct("<fBBBBB3x")
+BODY_OFFSET = HEADER.size
+CHANNELS_OFFSET = BODY_OFFSET + BODY.size
+BLOCK_SIZE = CHANNELS_OFFSET + 4 * CHANNEL.size
+
+INPUT_MODES = ("NONE", "DIGITAL", "KEYPAD", "DIGOUT")
+LED_STATES = ("OFF", "GREEN", "BLUE", "AMBER", "RED", "RED FLASH")
+FAULT_BITS = {"OVERCURRENT": 0x01, "THERMAL": 0x02, "UNDERCURRENT": 0x04}
+
+# Blocks created by this process (already tracked by its resource tracker)
+_published = set()
+
+
+def _index(values: tuple, value, default: int = 0) -> int:
+    try:
+        return values.index(value)
+    except ValueError:
+        return default
+
+
+class SnapshotPublisher:
+    """Writes PDMCommunication.device_state into shared memory on every update"""
+
+    def __init__(self, pdm_comm, name: str = DEFAULT_NAME):
+        self.pdm_comm = pdm_comm
+        self.name = name
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.seq = 0
+        self.updates = 0
+        self._subscription = None
+
+    def start(self) -> bool:
+        """Create the block and start publishing; False if the name is taken"""
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=BLOCK_SIZE)
+        except FileExistsError:
+            print(f"Shared memory block '{self.name}' already exists", file=sys.stderr)
+            return False
+        _published.add(self.name)
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, LAYOUT_VERSION, BLOCK_SIZE, 0, 0, 0.0)
+        self.publish()
+        self._subscription = self.pdm_comm.events.subscribe(
+            self.publish, topics=event_bus.STATE_TOPICS, name="shm_snapshot")
+        return True
+
+    def stop(self):
+        """Stop publishing and remove the block"""
+        self.pdm_comm.events.unsubscribe(self._subscription)
+        self._subscription = None
+        if self.shm:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+            _published.discard(self.name)
+
+    def publish(self, event: Optional[event_bus.Event] = None):
+        """Write the current device_state (called on the event bus thread)"""
+        buf = self.shm.buf if self.shm else None
+        if buf is None:
+            return
+        state = self.pdm_comm.device_state
+
+        self.seq += 1  # Odd: update in progress
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq & 0xFFFFFFFF)
+
+        self.updates += 1
+        struct.pack_into("<Id", buf, SEQ_OFFSET + 4, self.updates & 0xFFFFFFFF, time.time())
+        BODY.pack_into(buf, BODY_OFFSET,
+                       state.get("temperature", 0.0),
+                       state.get("battery_voltage", 0.0),
+                       int(state.get("uptime", 0)) & 0xFFFFFFFF,
+                       1 if state.get("can_ok", True) else 0,
+                       1 if state.get("digout_ok", True) else 0,
+                       _index(INPUT_MODES, state.get("input_mode", "NONE")))
+        for ch, channel in enumerate(state["channels"][:4]):
+            faults = 0
+            for fault in channel.get("faults", []):
+                faults |= FAULT_BITS.get(fault, 0)
+            CHANNEL.pack_into(buf, CHANNELS_OFFSET + ch * CHANNEL.size,
+                              channel.get("current", 0.0),
+                              1 if channel.get("active") else 0,
+                              1 if channel.get("mode") == "M" else 0,
+                              int(channel.get("group", 0)) & 0xFF,
+                              _index(LED_STATES, channel.get("led_state", "OFF")),
+                              faults)
+
+        self.seq += 1  # Even: consistent
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq & 0xFFFFFFFF)
+
+
+class SnapshotReader:
+    """Attaches to a published block and reads consistent snapshots"""
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the block with this process's
+            # resource tracker, which would unlink it when the reader exits
+            self.shm = shared_memory.SharedMemory(name=name)
+            if os.name == "posix" and name not in _published:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+        magic, version, size, _, _, _ = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION or size != BLOCK_SIZE:
+            self.shm.close()
+            raise ValueError(f"'{name}' is not a PDM snapshot block (layout {version})")
+
+    def close(self):
+        self.shm.close()
+
+    def version(self) -> int:
+        """Seqlock counter; changes whenever a new snapshot has been written"""
+        return SEQ.unpack_from(self.shm.buf, SEQ_OFFSET)[0]
+
+    def read_raw(self, max_attempts: int = 1000) -> Optional[tuple]:
+        """
+        Read the numeric fields without building dicts
+
+        Returns:
+            (seq, updates, timestamp, body tuple, 4 channel tuples), or None
+            if the writer kept the block busy for max_attempts tries
+        """
+        buf = self.shm.buf
+        for _ in range(max_attempts):
+            seq = SEQ.unpack_from(buf, SEQ_OFFSET)[0]
+            if not seq & 1:
+                _, _, _, _, updates, timestamp = HEADER.unpack_from(buf, 0)
+                body = BODY.unpack_from(buf, BODY_OFFSET)
+                channels = tuple(CHANNEL.unpack_from(buf, CHANNELS_OFFSET + i * CHANNEL.size)
+                                 for i in range(4))
+                if SEQ.unpack_from(buf, SEQ_OFFSET)[0] == seq:
+                    return seq, updates, timestamp, body, channels
+            time.sleep(0)  # Let the writer finish
+        return None
+
+    def read(self) -> Optional[Dict]:
+        """Read a consistent snapshot in the same shape as device_state"""
+        raw = self.read_raw()
+        if raw is None:
+            return None
+        seq, updates, timestamp, body, channels = raw
+        temperature, battery, uptime, can_ok, digout_ok, input_mode = body
+        return {
+            "seq": seq,
+            "updates": updates,
+            "timestamp": timestamp,
+            "temperature": temperature,
+            "battery_voltage": battery,
+            "uptime": uptime,
+            "can_ok": bool(can_ok),
+            "digout_ok": bool(digout_ok),
+            "input_mode": INPUT_MODES[input_mode] if input_mode < len(INPUT_MODES) else "NONE",
+            "channels": [
+                {
+                    "current": current,
+                    "active": bool(active),
+                    "mode": "M" if mode else "L",
+                    "group": group,
+                    "led_state": LED_STATES[led] if led < len(LED_STATES) else "UNKNOWN",
+                    "faults": [name for name, bit in FAULT_BITS.items() if faults & bit]
+                }
+                for current, active, mode, group, led, faults in channels
+            ]
+        }
@@ -0,0 +1,370 @@
+"""
+Telemetry Decoder Module
+Bulk offline decoding of PDM telemetry frames (0x380 + node, and the
+multiplexed extended frames at 0x480 + node) from CAN logs
+
+Logs are processed in large chunks. candump -l and Vector ASC text is scanned
+with one regular expression per chunk that only matches telemetry IDs, and
+binary traces written by 'pdm.py trace --format binary' are memory-mapped.
+The matching frames are decoded with NumPy array operations, so Python does
+a fixed amount of work per chunk instead of per frame. Decoded chunks feed
+a per-node summary and, optionally, the same state update records that
+'pdm.py record' writes for the live serial link.
+
+Extended frames are turned into the same columns as the legacy frame: each
+high-resolution currents frame becomes a row carrying the node's latest
+states and diagnostics frames. Where a node sends both (TELMODE BOTH) its
+legacy frames are dropped.
+
+ASC timestamps are relative to the start of the log; candump and binary
+traces carry absolute times.
+"""
+
+import json
+import os
+import re
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+import pdm_can
+from can_trace import FRAME_DTYPE, FRAME_RECORD, TRACE_MAGIC, np
+
+CHUNK_BYTES = 32 * 1024 * 1024   # Text read per regex pass
+CHUNK_FRAMES = 4 * 1024 * 1024   # Binary records per pass
+
+# "(1697712000.123456) can0 395#05001A001F20D430"
+_CANDUMP_RE = re.compile(
+    rb"^\((\d+\.\d+)\) \S+ ([34][89A-Fa-f][0-9A-Fa-f])#([0-9A-Fa-f]{16})(?=\s)", re.M)
+# "   12.345678 1  395             Rx   d 8 05 00 1A 00 1F 20 D4 30 ..."
+_ASC_RE = re.compile(
+    rb"^[ \t]*(\d+\.\d+)[ \t]+\d+[ \t]+([34][89A-Fa-f][0-9A-Fa-f])[ \t]+[RT]x[ \t]+d[ \t]+8((?:[ \t]+[0-9A-Fa-f]{2}){8})",
+    re.M)
+
+# ASCII code -> hex digit value
+_HEX_VALUES = None
+if np is not None:
+    _HEX_VALUES = np.zeros(256, dtype=np.uint32)
+    for _value, _char in enumerate("0123456789abcdef"):
+        _HEX_VALUES[ord(_char)] = _HEX_VALUES[ord(_char.upper())] = _value
+
+# Frame chunk: times (float64), COB-IDs (uint32), payloads (uint8, n x 8)
+FrameChunk = Tuple["np.ndarray", "np.ndarray", "np.ndarray"]
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("NumPy is required for offline decoding (pip install numpy)")
+
+
+# -----------------------------------------------------------------------------
+# Readers: each yields chunks of telemetry frames only
+
+def read_frames(path: str) -> Iterator[FrameChunk]:
+    """Telemetry frames from a binary trace, ASC log or candump log (by content/extension)"""
+    _require_numpy()
+    with open(path, "rb") as f:
+        magic = f.read(len(TRACE_MAGIC))
+    if magic == TRACE_MAGIC:
+        return read_binary(path)
+    if path.lower().endswith(".asc"):
+        return _read_text(path, _ASC_RE)
+    return _read_text(path, _CANDUMP_RE)
+
+
+def read_binary(path: str) -> Iterator[FrameChunk]:
+    """Memory-map a binary trace and select telemetry frames chunk by chunk"""
+    count = (os.path.getsize(path) - len(TRACE_MAGIC)) // FRAME_RECORD.size
+    if count <= 0:
+        return
+    records = np.memmap(path, dtype=FRAME_DTYPE, mode="r", offset=len(TRACE_MAGIC), shape=(count,))
+    for start in range(0, count, CHUNK_FRAMES):
+        chunk = records[start:start + CHUNK_FRAMES]
+        ids = chunk["id"]
+        codes = ids & 0x780
+        mask = (((codes == pdm_can.TELEMETRY) | (codes == pdm_can.TELEMETRY_EXT)) & (ids <= 0x7FF) &
+                ((ids & 0x7F) != 0) & (chunk["dlc"] == 8))
+        selected = chunk[mask]
+        if len(selected):
+            yield selected["t"].astype(np.float64), selected["id"].astype(np.uint32), np.array(selected["data"])
+
+
+def _read_text(path: str, pattern) -> Iterator[FrameChunk]:
+    with open(path, "rb") as f:
+        tail = b""
+        while True:
+            block = f.read(CHUNK_BYTES)
+            if block:
+                text = tail + block
+                cut = text.rfind(b"\n") + 1
+                text, tail = text[:cut], text[cut:]
+            else:
+                text = tail + b"\n"
+            matches = pattern.findall(text)
+            if matches:
+                yield _text_chunk(matches)
+            if not block:
+                break
+
+
+def _text_chunk(matches) -> FrameChunk:
+    n = len(matches)
+    t = np.fromiter(map(float, [m[0] for m in matches]), dtype=np.float64, count=n)
+    # IDs are always three hex digits here: convert them all at once
+    digits = _HEX_VALUES[np.frombuffer(b"".join([m[1] for m in matches]), dtype=np.uint8)].reshape(-1, 3)
+    can_id = (digits[:, 0] << 8) | (digits[:, 1] << 4) | digits[:, 2]
+    data = np.frombuffer(bytes.fromhex(b"".join([m[2] for m in matches]).decode("ascii")), dtype=np.uint8)
+    return t, can_id, data.reshape(-1, 8)
+
+
+# -----------------------------------------------------------------------------
+# Decoding
+
+def decode_telemetry(t, can_id, data) -> Dict[str, "np.ndarray"]:
+    """Telemetry columns: t, node, currents (n x 4, A), temperature, flags, battery_mv"""
+    return {
+        "t": t,
+        "node": (can_id & 0x7F).astype(np.uint8),
+        "currents": data[:, :4] * np.float32(pdm_can.TELEMETRY_CURRENT_SCALE),
+        "temperature": data[:, 4].astype(np.float32),
+        "flags": data[:, 5],
+        "battery_mv": data[:, 6].astype(np.uint16) | (data[:, 7].astype(np.uint16) << 8)
+    }
+
+
+def _select(columns: Dict, mask) -> Dict:
+    return {key: values[mask] for key, values in columns.items()}
+
+
+def _latest(mask, values, carry):
+    """values at the last row up to each row where mask is set; carry before the first"""
+    index = np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+    return np.where(index >= 0, values[np.maximum(index, 0)], carry), index >= 0
+
+
+class ExtendedTelemetry:
+    """Turns one node's multiplexed frames (0x480 + node) into telemetry columns
+
+    Rows are the currents frames; flags (bits 8-11 thermal), active mask,
+    temperature and battery come from the latest states and diagnostics
+    frames, carried across chunks. Rows before the first of each are dropped.
+    """
+
+    def __init__(self, node: int):
+        self.node = node
+        self.frames = 0
+        self.lost = 0  # Rolling counter gaps
+        self._counter: Optional[int] = None
+        self._states: Optional[Tuple[int, int]] = None  # flags, active
+        self._diagnostics: Optional[Tuple[float, int]] = None  # temperature, battery_mv
+
+    def columns(self, t, data) -> Dict[str, "np.ndarray"]:
+        self.frames += len(t)
+        counter = data[:, 7].astype(np.int64)
+        if self._counter is not None:
+            counter = np.concatenate(([self._counter], counter))
+        self.lost += int(((np.diff(counter) - 1) & 0xFF).sum())
+        self._counter = int(counter[-1])
+
+        mux = data[:, 0]
+        states_rows = mux == pdm_can.MUX_STATES
+        diag_rows = mux == pdm_can.MUX_DIAGNOSTICS
+        d = data.astype(np.uint16)
+        flags = d[:, 3] | (d[:, 2] << 4) | (d[:, 4] << 8)
+        flags, have_states = _latest(states_rows, flags, self._states[0] if self._states else 0)
+        active, _ = _latest(states_rows, data[:, 1], self._states[1] if self._states else 0)
+        temperature = (d[:, 1] | (d[:, 2] << 8)).astype(np.int16) * np.float32(pdm_can.EXT_TEMPERATURE_SCALE)
+        temperature, have_diag = _latest(diag_rows, temperature, self._diagnostics[0] if self._diagnostics else 0)
+        battery, _ = _latest(diag_rows, d[:, 3] | (d[:, 4] << 8), self._diagnostics[1] if self._diagnostics else 0)
+        if self._states is not None:
+            have_states[:] = True
+        if self._diagnostics is not None:
+            have_diag[:] = True
+        if states_rows.any():
+            self._states = (int(flags[-1]), int(active[-1]))
+        if diag_rows.any():
+            self._diagnostics = (float(temperature[-1]), int(battery[-1]))
+
+        rows = (mux == pdm_can.MUX_CURRENTS) & have_states & have_diag
+        current_data = d[rows]
+        raw = np.stack([current_data[:, 1] | ((current_data[:, 2] & 0x0F) << 8),
+                        (current_data[:, 2] >> 4) | (current_data[:, 3] << 4),
+                        current_data[:, 4] | ((current_data[:, 5] & 0x0F) << 8),
+                        (current_data[:, 5] >> 4) | (current_data[:, 6] << 4)], axis=1)
+        return {
+            "t": t[rows],
+            "node": np.full(int(rows.sum()), self.node, dtype=np.uint8),
+            "currents": raw * np.float32(pdm_can.EXT_CURRENT_SCALE),
+            "temperature": np.round(temperature[rows], 1).astype(np.float32),
+            "flags": flags[rows].astype(np.uint16),
+            "battery_mv": battery[rows].astype(np.uint16),
+            "active": active[rows].astype(np.uint8)
+        }
+
+
+def _bit_counts(flags) -> "np.ndarray":
+    """Rows with each of the 12 fault bits set"""
+    bits = np.unpackbits(flags.astype("<u2").view(np.uint8).reshape(-1, 2), axis=1, bitorder="little")
+    return bits[:, :12].sum(axis=0, dtype=np.int64)
+
+
+class NodeSummary:
+    """Running statistics for one node's telemetry"""
+
+    def __init__(self, node: int):
+        self.node = node
+        self.frames = 0
+        self.first = self.last = None
+        self.current_min = np.full(4, np.inf)
+        self.current_max = np.zeros(4)
+        self.current_sum = np.zeros(4)
+        self.temperature = [np.inf, -np.inf, 0.0]   # min, max, sum
+        self.battery_mv = [np.inf, -np.inf, 0.0]
+        self.fault_frames = np.zeros(12, dtype=np.int64)   # Per fault bit
+        self.fault_onsets = np.zeros(12, dtype=np.int64)
+        self.last_flags = 0
+
+    def update(self, columns: Dict):
+        n = len(columns["t"])
+        if not n:
+            return
+        t = columns["t"]
+        self.first = float(t[0]) if self.first is None else self.first
+        self.last = float(t[-1])
+        self.frames += n
+
+        currents = columns["currents"]
+        self.current_min = np.minimum(self.current_min, currents.min(axis=0))
+        self.current_max = np.maximum(self.current_max, currents.max(axis=0))
+        self.current_sum += currents.sum(axis=0, dtype=np.float64)
+        for stats, values in ((self.temperature, columns["temperature"]), (self.battery_mv, columns["battery_mv"])):
+            stats[0] = min(stats[0], float(values.min()))
+            stats[1] = max(stats[1], float(values.max()))
+            stats[2] += float(values.sum(dtype=np.float64))
+
+        flags = columns["flags"].astype(np.uint16)
+        previous = np.concatenate(([self.last_flags], flags[:-1])).astype(np.uint16)
+        rising = flags & ~previous
+        self.fault_frames += _bit_counts(flags)
+        self.fault_onsets += _bit_counts(rising)
+        self.last_flags = int(flags[-1])
+
+    def to_dict(self) -> Dict:
+        n = max(self.frames, 1)
+
+        def per_channel(counts):
+            return {f"ch{ch + 1}": {"undercurrent": int(counts[ch]), "overcurrent": int(counts[ch + 4]),
+                                    "thermal": int(counts[ch + 8])}
+                    for ch in range(4)}
+
+        return {
+            "frames": self.frames,
+            "first": self.first,
+            "last": self.last,
+            "current_min": [round(float(v), 2) for v in self.current_min] if self.frames else [],
+            "current_avg": [round(float(v) / n, 3) for v in self.current_sum],
+            "current_max": [round(float(v), 2) for v in self.current_max],
+            "temperature": {"min": round(self.temperature[0], 2), "avg": round(self.temperature[2] / n, 2),
+                            "max": round(self.temperature[1], 2)} if self.frames else {},
+            "battery_voltage": {"min": round(self.battery_mv[0] / 1000, 3),
+                                "avg": round(self.battery_mv[2] / n / 1000, 3),
+                                "max": round(self.battery_mv[1] / 1000, 3)} if self.frames else {},
+            "fault_frames": per_channel(self.fault_frames),
+            "fault_onsets": per_channel(self.fault_onsets)
+        }
+
+
+class StateRecordWriter:
+    """Writes decoded telemetry as 'pdm.py record' state updates
+
+    One set of updates is written per node every interval seconds and whenever
+    the fault flags (or, from extended frames, channel states) change, rather
+    than one per frame.
+    """
+
+    def __init__(self, out: TextIO, label: str, interval: float = 2.0):
+        self.out = out
+        self.label = label
+        self.interval = interval
+        self.records = 0
+        self._last: Dict[int, Tuple[float, int]] = {}  # node -> (time bin, state)
+
+    def write(self, node: int, columns: Dict):
+        t, flags = columns["t"], columns["flags"].astype(np.int64)
+        if not len(t):
+            return
+        active = columns.get("active")
+        state = flags | (active.astype(np.int64) << 16) if active is not None else flags
+        bins = np.floor(t / self.interval) if self.interval > 0 else np.arange(len(t), dtype=np.float64)
+        last_bin, last_state = self._last.get(node, (-1.0, -1))
+        previous_bins = np.concatenate(([last_bin], bins[:-1]))
+        previous_state = np.concatenate(([last_state], state[:-1]))
+        keep = np.flatnonzero((bins != previous_bins) | (state != previous_state))
+        self._last[node] = (float(bins[-1]), int(state[-1]))
+
+        currents, temperature, battery = columns["currents"], columns["temperature"], columns["battery_mv"]
+        lines = []
+        for i in keep:
+            head = {"t": round(float(t[i]), 3), "port": self.label, "node": node}
+            faults = pdm_can.telemetry_faults(int(flags[i]))
+            for ch in range(4):
+                data = {"channel": ch, "current": round(float(currents[i, ch]), 2), "faults": faults[ch]}
+                if active is not None:
+                    data["active"] = bool(active[i] & (1 << ch))
+                lines.append(json.dumps(dict(head, type="channel_status", data=data)))
+            lines.append(json.dumps(dict(head, type="temperature", data=round(float(temperature[i]), 1))))
+            lines.append(json.dumps(dict(head, type="battery_voltage", data=int(battery[i]) / 1000)))
+        if lines:
+            self.out.write("\n".join(lines) + "\n")
+            self.records += len(lines)
+
+
+def decode_logs(paths: Iterable[str], node: Optional[int] = None, records: Optional[TextIO] = None,
+                interval: float = 2.0) -> Dict:
+    """
+    Decode the telemetry frames in one or more logs
+
+    Args:
+        paths: candump (.log), Vector ASC (.asc) or binary trace files, in time order
+        node: Only this PDM node ID (default: every node seen)
+        records: Also write state update records here (JSON lines)
+        interval: Seconds between routine records per node
+
+    Returns:
+        Frame count and per-node summaries
+    """
+    _require_numpy()
+    summaries: Dict[int, NodeSummary] = {}
+    extended: Dict[int, ExtendedTelemetry] = {}
+    total = 0
+    for path in paths:
+        writer = StateRecordWriter(records, os.path.basename(path), interval) if records else None
+        for t, can_id, data in read_frames(path):
+            total += len(t)
+            ext = (can_id & 0x780) == pdm_can.TELEMETRY_EXT
+            nodes = (can_id & 0x7F).astype(np.uint8)
+            columns = decode_telemetry(t[~ext], can_id[~ext], data[~ext])
+            present = [node] if node is not None else np.flatnonzero(np.bincount(nodes, minlength=128))
+            for n in present:
+                n = int(n)
+                node_ext = ext & (nodes == n)
+                if node_ext.any():
+                    if n not in extended:
+                        extended[n] = ExtendedTelemetry(n)
+                    node_columns = extended[n].columns(t[node_ext], data[node_ext])
+                elif n in extended:
+                    continue  # Legacy duplicates of the extended frames
+                else:
+                    node_columns = _select(columns, columns["node"] == n)
+                if not len(node_columns["t"]):
+                    continue
+                if n not in summaries:
+                    summaries[n] = NodeSummary(n)
+                summaries[n].update(node_columns)
+                if writer:
+                    writer.write(n, node_columns)
+    result = {"frames": total, "nodes": {}}
+    for n in sorted(summaries):
+        if summaries[n].frames:
+            summary = result["nodes"][f"0x{n:02X}"] = summaries[n].to_dict()
+            if n in extended:
+                summary["extended"] = {"frames": extended[n].frames, "lost": extended[n].lost}
+    return result
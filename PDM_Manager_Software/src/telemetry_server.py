@@ -0,0 +1,328 @@
+"""
+Telemetry Server Module
+Shares live PDM data with other local programs over HTTP and WebSocket
+
+Updates arrive through the event bus on its delivery thread, which only
+appends each update to every client's bounded queue (oldest entries are
+dropped when a client falls behind) and wakes the server's event loop. All
+socket I/O happens on the server thread, so a slow or stalled client can
+never hold up serial reading.
+
+Endpoints:
+    GET /snapshot   Latest device state as JSON
+    GET /stats      Connected clients and per-client drop counters
+    GET /ws         WebSocket: one snapshot message, then one message per update
+
+Browsers may only use the server from pages served by this machine
+(localhost, 127.0.0.1 or [::1] origins); other origins get 403, so a web
+page opened in the user's browser cannot read live data. Clients that send
+no Origin header (scripts, other programs) are always served.
+"""
+
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import struct
+import sys
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import event_bus
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# WebSocket opcodes
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+
+# Close status codes (RFC 6455 section 7.4.1)
+WS_PROTOCOL_ERROR = 1002
+WS_MESSAGE_TOO_BIG = 1009
+
+# Largest client frame payload accepted; clients only send pings and closes
+MAX_CLIENT_PAYLOAD = 64 * 1024
+
+
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def is_local_origin(origin: str) -> bool:
+    """Whether a browser Origin header names a page served from this machine"""
+    try:
+        parts = urlsplit(origin)
+        return parts.scheme in ("http", "https") and parts.hostname in LOCAL_HOSTS
+    except ValueError:
+        return False
+
+
+def copy_state(state: Dict) -> Dict:
+    """Copy device_state deep enough that later updates do not show through"""
+    return {key: [dict(item) for item in value] if isinstance(value, list) else value
+            for key, value in state.items()}
+
+
+def ws_frame(opcode: int, payload: bytes) -> bytes:
+    """Build an unmasked (server to client) WebSocket frame"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class _Message:
+    """One update, encoded to a WebSocket frame at most once"""
+    __slots__ = ("body", "_frame")
+
+    def __init__(self, body: Dict):
+        self.body = body
+        self._frame = None
+
+    @property
+    def frame(self) -> bytes:
+        if self._frame is None:
+            self._frame = ws_frame(WS_TEXT, json.dumps(self.body).encode())
+        return self._frame
+
+
+class _Client:
+    """Per-connection queue and counters"""
+
+    def __init__(self, peer: str, queue_size: int):
+        self.peer = peer
+        self.queue = collections.deque(maxlen=queue_size)
+        self.dropped = 0
+        self.sent = 0
+        self.wakeup = asyncio.Event()
+
+
+class TelemetryServer:
+    """HTTP snapshot and WebSocket delta server fed by a PDMCommunication"""
+
+    def __init__(self, pdm_comm, host: str = "127.0.0.1", port: int = 8765,
+                 queue_size: int = 256):
+        self.pdm_comm = pdm_comm
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+
+        self.snapshot = copy_state(pdm_comm.device_state)
+        self.seq = 0
+        self._clients = ()  # Replaced, never mutated, so the reader can iterate it safely
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake_pending = False
+        self._started = threading.Event()
+        self._subscription = None
+
+    # -------------------------------------------------------------------------
+    # Event bus side
+
+    def publish(self, event: event_bus.Event):
+        """Queue an update for every client (called on the event bus thread)"""
+        self.seq += 1
+        self.snapshot = copy_state(self.pdm_comm.device_state)
+        message = _Message({"seq": self.seq, "t": round(event.time, 3),
+                            "type": event.type, "data": event.data})
+        for client in self._clients:
+            if len(client.queue) == client.queue.maxlen:
+                client.dropped += 1
+            client.queue.append(message)
+
+        # One wakeup per batch of updates, however many arrive before the loop runs
+        if self._clients and not self._wake_pending and self._loop:
+            self._wake_pending = True
+            try:
+                self._loop.call_soon_threadsafe(self._wake_clients)
+            except RuntimeError:
+                pass  # Loop closed while stopping
+
+    def _wake_clients(self):
+        self._wake_pending = False
+        for client in self._clients:
+            client.wakeup.set()
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+
+    def start(self) -> bool:
+        """Start serving on a background thread; False if the port could not be bound"""
+        if self._thread and self._thread.is_alive():
+            return True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait(5.0)
+        if self._server is None:
+            return False
+        self._subscription = self.pdm_comm.events.subscribe(
+            self.publish, topics=event_bus.STATE_TOPICS, name="telemetry_server")
+        return True
+
+    def stop(self):
+        """Stop serving and disconnect all clients"""
+        self.pdm_comm.events.unsubscribe(self._subscription)
+        self._subscription = None
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self._server = None
+
+    def get_stats(self) -> Dict:
+        """Client list with queue depth and drop counters"""
+        return {
+            "seq": self.seq,
+            "clients": [{"peer": c.peer, "queued": len(c.queue), "sent": c.sent,
+                         "dropped": c.dropped} for c in self._clients]
+        }
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, self.host, self.port))
+            if self.port == 0:
+                self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            print(f"Telemetry server failed to start: {e}", file=sys.stderr)
+            self._server = None
+            self._started.set()
+            return
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._clients = ()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    # -------------------------------------------------------------------------
+    # HTTP / WebSocket handling (server thread)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10.0)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError):
+            writer.close()
+            return
+
+        lines = request.decode("latin-1").split("\r\n")
+        parts = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            key, sep, value = line.partition(":")
+            if sep:
+                headers[key.strip().lower()] = value.strip()
+
+        path = parts[1].split("?")[0] if len(parts) >= 2 else ""
+        origin = headers.get("origin")
+        try:
+            if origin is not None and not is_local_origin(origin):
+                await self._send_http(writer, 403, {"error": "origin not allowed"})
+            elif len(parts) < 2 or parts[0] != "GET":
+                await self._send_http(writer, 405, {"error": "only GET is supported"}, origin)
+            elif path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._serve_websocket(reader, writer, headers)
+            elif path in ("/", "/snapshot"):
+                await self._send_http(writer, 200, {"seq": self.seq, "state": self.snapshot}, origin)
+            elif path == "/stats":
+                await self._send_http(writer, 200, self.get_stats(), origin)
+            else:
+                await self._send_http(writer, 404, {"error": "not found"}, origin)
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Client went away, or the server is stopping
+        finally:
+            writer.close()
+
+    async def _send_http(self, writer: asyncio.StreamWriter, status: int, body: Dict,
+                         origin: Optional[str] = None):
+        """Send a JSON response; origin (already checked as local) is allowed to read it"""
+        payload = json.dumps(body).encode()
+        reason = {200: "OK", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed"}.get(status, "")
+        cors = f"Access-Control-Allow-Origin: {origin}\r\nVary: Origin\r\n" if origin else ""
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"{cors}"
+            f"Connection: close\r\n\r\n".encode() + payload)
+        await writer.drain()
+
+    async def _serve_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                               headers: Dict):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode())
+
+        peer = writer.get_extra_info("peername")
+        client = _Client(f"{peer[0]}:{peer[1]}" if peer else "?", self.queue_size)
+        # Snapshot first, taken before the client starts receiving updates
+        writer.write(ws_frame(WS_TEXT, json.dumps(
+            {"seq": self.seq, "type": "snapshot", "data": self.snapshot}).encode()))
+        self._clients = self._clients + (client,)
+
+        receiver = asyncio.ensure_future(self._receive_websocket(reader, writer))
+        try:
+            while not receiver.done():
+                await writer.drain()
+                waiter = asyncio.ensure_future(client.wakeup.wait())
+                await asyncio.wait([receiver, waiter], return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                client.wakeup.clear()
+                while client.queue:
+                    writer.write(client.queue.popleft().frame)
+                    client.sent += 1
+        except ConnectionError:
+            pass
+        finally:
+            self._clients = tuple(c for c in self._clients if c is not client)
+            receiver.cancel()
+
+    async def _receive_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Handle client frames: answer pings, stop on close; data is ignored"""
+        try:
+            while True:
+                head = await reader.readexactly(2)
+                opcode = head[0] & 0x0F
+                length = head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await reader.readexactly(8))[0]
+                if not head[1] & 0x80:
+                    # Client frames must be masked
+                    writer.write(ws_frame(WS_CLOSE, struct.pack("!H", WS_PROTOCOL_ERROR)))
+                    return
+                if length > MAX_CLIENT_PAYLOAD:
+                    writer.write(ws_frame(WS_CLOSE, struct.pack("!H", WS_MESSAGE_TOO_BIG)))
+                    return
+                mask = await reader.readexactly(4)
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+
+                if opcode == WS_CLOSE:
+                    writer.write(ws_frame(WS_CLOSE, payload[:2]))
+                    return
+                if opcode == WS_PING:
+                    writer.write(ws_frame(WS_PONG, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
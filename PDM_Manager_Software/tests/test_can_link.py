@@ -0,0 +1,194 @@
+"""
+Round trip over a virtual SocketCAN bus: frames sent as the PDM would send
+them must come out of CANLink as status updates and event bus topics
+
+Skipped unless the interface exists (Linux only):
+    sudo modprobe vcan
+    sudo ip link add dev vcan0 type vcan && sudo ip link set up vcan0
+Set PDM_TEST_CAN to use another interface.
+"""
+
+import importlib.util
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import can_link
+import event_bus
+import pdm_can
+from comm_metrics import CommMetrics
+
+INTERFACE = os.environ.get("PDM_TEST_CAN", "vcan0")
+NODE = pdm_can.DEFAULT_NODE_ID
+TIMEOUT = 2.0
+
+HAS_CAN = can_link.is_can_interface(INTERFACE)
+SKIP_REASON = f"SocketCAN interface {INTERFACE} not available"
+
+# Legacy telemetry (0x380 + node): 1.0 A, 0 A, 5.2 A, 0 A; 31 degC; ch1 overcurrent; 12.5 V
+LEGACY_TELEMETRY = bytes.fromhex("05001A001F20D430")
+
+
+def frame(can_id: int, data: bytes) -> bytes:
+    return can_link.CAN_FRAME.pack(can_id, len(data), data.ljust(8, b"\0"))
+
+
+def open_sender() -> socket.socket:
+    sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+    sock.bind((INTERFACE,))
+    return sock
+
+
+class TelemetryModeTest(unittest.TestCase):
+    """Frame handlers driven directly, so no interface is needed"""
+
+    def setUp(self):
+        self.updates = []
+        self.metrics = CommMetrics()
+        self.link = can_link.CANLink(INTERFACE, lambda update_type, data: self.updates.append((update_type, data)),
+                                     self.metrics, pdm_node=NODE, keypad_node=NODE)
+        self.extended = self.link.handlers[pdm_can.cob_id("telemetry_ext", NODE)]
+        self.legacy = self.link.handlers[pdm_can.cob_id("telemetry", NODE)]
+
+    def test_both_keeps_extended_values(self):
+        for counter in range(6):
+            self.extended(bytes([pdm_can.MUX_DIAGNOSTICS, 0xFF, 0x00, 0xE8, 0x35, 0, 0, counter]))
+            self.legacy(LEGACY_TELEMETRY)  # Sent alongside the extended frame each period
+        self.assertEqual(self.updates, [("temperature", 25.5), ("battery_voltage", 13.8)])
+
+    def test_legacy_resumes_after_telmode_legacy(self):
+        self.extended(bytes([pdm_can.MUX_DIAGNOSTICS, 0xFF, 0x00, 0xE8, 0x35, 0, 0, 0]))
+        self.updates.clear()
+
+        for _ in range(can_link.EXTENDED_LAPSE - 1):
+            self.legacy(LEGACY_TELEMETRY)
+        self.assertEqual(self.updates, [])
+        self.legacy(LEGACY_TELEMETRY)
+        self.assertIn(("temperature", 31.0), self.updates)
+        self.assertIn(("battery_voltage", 12.5), self.updates)
+
+        # Switching back to extended telemetry is not counted as lost frames
+        self.extended(bytes([pdm_can.MUX_DIAGNOSTICS, 0xFF, 0x00, 0xE8, 0x35, 0, 0, 40]))
+        self.assertEqual(self.metrics.counters["can_frames_lost"], 0)
+        self.assertEqual(self.updates[-2:], [("temperature", 25.5), ("battery_voltage", 13.8)])
+
+
+@unittest.skipUnless(HAS_CAN, SKIP_REASON)
+class CANLinkRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.updates = queue.Queue()
+        self.metrics = CommMetrics()
+        self.link = can_link.CANLink(INTERFACE, lambda update_type, data: self.updates.put((update_type, data)),
+                                     self.metrics, pdm_node=NODE, keypad_node=NODE)
+        self.link.open()
+        self.running = True
+        self.reader = threading.Thread(target=self.link.run, args=(lambda: self.running,), daemon=True)
+        self.reader.start()
+        self.sender = open_sender()
+
+    def tearDown(self):
+        self.running = False
+        self.reader.join(timeout=2.0)
+        self.link.close()
+        self.sender.close()
+
+    def send(self, kind: str, data: bytes, node: int = NODE):
+        self.sender.send(frame(pdm_can.cob_id(kind, node), data))
+
+    def collect(self, count: int):
+        """Wait for count status updates"""
+        received = []
+        deadline = time.monotonic() + TIMEOUT
+        while len(received) < count:
+            try:
+                received.append(self.updates.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                self.fail(f"got {len(received)} of {count} updates: {received}")
+        return received
+
+    def test_legacy_telemetry(self):
+        self.send("telemetry", LEGACY_TELEMETRY)
+        updates = self.collect(6)
+
+        self.assertIn(("temperature", 31.0), updates)
+        self.assertIn(("battery_voltage", 12.5), updates)
+        self.assertIn(("channel_status", {"channel": 1, "current": 0.0, "faults": ["OVERCURRENT"]}), updates)
+        self.assertIn(("channel_status", {"channel": 2, "current": 5.2, "faults": []}), updates)
+
+    def test_extended_telemetry(self):
+        # Diagnostics: 25.5 degC, 13.8 V; counter 0
+        self.send("telemetry_ext", bytes([pdm_can.MUX_DIAGNOSTICS, 0xFF, 0x00, 0xE8, 0x35, 0, 0, 0]))
+        self.assertEqual(self.collect(2), [("temperature", 25.5), ("battery_voltage", 13.8)])
+
+        # States: ch0 and ch2 on, ch2 overcurrent, keypad input, CAN ok; counter 1
+        self.send("telemetry_ext", bytes([pdm_can.MUX_STATES, 0x05, 0x04, 0, 0, 2, 0x01, 1]))
+        updates = self.collect(7)
+        self.assertIn(("channel_status", {"channel": 2, "active": True, "faults": ["OVERCURRENT"]}), updates)
+        self.assertIn(("input_mode", "KEYPAD"), updates)
+        self.assertIn(("can_status", True), updates)
+
+        # Currents: ch0 raw 500 (10.0 A); counter 5, so three frames were lost
+        self.send("telemetry_ext", bytes([pdm_can.MUX_CURRENTS, 0xF4, 0x01, 0, 0, 0, 0, 5]))
+        self.assertEqual(self.collect(4), [("channel_status", {"channel": ch, "current": current})
+                                           for ch, current in enumerate((10.0, 0.0, 0.0, 0.0))])
+        self.assertEqual(self.metrics.counters["can_frames_lost"], 3)
+
+        # Legacy frames are ignored once extended telemetry is seen
+        self.send("telemetry", LEGACY_TELEMETRY)
+        self.send("heartbeat", bytes([0x00]))  # Boot-up heartbeat: decoded but no update
+        time.sleep(0.2)
+        self.assertTrue(self.updates.empty())
+
+    def test_other_frames_are_filtered(self):
+        self.sender.send(frame(0x123, b"\x01\x02"))
+        self.send("telemetry", LEGACY_TELEMETRY, node=NODE + 1)
+        self.send("telemetry", LEGACY_TELEMETRY)
+        self.collect(6)
+        self.assertEqual(self.link.frames, 1)
+
+
+@unittest.skipUnless(HAS_CAN, SKIP_REASON)
+@unittest.skipUnless(importlib.util.find_spec("serial"), "pyserial not installed")
+class PDMCommunicationCANTest(unittest.TestCase):
+    """PDMCommunication.connect() with an interface name publishes the same topics as serial"""
+
+    def setUp(self):
+        from pdm_communication import PDMCommunication
+        self.comm = PDMCommunication()
+        self.callbacks = queue.Queue()
+        self.comm.set_status_callback(lambda update_type, data: self.callbacks.put((update_type, data)))
+        self.subscription = self.comm.events.subscribe(None, topics=event_bus.STATE_TOPICS, name="test")
+        self.assertTrue(self.comm.connect(INTERFACE))
+        self.sender = open_sender()
+
+    def tearDown(self):
+        self.comm.events.unsubscribe(self.subscription)
+        self.comm.disconnect()
+        self.sender.close()
+
+    def test_telemetry_reaches_callback_and_topics(self):
+        self.sender.send(frame(pdm_can.cob_id("telemetry", NODE), LEGACY_TELEMETRY))
+
+        self.assertEqual(self.callbacks.get(timeout=TIMEOUT)[0], "channel_status")
+        topics = set()
+        deadline = time.monotonic() + TIMEOUT
+        while time.monotonic() < deadline and not topics >= set(event_bus.STATE_TOPICS) - {event_bus.SYSTEM}:
+            topics.update(event.topic for event in self.subscription.take())
+            time.sleep(0.01)
+        self.assertEqual(topics, {event_bus.TEMPERATURE, event_bus.BATTERY, event_bus.CHANNEL, event_bus.FAULT})
+
+        self.assertEqual(self.comm.device_state["temperature"], 31.0)
+        self.assertEqual(self.comm.device_state["battery_voltage"], 12.5)
+        self.assertEqual(self.comm.device_state["channels"][1]["faults"], ["OVERCURRENT"])
+        self.assertIsNone(self.comm.send_command("STATUS"))  # Read-only link
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,274 @@
+"""
+Tests for the direct upload path: recipe resolution from board properties,
+command building, and a stub upload tool driven through FirmwareUpdater
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from direct_uploader import DirectUploader, split_quoted
+from firmware_image import FirmwareIndex, parse_hex_lines
+from firmware_updater import FirmwareUpdater
+
+FQBN = "arduino:renesas_uno:unor4minima"
+
+# Trimmed 'arduino-cli board details --show-properties=expanded' output
+BOARD_DETAILS = """\
+name=Arduino UNO R4 Minima
+build.project_name={build.project_name}
+upload.tool=dfu-util
+upload.tool.default=dfu-util
+upload.protocol=sam-ba
+upload.use_1200bps_touch=true
+upload.wait_for_upload_port=true
+upload.vid=0x2341
+upload.pid=0x0069
+upload.address=0x4000
+runtime.tools.dfu-util.path=/opt/arduino/tools/dfu-util/0.11.0-arduino5
+tools.dfu-util.path={runtime.tools.dfu-util.path}
+tools.dfu-util.cmd=dfu-util
+tools.dfu-util.upload.params.verbose=-d
+tools.dfu-util.upload.params.quiet=
+tools.dfu-util.upload.pattern="{path}/{cmd}" --device {upload.vid},{upload.pid} -D "{build.path}/{build.project_name}.bin" -a0 --dfuse-address={upload.address}:leave -Q
+tools.bossac.upload.pattern="{path}/bossac" --port={serial.port.file} -U -e -w "{build.path}/{build.project_name}.bin" -R
+"""
+
+# Behaves like dfu-util with several units in DFU mode: without -S/--path it
+# only works while no other upload runs. Logs each run to <log dir>/<pid>.json.
+STUB_TOOL = """\
+import json
+import os
+import sys
+import time
+
+log_dir, args = sys.argv[1], sys.argv[2:]
+unit = None
+for flag in ("-S", "--path"):
+    if flag in args:
+        unit = args[args.index(flag) + 1]
+busy = os.path.join(log_dir, "busy")
+if unit is None:
+    try:
+        os.close(os.open(busy, os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        print("dfu-util: More than one DFU capable USB device found!")
+        sys.exit(74)
+
+with open(args[args.index("-D") + 1], "rb") as f:
+    data = f.read()
+for percent in (0, 50, 100):
+    sys.stdout.write("Download\\t[===   ] %3d%%\\r" % percent)
+    sys.stdout.flush()
+    time.sleep(0.05)
+with open(os.path.join(log_dir, "%d.json" % os.getpid()), "w") as f:
+    json.dump({"args": args, "unit": unit, "size": len(data)}, f)
+if unit is None:
+    os.remove(busy)
+print("Done!")
+"""
+
+FIRMWARE = b"\x00\x80\x00\x20" + b"PDM-BUILD:test-0123abcd\x00" + bytes(range(36))
+
+
+def intel_hex(data: bytes, address: int = 0x4000) -> str:
+    """Encode data as Intel HEX records, 16 bytes per line"""
+    lines = []
+    for offset in range(0, len(data), 16):
+        chunk = data[offset:offset + 16]
+        record = bytes([len(chunk), (address + offset) >> 8 & 0xFF, (address + offset) & 0xFF, 0]) + chunk
+        lines.append(":" + (record + bytes([-sum(record) & 0xFF])).hex().upper())
+    lines.append(":00000001FF")
+    return "\n".join(lines) + "\n"
+
+
+class SplitQuotedTest(unittest.TestCase):
+
+    def test_plain_arguments(self):
+        self.assertEqual(split_quoted("dfu-util  -a0\t-Q "), ["dfu-util", "-a0", "-Q"])
+
+    def test_quotes_group_and_are_removed(self):
+        self.assertEqual(split_quoted('"/opt/my tools/dfu" -D "/tmp/a b/fw.bin"'),
+                         ["/opt/my tools/dfu", "-D", "/tmp/a b/fw.bin"])
+        self.assertEqual(split_quoted("'it\"s' x"), ['it"s', "x"])
+
+    def test_quotes_inside_an_argument(self):
+        self.assertEqual(split_quoted('--port="COM 3"'), ["--port=COM 3"])
+
+    def test_empty_quoted_argument_is_kept(self):
+        self.assertEqual(split_quoted('a "" b'), ["a", "", "b"])
+
+
+class RecipeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.uploader = DirectUploader(FQBN, lambda: None, cache_path=os.devnull)
+        self.properties = DirectUploader.parse_properties(BOARD_DETAILS)
+
+    def test_recipe_from_properties(self):
+        recipe = self.uploader.recipe_from_properties(self.properties)
+        self.assertEqual(recipe["fqbn"], FQBN)
+        self.assertEqual(recipe["tool"], "dfu-util")
+        self.assertEqual(recipe["pattern"],
+                         '"/opt/arduino/tools/dfu-util/0.11.0-arduino5/dfu-util" --device 0x2341,0x0069 '
+                         '-D "{build.path}/{build.project_name}.bin" -a0 --dfuse-address=0x4000:leave -Q')
+        self.assertTrue(recipe["use_1200bps_touch"])
+        self.assertTrue(recipe["wait_for_upload_port"])
+
+    def test_recipe_needs_an_upload_tool(self):
+        del self.properties["upload.tool"]
+        del self.properties["upload.tool.default"]
+        self.assertIsNone(self.uploader.recipe_from_properties(self.properties))
+
+    def test_build_command(self):
+        recipe = self.uploader.recipe_from_properties(self.properties)
+        command = self.uploader.build_command(recipe, "/dev/ttyACM0", "/tmp/pdm upload")
+        self.assertEqual(command, [
+            "/opt/arduino/tools/dfu-util/0.11.0-arduino5/dfu-util",
+            "--device", "0x2341,0x0069",
+            "-D", "/tmp/pdm upload/firmware.bin",
+            "-a0", "--dfuse-address=0x4000:leave", "-Q"
+        ])
+
+    def test_serial_port_placeholders(self):
+        properties = dict(self.properties, **{"upload.tool.default": "bossac"})
+        recipe = self.uploader.recipe_from_properties(properties)
+        command = self.uploader.build_command(recipe, "/dev/ttyACM1", "/tmp/build")
+        self.assertEqual(command[1], "--port=ttyACM1")
+        self.assertEqual(command[-2], "/tmp/build/firmware.bin")
+
+
+def port(device: str, serial_number: str = None, location: str = None) -> SimpleNamespace:
+    """Stand-in for a serial.tools.list_ports entry"""
+    return SimpleNamespace(device=device, serial_number=serial_number, location=location)
+
+
+class UnitSelectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.uploader = DirectUploader(FQBN, lambda: None, cache_path=os.devnull)
+        self.uploader.list_ports = lambda: [
+            port("/dev/ttyACM0", "35A5C1F2", "1-1.2:1.0"),
+            port("/dev/ttyACM1", None, "1-1.3:1.0"),
+            port("/dev/ttyACM2")
+        ]
+        self.recipe = self.uploader.recipe_from_properties(DirectUploader.parse_properties(BOARD_DETAILS))
+
+    def test_dfu_util_gets_serial_number_or_path(self):
+        self.assertEqual(self.uploader.unit_selector(self.recipe, "/dev/ttyACM0"), ["-S", "35A5C1F2"])
+        self.assertEqual(self.uploader.unit_selector(self.recipe, "/dev/ttyACM1"), ["--path", "1-1.3"])
+
+    def test_unidentified_dfu_unit_has_no_selector(self):
+        self.assertIsNone(self.uploader.unit_selector(self.recipe, "/dev/ttyACM2"))
+        self.assertIsNone(self.uploader.unit_selector(self.recipe, "/dev/ttyUSB9"))
+
+    def test_port_based_tool_needs_no_selector(self):
+        properties = DirectUploader.parse_properties(BOARD_DETAILS)
+        properties.update({"upload.tool.default": "bossac", "upload.wait_for_upload_port": "false"})
+        recipe = self.uploader.recipe_from_properties(properties)
+        self.assertEqual(self.uploader.unit_selector(recipe, "/dev/ttyACM2"), [])
+
+    def test_selector_follows_the_tool(self):
+        command = self.uploader.prepare_upload(self.recipe, parse_hex_lines(intel_hex(FIRMWARE).splitlines()),
+                                               "/dev/ttyACM0", tempfile.gettempdir(), dry_run=True,
+                                               selector=["-S", "35A5C1F2"])
+        self.assertEqual(command[-3:], ["-Q", "-S", "35A5C1F2"])
+
+
+class StubToolUploadTest(unittest.TestCase):
+    """Runs FirmwareUpdater end to end against a stub upload tool"""
+
+    PORTS = ["/dev/ttyFAKE0", "/dev/ttyFAKE1", "/dev/ttyFAKE2"]
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="pdm_test_")
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.log_dir = os.path.join(self.tmp, "runs")
+        os.mkdir(self.log_dir)
+
+        tool_path = os.path.join(self.tmp, "stub_tool.py")
+        with open(tool_path, "w") as f:
+            f.write(STUB_TOOL)
+        self.hex_path = os.path.join(self.tmp, "firmware.hex")
+        with open(self.hex_path, "w") as f:
+            f.write(intel_hex(FIRMWARE))
+
+        # Resolved through the same property expansion as a real board package
+        properties = DirectUploader.parse_properties(BOARD_DETAILS)
+        properties.update({
+            "upload.use_1200bps_touch": "false",
+            "tools.dfu-util.path": self.tmp,
+            "tools.dfu-util.upload.pattern":
+                f'"{sys.executable}" "{{path}}/stub_tool.py" "{self.log_dir}" '
+                '--device {upload.vid},{upload.pid} -D "{build.path}/{build.project_name}.bin"'
+        })
+        uploader = DirectUploader(FQBN, lambda: None, cache_path=os.devnull)
+        recipe = uploader.recipe_from_properties(properties)
+
+        self.updater = FirmwareUpdater(cache_path=os.path.join(self.tmp, "recipes.json"), recipe=recipe)
+        self.updater.image_index = FirmwareIndex(os.path.join(self.tmp, "index.json"))
+        self.set_ports([port(device, f"SN{i}") for i, device in enumerate(self.PORTS)])
+        self.messages = []
+
+    def set_ports(self, ports):
+        self.updater.direct_uploader.list_ports = lambda: ports
+
+    def progress(self, port, msg_type, message):
+        self.messages.append((port, msg_type, message))
+
+    def runs(self):
+        logs = []
+        for name in os.listdir(self.log_dir):
+            with open(os.path.join(self.log_dir, name)) as f:
+                logs.append(json.load(f))
+        return logs
+
+    def test_dry_run_reports_command_without_running_it(self):
+        self.updater.dry_run = True
+        results = self.updater.flash_fleet(self.hex_path, self.PORTS[:2], self.progress)
+
+        self.assertEqual({r["result"] for r in results.values()}, {"dry_run"})
+        self.assertEqual(self.runs(), [])
+        commands = {p: m for p, t, m in self.messages if t == "info" and m.startswith("Dry run:")}
+        self.assertEqual(len(commands), 2)
+        self.assertIn("stub_tool.py", commands[self.PORTS[0]])
+        self.assertIn("--device 0x2341,0x0069", commands[self.PORTS[1]])
+        self.assertTrue(commands[self.PORTS[1]].endswith("firmware.bin -S SN1"))
+        self.assertTrue(self.updater.format_fleet_summary(results).endswith(
+            "Updated 0, skipped 0, failed 0, dry run 2 (not flashed)"))
+
+    def test_upload_runs_the_tool(self):
+        results = self.updater.flash_fleet(self.hex_path, self.PORTS[:1], self.progress)
+
+        self.assertEqual(results[self.PORTS[0]]["result"], "updated")
+        [log] = self.runs()
+        self.assertEqual(log["args"][:2], ["--device", "0x2341,0x0069"])
+        self.assertEqual(log["args"][-2:], ["-S", "SN0"])
+        self.assertEqual(log["size"], len(FIRMWARE))
+        percents = [m for _, t, m in self.messages if t == "progress"]
+        self.assertIn(100, percents)
+        self.assertIn((self.PORTS[0], "success", "Firmware update completed successfully!"), self.messages)
+
+    def test_fleet_upload_selects_each_unit(self):
+        results = self.updater.flash_fleet(self.hex_path, self.PORTS, self.progress, retries=0)
+
+        self.assertEqual({r["result"] for r in results.values()}, {"updated"})
+        self.assertEqual(sorted(log["unit"] for log in self.runs()), ["SN0", "SN1", "SN2"])
+
+    def test_unidentified_units_are_flashed_one_at_a_time(self):
+        self.set_ports([port(device) for device in self.PORTS])
+        results = self.updater.flash_fleet(self.hex_path, self.PORTS, self.progress, retries=0)
+
+        # The stub fails any selector-less upload that overlaps another
+        self.assertEqual({r["result"] for r in results.values()}, {"updated"}, results)
+        self.assertEqual([log["unit"] for log in self.runs()], [None] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Tests for the headless client's output contract: stdout carries exactly one
+JSON document, and a unit that does not answer is reported as a failure
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+PDM = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pdm.py")
+
+
+@unittest.skipUnless(importlib.util.find_spec("serial"), "pyserial not installed")
+@unittest.skipUnless(hasattr(os, "openpty"), "needs a pseudo-terminal")
+class SilentPortTest(unittest.TestCase):
+
+    def setUp(self):
+        # Nothing is ever written to the master side, so the "device" never answers
+        self.master, slave = os.openpty()
+        self.port = os.ttyname(slave)
+        self.addCleanup(os.close, self.master)
+        self.addCleanup(os.close, slave)
+
+    def test_status_of_silent_and_missing_ports(self):
+        missing = "/dev/pdm_test_no_such_port"
+        result = subprocess.run([sys.executable, PDM, "status", self.port, missing],
+                                capture_output=True, text=True, timeout=60)
+
+        output = json.loads(result.stdout)  # Diagnostics must not reach stdout
+        self.assertEqual(result.returncode, 1)
+        self.assertFalse(output["ok"])
+        self.assertEqual(output["ports"][self.port], {"ok": False, "error": "no STATUS reply"})
+        self.assertFalse(output["ports"][missing]["ok"])
+        self.assertIn("Connection failed", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+Tests for the local telemetry server, driven by plain sockets on 127.0.0.1
+"""
+
+import base64
+import hashlib
+import http.client
+import json
+import os
+import socket
+import struct
+import sys
+import time
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import event_bus
+from telemetry_server import (TelemetryServer, WS_CLOSE, WS_GUID, WS_MESSAGE_TOO_BIG, WS_PING,
+                              WS_PONG, WS_PROTOCOL_ERROR, WS_TEXT, is_local_origin)
+
+WS_KEY = base64.b64encode(b"pdm-test-key-123").decode()
+
+
+def client_frame(opcode: int, payload: bytes, mask: bytes = b"\x01\x02\x03\x04") -> bytes:
+    """Masked client frame (unmasked if mask is empty)"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, (0x80 if mask else 0) | length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, (0x80 if mask else 0) | 127, length)
+    if not mask:
+        return header + payload
+    return header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+class TelemetryServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.comm = SimpleNamespace(
+            device_state={"temperature": 25.0, "battery_voltage": 13.8,
+                          "channels": [{"active": False, "current": 0.0} for _ in range(4)]},
+            events=event_bus.EventBus())
+        self.server = TelemetryServer(self.comm, port=0)
+        self.assertTrue(self.server.start())
+        self.addCleanup(self.server.stop)
+
+    def get(self, path: str, origin: str = None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+        self.addCleanup(connection.close)
+        connection.request("GET", path, headers={"Origin": origin} if origin else {})
+        response = connection.getresponse()
+        return response, json.loads(response.read())
+
+    def open_ws(self, origin: str = None):
+        sock = socket.create_connection(("127.0.0.1", self.server.port), timeout=5)
+        self.addCleanup(sock.close)
+        sock.sendall((f"GET /ws HTTP/1.1\r\nHost: 127.0.0.1\r\nUpgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\nSec-WebSocket-Key: {WS_KEY}\r\n"
+                      f"Sec-WebSocket-Version: 13\r\n" +
+                      (f"Origin: {origin}\r\n" if origin else "") + "\r\n").encode())
+        reader = sock.makefile("rb")
+        self.addCleanup(reader.close)
+        head = b""
+        while not head.endswith(b"\r\n\r\n"):
+            byte = reader.read(1)
+            if not byte:
+                break
+            head += byte
+        return sock, reader, head.decode("latin-1")
+
+    def read_frame(self, reader):
+        first, second = reader.read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", reader.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", reader.read(8))[0]
+        return first & 0x0F, reader.read(length)
+
+    def wait_for_clients(self, count: int):
+        deadline = time.monotonic() + 5.0
+        while len(self.server.get_stats()["clients"]) != count:
+            self.assertLess(time.monotonic(), deadline, "client was not registered")
+            time.sleep(0.01)
+
+    def test_snapshot(self):
+        response, body = self.get("/snapshot")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, {"seq": 0, "state": self.comm.device_state})
+        self.assertIsNone(response.getheader("Access-Control-Allow-Origin"))
+
+    def test_local_origin_may_read(self):
+        response, _ = self.get("/snapshot", origin="http://localhost:3000")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Access-Control-Allow-Origin"), "http://localhost:3000")
+
+    def test_other_origins_are_refused(self):
+        response, _ = self.get("/snapshot", origin="https://example.com")
+        self.assertEqual(response.status, 403)
+        self.assertIsNone(response.getheader("Access-Control-Allow-Origin"))
+
+        _, _, head = self.open_ws(origin="http://127.0.0.1.example.com")
+        self.assertTrue(head.startswith("HTTP/1.1 403"), head)
+        self.assertEqual(self.server.get_stats()["clients"], [])
+
+    def test_origin_check(self):
+        for origin in ("http://localhost", "http://127.0.0.1:8080", "https://[::1]:5173"):
+            self.assertTrue(is_local_origin(origin), origin)
+        for origin in ("null", "file://", "http://localhost.evil.com", "ws://localhost", "http://[::1"):
+            self.assertFalse(is_local_origin(origin), origin)
+
+    def test_websocket_snapshot_then_update(self):
+        _, reader, head = self.open_ws()
+        accept = base64.b64encode(hashlib.sha1((WS_KEY + WS_GUID).encode()).digest()).decode()
+        self.assertTrue(head.startswith("HTTP/1.1 101"), head)
+        self.assertIn(f"Sec-WebSocket-Accept: {accept}\r\n", head)
+
+        opcode, payload = self.read_frame(reader)
+        self.assertEqual(opcode, WS_TEXT)
+        self.assertEqual(json.loads(payload), {"seq": 0, "type": "snapshot", "data": self.comm.device_state})
+
+        self.wait_for_clients(1)
+        self.comm.device_state["temperature"] = 31.5
+        self.comm.events.publish(event_bus.TEMPERATURE, "temperature", 31.5)
+        opcode, payload = self.read_frame(reader)
+        self.assertEqual(opcode, WS_TEXT)
+        message = json.loads(payload)
+        self.assertEqual((message["seq"], message["type"], message["data"]), (1, "temperature", 31.5))
+
+        _, body = self.get("/snapshot")
+        self.assertEqual(body["state"]["temperature"], 31.5)
+
+    def test_ping_and_close(self):
+        sock, reader, _ = self.open_ws()
+        self.read_frame(reader)  # Snapshot
+        sock.sendall(client_frame(WS_PING, b"hi"))
+        self.assertEqual(self.read_frame(reader), (WS_PONG, b"hi"))
+        sock.sendall(client_frame(WS_CLOSE, struct.pack("!H", 1000)))
+        self.assertEqual(self.read_frame(reader), (WS_CLOSE, struct.pack("!H", 1000)))
+
+    def test_unmasked_frame_is_refused(self):
+        sock, reader, _ = self.open_ws()
+        self.read_frame(reader)
+        sock.sendall(client_frame(WS_PING, b"hi", mask=b""))
+        self.assertEqual(self.read_frame(reader), (WS_CLOSE, struct.pack("!H", WS_PROTOCOL_ERROR)))
+        self.assertEqual(reader.read(), b"")  # Connection closed
+        self.wait_for_clients(0)
+
+    def test_oversized_frame_is_refused(self):
+        sock, reader, _ = self.open_ws()
+        self.read_frame(reader)
+        # Only the header is sent: the server must not wait for 1 TiB of payload
+        sock.sendall(struct.pack("!BBQ", 0x80 | WS_TEXT, 0x80 | 127, 1 << 40) + b"\x01\x02\x03\x04")
+        self.assertEqual(self.read_frame(reader), (WS_CLOSE, struct.pack("!H", WS_MESSAGE_TOO_BIG)))
+        self.assertEqual(reader.read(), b"")
+        self.wait_for_clients(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
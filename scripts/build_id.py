@@ -0,0 +1,63 @@
+"""
+PlatformIO pre-build script: sets PDM_BUILD_ID for UARTHandler.cpp
+
+The id is "<git describe>-<source hash>", where the hash covers every file
+under src/, include/ and lib/ plus platformio.ini. Any source change gives a
+new id, and UARTHandler.cpp is recompiled whenever the id changes, so each
+distinct image carries a distinct id. Identical sources give the same id,
+which is what lets PDM Manager recognise an already installed image.
+
+A PDM_BUILD_ID already set in build_flags (release builds) is left alone.
+"""
+
+import hashlib
+import os
+import subprocess
+
+Import("env")  # noqa: F821 (provided by PlatformIO)
+
+SOURCE_DIRS = ("src", "include", "lib")
+
+
+def source_hash(project_dir: str) -> str:
+    digest = hashlib.sha256()
+    paths = [os.path.join(project_dir, "platformio.ini")]
+    for name in SOURCE_DIRS:
+        for root, dirs, files in os.walk(os.path.join(project_dir, name)):
+            dirs.sort()
+            paths.extend(os.path.join(root, f) for f in sorted(files))
+    for path in paths:
+        if os.path.isfile(path):
+            digest.update(os.path.relpath(path, project_dir).replace(os.sep, "/").encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def git_describe(project_dir: str) -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=project_dir,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def defines_build_id(build_env) -> bool:
+    for define in build_env.get("CPPDEFINES", []):
+        name = define[0] if isinstance(define, (list, tuple)) else define
+        if name == "PDM_BUILD_ID":
+            return True
+    return False
+
+
+if not defines_build_id(env):  # noqa: F821
+    project_dir = env.subst("$PROJECT_DIR")  # noqa: F821
+    describe = git_describe(project_dir)
+    build_id = f"{describe}-{source_hash(project_dir)}" if describe else f"src-{source_hash(project_dir)}"
+    print(f"PDM build id: {build_id}")
+
+    def inject_build_id(node_env, node):
+        return node_env.Object(node, CPPDEFINES=list(node_env.get("CPPDEFINES", [])) +
+                               [("PDM_BUILD_ID", node_env.StringifyMacro(build_id))])
+
+    env.AddBuildMiddleware(inject_build_id, "*/UARTHandler.cpp")  # noqa: F821
@@ -1,6 +1,7 @@
 #include "CANHandler.h"
 #include "PDMManager.h"
 #include "Logger.h"
+#include "LoopProfiler.h"
 #include <Arduino_CAN.h>
 
 static const unsigned long WATCHDOG_TIMEOUT_MS = 1500;
@@ -235,45 +236,111 @@ void CANHandler::sendBacklightSetting() {
   sendMessage(msgID, data, 8);
 }
 
+// Extended telemetry (0x480 + NodeID, TELMODE EXTENDED|BOTH): byte 0 selects
+// the layout, byte 7 is a rolling counter shared by all extended frames so
+// receivers can spot lost frames.
+static const uint8_t TEL_MUX_CURRENTS = 0x01;  // 4 x 12-bit currents, 0.02 A/bit
+static const uint8_t TEL_MUX_STATES   = 0x02;  // on/fault masks, input mode, link flags
+static const uint8_t TEL_MUX_DIAG     = 0x03;  // temperature, battery, loop time
+static const unsigned long TEL_DIAG_PERIOD_MS = 1000;
+static uint8_t telemetryCounter = 0;
+
 void CANHandler::sendTelemetry() {
   static unsigned long last = 0;
-  if (millis() - last < 250) return;  // 4 Hz
+  static unsigned long lastDiag = 0;
+  if (millis() - last < 1000UL / PDMManager::getTelemetryRate()) return;  // TELRATE, 4 Hz default
   last = millis();
 
+  TelemetryMode mode = PDMManager::getTelemetryMode();
   uint8_t pdmID = PDMManager::getPDMNodeID();
-  // base 0x380 + NodeID → 0x395 for NodeID=0x15
-  uint32_t cob = 0x380 + pdmID;
+
+  // Sample once per period; both frame sets use the same readings
+  float currents[4];
+  uint8_t underMask = 0, overMask = 0;
+  for (uint8_t i = 0; i < 4; i++) {
+    currents[i] = PDMManager::getChannelCurrent(i);
+    if (PDMManager::isUndercurrentWarning(i))  underMask |= 1 << i;
+    if (PDMManager::isOvercurrentFault(i))     overMask  |= 1 << i;
+  }
+  float T = PDMManager::getLastTemperature();
+  float vb = PDMManager::readBatteryVoltage();
+  uint16_t vbit = uint16_t(round(vb * 1000.0f));
 
   uint8_t data[8] = {0};
 
-  // 1) Channel currents (bytes 0..3), 0.2 A/bit
-  for (uint8_t i = 0; i < 4; i++) {
-    float iA = PDMManager::getChannelCurrent(i);
-    // scale: val = current / 0.2 = current * 5
-    int v = int(round(iA * 5.0f));
-    data[i] = (uint8_t) constrain(v, 0, 255);
+  if (mode != TELEMETRY_EXTENDED) {
+    // base 0x380 + NodeID → 0x395 for NodeID=0x15
+
+    // 1) Channel currents (bytes 0..3), 0.2 A/bit
+    for (uint8_t i = 0; i < 4; i++) {
+      // scale: val = current / 0.2 = current * 5
+      int v = int(round(currents[i] * 5.0f));
+      data[i] = (uint8_t) constrain(v, 0, 255);
+    }
+
+    // 2) Board temperature (byte 4), 1 degC per bit
+    data[4] = (uint8_t) constrain(int(round(T)), 0, 255);
+
+    // 3) Fault mask (byte 5): bits 0–3 undercurrent, bits 4–7 overcurrent
+    data[5] = underMask | (overMask << 4);
+
+    // 4) Battery voltage (bytes 6..7), 0.001 V/bit, little-endian
+    data[6] = vbit & 0xFF;
+    data[7] = vbit >> 8;
+
+    sendMessage(0x380 + pdmID, data, 8);
   }
+  if (mode == TELEMETRY_LEGACY) return;
 
-  // 2) Board temperature (byte 4), 1 degC per bit
-  // assume PDMManager::getLastTemperature() returns float °C
-  float T = PDMManager::getLastTemperature();
-  data[4] = (uint8_t) constrain(int(round(T)), 0, 255);
+  uint32_t cob = 0x480 + pdmID;
 
-  // 3) Fault mask (byte 5): bits 0–3 undercurrent, bits 4–7 overcurrent
-  uint8_t flags = 0;
+  // Mux 1: currents, 12 bits each (0..81.9 A), two channels per 3 bytes:
+  // bytes 1-3 = CH1 low 8 | CH1 high 4, CH2 low 4 | CH2 high 8, same for CH3/CH4
+  uint16_t raw[4];
   for (uint8_t i = 0; i < 4; i++) {
-    if (PDMManager::isUndercurrentWarning(i))  flags |= 1 << i;
-    if (PDMManager::isOvercurrentFault(i))     flags |= 1 << (i + 4);
+    raw[i] = (uint16_t) constrain(int(round(currents[i] * 50.0f)), 0, 4095);
   }
-  data[5] = flags;
+  data[0] = TEL_MUX_CURRENTS;
+  data[1] = raw[0] & 0xFF;
+  data[2] = (raw[0] >> 8) | ((raw[1] & 0x0F) << 4);
+  data[3] = raw[1] >> 4;
+  data[4] = raw[2] & 0xFF;
+  data[5] = (raw[2] >> 8) | ((raw[3] & 0x0F) << 4);
+  data[6] = raw[3] >> 4;
+  data[7] = telemetryCounter++;
+  sendMessage(cob, data, 8);
 
-  // 4) Battery voltage (bytes 6..7), 0.001 V/bit, little-endian
-  float vb = PDMManager::readBatteryVoltage();  
-  uint16_t vbit = uint16_t(round(vb * 1000.0f));
-  data[6] = vbit & 0xFF;
-  data[7] = vbit >> 8;
+  // Mux 2: bit n of bytes 1-4 = channel n+1 on / overcurrent / undercurrent /
+  // thermal; byte 5 = InputMode; byte 6 bit 0 keypad heartbeat OK, bit 1
+  // DIGOUT watchdog tripped, bit 2 temperature sensor error
+  memset(data, 0, sizeof(data));
+  data[0] = TEL_MUX_STATES;
+  for (uint8_t i = 0; i < 4; i++) {
+    if (PDMManager::isChannelActive(i)) data[1] |= 1 << i;
+    if (PDMManager::isThermalFault(i))  data[4] |= 1 << i;
+  }
+  data[2] = overMask;
+  data[3] = underMask;
+  data[5] = (uint8_t) lastInputMode;
+  data[6] = (_canOK ? 0x01 : 0) | (_digOutWatchdogTriggered ? 0x02 : 0) |
+            (PDMManager::isTempSensorError() ? 0x04 : 0);
+  data[7] = telemetryCounter++;
+  sendMessage(cob, data, 8);
 
-  // finally, transmit
+  // Mux 3, once a second: temperature (int16, 0.1 degC), battery (mV) and
+  // longest loop since LOOPSTAT RESET (us), all little-endian
+  if (millis() - lastDiag < TEL_DIAG_PERIOD_MS) return;
+  lastDiag = millis();
+  int16_t t10 = (int16_t) constrain(int(round(T * 10.0f)), -32768, 32767);
+  uint16_t loopMax = (uint16_t) min(LoopProfiler::getMaxLoopMicros(), (uint32_t) 65535);
+  data[0] = TEL_MUX_DIAG;
+  data[1] = (uint16_t) t10 & 0xFF;
+  data[2] = (uint16_t) t10 >> 8;
+  data[3] = vbit & 0xFF;
+  data[4] = vbit >> 8;
+  data[5] = loopMax & 0xFF;
+  data[6] = loopMax >> 8;
+  data[7] = telemetryCounter++;
   sendMessage(cob, data, 8);
 }
 
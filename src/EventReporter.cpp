@@ -0,0 +1,110 @@
+#include "EventReporter.h"
+#include "PDMManager.h"
+#include "OutputQueue.h"
+
+bool                    EventReporter::enabled  = false;
+uint16_t                EventReporter::nextSeq  = 0;
+EventReporter::Snapshot EventReporter::reported;
+
+static const char* inputModeName(InputMode mode) {
+  switch (mode) {
+    case INPUT_MODE_DIGITAL:    return "DIGITAL";
+    case INPUT_MODE_CAN_KEYPAD: return "KEYPAD";
+    case INPUT_MODE_CAN_DIGOUT: return "DIGOUT";
+    default:                    return "NONE";
+  }
+}
+
+void EventReporter::capture(Snapshot& s) {
+  for (uint8_t ch = 0; ch < 4; ch++) {
+    s.active[ch]       = PDMManager::isChannelActive(ch);
+    s.overcurrent[ch]  = PDMManager::isOvercurrentFault(ch);
+    s.thermal[ch]      = PDMManager::isThermalFault(ch);
+    s.undercurrent[ch] = PDMManager::isUndercurrentWarning(ch);
+  }
+  s.inputMode      = CANHandler::getLastInputMode();
+  s.canOK          = CANHandler::isCANOK();
+  s.digOutWatchdog = CANHandler::isDigitalOutputWatchdogTriggered();
+}
+
+void EventReporter::setEnabled(bool on) {
+  // Start from the current state; the host resyncs with STATUS after enabling
+  capture(reported);
+  enabled = on;
+  Serial.print(F("OK: Events "));
+  Serial.print(on ? F("ON") : F("OFF"));
+  Serial.print(F(" seq="));
+  Serial.println(nextSeq);
+}
+
+bool EventReporter::isEnabled() {
+  return enabled;
+}
+
+uint16_t EventReporter::getNextSeq() {
+  return nextSeq;
+}
+
+// Writes one event line if it fits in the TX buffer right now. Returns false
+// (without consuming a sequence number) when it would block; the change is
+// then picked up again on the next pass because it is still unreported.
+bool EventReporter::emit(const char* body) {
+  if (OutputQueue::isLinePending()) return false;  // never split a report line
+
+  char line[EVT_LINE_MAX];
+  int len = snprintf(line, sizeof(line), "EVT %u %lu %s\r\n",
+                     (unsigned)nextSeq, (unsigned long)millis(), body);
+  if (len <= 0 || len >= (int)sizeof(line)) return false;
+  if (Serial.availableForWrite() < len) return false;
+
+  Serial.write((const uint8_t*)line, len);
+  nextSeq++;
+  return true;
+}
+
+void EventReporter::process() {
+  if (!enabled) return;
+
+  Snapshot now;
+  capture(now);
+  char body[32];
+
+  for (uint8_t ch = 0; ch < 4; ch++) {
+    if (now.active[ch] != reported.active[ch]) {
+      snprintf(body, sizeof(body), "CH %u %s", ch + 1, now.active[ch] ? "ON" : "OFF");
+      if (!emit(body)) return;
+      reported.active[ch] = now.active[ch];
+    }
+    if (now.overcurrent[ch] != reported.overcurrent[ch]) {
+      snprintf(body, sizeof(body), "FAULT %u OC %s", ch + 1, now.overcurrent[ch] ? "SET" : "CLR");
+      if (!emit(body)) return;
+      reported.overcurrent[ch] = now.overcurrent[ch];
+    }
+    if (now.thermal[ch] != reported.thermal[ch]) {
+      snprintf(body, sizeof(body), "FAULT %u THERMAL %s", ch + 1, now.thermal[ch] ? "SET" : "CLR");
+      if (!emit(body)) return;
+      reported.thermal[ch] = now.thermal[ch];
+    }
+    if (now.undercurrent[ch] != reported.undercurrent[ch]) {
+      snprintf(body, sizeof(body), "FAULT %u UNDER %s", ch + 1, now.undercurrent[ch] ? "SET" : "CLR");
+      if (!emit(body)) return;
+      reported.undercurrent[ch] = now.undercurrent[ch];
+    }
+  }
+
+  if (now.inputMode != reported.inputMode) {
+    snprintf(body, sizeof(body), "INPUT %s", inputModeName(now.inputMode));
+    if (!emit(body)) return;
+    reported.inputMode = now.inputMode;
+  }
+  if (now.canOK != reported.canOK) {
+    snprintf(body, sizeof(body), "CAN %s", now.canOK ? "OK" : "TIMEOUT");
+    if (!emit(body)) return;
+    reported.canOK = now.canOK;
+  }
+  if (now.digOutWatchdog != reported.digOutWatchdog) {
+    snprintf(body, sizeof(body), "DIGOUT %s", now.digOutWatchdog ? "TIMEOUT" : "OK");
+    if (!emit(body)) return;
+    reported.digOutWatchdog = now.digOutWatchdog;
+  }
+}
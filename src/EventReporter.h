@@ -0,0 +1,45 @@
+#ifndef EVENT_REPORTER_H
+#define EVENT_REPORTER_H
+
+#include <Arduino.h>
+#include "CANHandler.h"
+
+// Pushes a compact line to the host whenever device state changes:
+//   EVT <seq> <millis> CH <n> ON|OFF
+//   EVT <seq> <millis> FAULT <n> OC|THERMAL|UNDER SET|CLR
+//   EVT <seq> <millis> INPUT NONE|DIGITAL|KEYPAD|DIGOUT
+//   EVT <seq> <millis> CAN OK|TIMEOUT
+//   EVT <seq> <millis> DIGOUT OK|TIMEOUT
+// <seq> increments by one per emitted line, so the host can detect lost
+// lines and resynchronise with STATUS.
+class EventReporter {
+public:
+  static void process();              // call once per loop()
+  static void setEnabled(bool on);
+  static bool isEnabled();
+  static uint16_t getNextSeq();
+
+private:
+  EventReporter() = delete;
+
+  struct Snapshot {
+    bool      active[4];
+    bool      overcurrent[4];
+    bool      thermal[4];
+    bool      undercurrent[4];
+    InputMode inputMode;
+    bool      canOK;
+    bool      digOutWatchdog;
+  };
+
+  static void capture(Snapshot& s);
+  static bool emit(const char* body);
+
+  static const uint8_t EVT_LINE_MAX = 48;
+
+  static bool     enabled;
+  static uint16_t nextSeq;
+  static Snapshot reported;  // state as last reported to the host
+};
+
+#endif
@@ -0,0 +1,72 @@
+#include "LoopProfiler.h"
+
+LoopProfiler::Stats LoopProfiler::loopStats;
+LoopProfiler::Stats LoopProfiler::stageStats[STAGE_COUNT];
+uint32_t            LoopProfiler::slowLoops     = 0;
+uint32_t            LoopProfiler::loopStartUs   = 0;
+uint32_t            LoopProfiler::stageStartUs  = 0;
+unsigned long       LoopProfiler::windowStartMs = 0;
+
+static const char* const stageNames[STAGE_COUNT] = {
+  "UART", "INPUTS", "CAN", "UPDATE", "NEOPIXEL", "TELEMETRY"
+};
+
+void LoopProfiler::beginLoop() {
+  loopStartUs  = micros();
+  stageStartUs = loopStartUs;
+}
+
+void LoopProfiler::endStage(LoopStage stage) {
+  uint32_t now = micros();
+  record(stageStats[stage], now - stageStartUs);
+  stageStartUs = now;
+}
+
+void LoopProfiler::endLoop() {
+  uint32_t us = micros() - loopStartUs;
+  record(loopStats, us);
+  if (us >= SLOW_LOOP_US) slowLoops++;
+}
+
+void LoopProfiler::record(Stats& s, uint32_t us) {
+  if (s.count == 0 || us < s.minUs) s.minUs = us;
+  if (us > s.maxUs) s.maxUs = us;
+  s.sumUs += us;
+  s.count++;
+}
+
+void LoopProfiler::reset() {
+  loopStats = Stats{0, 0, 0, 0};
+  for (uint8_t i = 0; i < STAGE_COUNT; i++) stageStats[i] = Stats{0, 0, 0, 0};
+  slowLoops = 0;
+  windowStartMs = millis();
+}
+
+uint32_t LoopProfiler::getMaxLoopMicros() {
+  return loopStats.maxUs;
+}
+
+void LoopProfiler::printStats(const char* name, const Stats& s) {
+  uint32_t avg = s.count ? (uint32_t)(s.sumUs / s.count) : 0;
+  Serial.print(F("LOOPSTAT "));
+  Serial.print(name);
+  Serial.print(F(" n="));   Serial.print(s.count);
+  Serial.print(F(" min=")); Serial.print(s.minUs);
+  Serial.print(F(" avg=")); Serial.print(avg);
+  Serial.print(F(" max=")); Serial.print(s.maxUs);
+}
+
+// Output (all times in microseconds):
+//   LOOPSTAT LOOP n=<loops> min=<us> avg=<us> max=<us> slow=<count>
+//   LOOPSTAT <STAGE> n=<calls> min=<us> avg=<us> max=<us>     (one per stage)
+//   LOOPSTAT END window_ms=<ms since last reset>
+void LoopProfiler::printStats() {
+  printStats("LOOP", loopStats);
+  Serial.print(F(" slow=")); Serial.println(slowLoops);
+  for (uint8_t i = 0; i < STAGE_COUNT; i++) {
+    printStats(stageNames[i], stageStats[i]);
+    Serial.println();
+  }
+  Serial.print(F("LOOPSTAT END window_ms="));
+  Serial.println(millis() - windowStartMs);
+}
@@ -0,0 +1,49 @@
+#ifndef LOOP_PROFILER_H
+#define LOOP_PROFILER_H
+
+#include <Arduino.h>
+
+// Sections of loop() that are timed individually
+enum LoopStage {
+  STAGE_UART = 0,     // UARTHandler::process (CLI input + command handling)
+  STAGE_INPUTS,       // PDMManager::processExternalInputs
+  STAGE_CAN,          // CANHandler::process
+  STAGE_UPDATE,       // PDMManager::update
+  STAGE_NEOPIXEL,     // updateNeoPixels
+  STAGE_TELEMETRY,    // CAN telemetry, watchdog check, keypad LED frames
+  STAGE_COUNT
+};
+
+class LoopProfiler {
+public:
+  static void beginLoop();                 // call first thing in loop()
+  static void endStage(LoopStage stage);   // call after each stage completes
+  static void endLoop();                   // call last thing in loop()
+  static void reset();
+  static void printStats();                // LOOPSTAT output
+  static uint32_t getMaxLoopMicros();
+
+private:
+  LoopProfiler() = delete;
+
+  struct Stats {
+    uint32_t minUs;
+    uint32_t maxUs;
+    uint64_t sumUs;
+    uint32_t count;
+  };
+
+  static void record(Stats& s, uint32_t us);
+  static void printStats(const char* name, const Stats& s);
+
+  static const uint32_t SLOW_LOOP_US = 100000;  // 10% of the 1 s hardware watchdog
+
+  static Stats         loopStats;
+  static Stats         stageStats[STAGE_COUNT];
+  static uint32_t      slowLoops;
+  static uint32_t      loopStartUs;
+  static uint32_t      stageStartUs;
+  static unsigned long windowStartMs;
+};
+
+#endif
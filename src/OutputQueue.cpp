@@ -0,0 +1,57 @@
+#include "OutputQueue.h"
+
+LineGenerator           OutputQueue::queue[OutputQueue::QUEUE_SIZE];
+uint8_t                 OutputQueue::head      = 0;
+uint8_t                 OutputQueue::count     = 0;
+uint8_t                 OutputQueue::lineIndex = 0;
+OutputQueue::LineBuffer OutputQueue::line;
+
+size_t OutputQueue::LineBuffer::write(uint8_t c) {
+  if (len >= sizeof(buf)) return 0;  // truncate over-long lines
+  buf[len++] = (char)c;
+  return 1;
+}
+
+bool OutputQueue::enqueue(LineGenerator gen) {
+  // A report that is already waiting will show current values when it is
+  // emitted, so repeated requests (fast host polling) are coalesced.
+  for (uint8_t i = 0; i < count; i++) {
+    uint8_t slot = (head + i) % QUEUE_SIZE;
+    if (queue[slot] == gen && !(i == 0 && lineIndex > 0)) return true;
+  }
+  if (count >= QUEUE_SIZE) return false;
+  queue[(head + count) % QUEUE_SIZE] = gen;
+  count++;
+  return true;
+}
+
+bool OutputQueue::isLinePending() {
+  return line.pos < line.len;
+}
+
+void OutputQueue::service() {
+  uint32_t start = micros();
+
+  while (micros() - start < PASS_BUDGET_US) {
+    // 1) Flush whatever part of the current line the port can take right now
+    if (line.pos < line.len) {
+      int space = Serial.availableForWrite();
+      if (space <= 0) return;
+      uint8_t n = min((int)(line.len - line.pos), space);
+      Serial.write((const uint8_t*)line.buf + line.pos, n);
+      line.pos += n;
+      if (line.pos < line.len) return;  // TX buffer full, continue next pass
+    }
+
+    // 2) Format the next line of the report at the front of the queue
+    if (count == 0) return;
+    line.clear();
+    if (queue[head](line, lineIndex)) {
+      lineIndex++;
+    } else {
+      head = (head + 1) % QUEUE_SIZE;
+      count--;
+      lineIndex = 0;
+    }
+  }
+}
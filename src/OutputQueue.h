@@ -0,0 +1,42 @@
+#ifndef OUTPUT_QUEUE_H
+#define OUTPUT_QUEUE_H
+
+#include <Arduino.h>
+
+// A line generator writes line <index> of a multi-line report to <out> and
+// returns true, or returns false (writing nothing) once past the last line.
+typedef bool (*LineGenerator)(Print& out, uint8_t index);
+
+// Emits multi-line reports (STATUS, SHOW, HELP) incrementally across loop()
+// passes. Each pass formats at most a few lines into a small RAM buffer and
+// only hands the USB serial port as many bytes as it can take without
+// blocking, bounded by a per-pass time budget.
+class OutputQueue {
+public:
+  static bool enqueue(LineGenerator gen);  // false if queue full (duplicates coalesce)
+  static void service();                   // call once per loop()
+  static bool isLinePending();             // true while a line is partially sent
+
+private:
+  OutputQueue() = delete;
+
+  class LineBuffer : public Print {
+  public:
+    size_t write(uint8_t c) override;
+    void   clear() { len = 0; pos = 0; }
+    char    buf[128];
+    uint8_t len = 0;
+    uint8_t pos = 0;
+  };
+
+  static const uint8_t  QUEUE_SIZE     = 4;
+  static const uint32_t PASS_BUDGET_US = 500;  // max time spent per loop() pass
+
+  static LineGenerator queue[QUEUE_SIZE];
+  static uint8_t       head;
+  static uint8_t       count;
+  static uint8_t       lineIndex;
+  static LineBuffer    line;
+};
+
+#endif
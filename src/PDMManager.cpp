@@ -25,6 +25,8 @@ static const int    ADDR_GROUP_ARRAY       = ADDR_MODE_ARRAY +     4*sizeof(uint
 static const int    ADDR_CAN_SPEED         = ADDR_GROUP_ARRAY +    4*sizeof(uint8_t);
 static const int    ADDR_PDM_NODEID        = ADDR_CAN_SPEED   +    sizeof(uint8_t);
 static const int    ADDR_KP_KEYNODE        = ADDR_PDM_NODEID  +    sizeof(uint8_t);
+static const int    ADDR_TEL_RATE          = ADDR_KP_KEYNODE  +    sizeof(uint8_t);
+static const int    ADDR_TEL_MODE          = ADDR_TEL_RATE    +    sizeof(uint8_t);
 
 // -----------------------------------------------------------------------------
 // Defaults
@@ -43,6 +45,9 @@ static uint8_t       outputGroup[4]   = {1,2,3,4};
 static uint16_t      canSpeedKbps     = 1000;
 static uint8_t       pdmNodeID        = 0x15;
 static uint8_t       keypadNodeID     = 0x15;
+static uint8_t       telemetryRateHz  = 4;
+static TelemetryMode telemetryMode    = TELEMETRY_LEGACY;
+static const uint8_t maxTelemetryRateHz = 50;
 uint16_t PDMManager::digitalOutCobId = 0x680;
 
 // -----------------------------------------------------------------------------
@@ -79,6 +84,49 @@ static const float   maxTempChangePerSecond = 10.0f;  // 10°C/second max change
 static uint8_t       badTempReadingCount    = 0;
 static const uint8_t maxBadReadings         = 3;      // Require multiple bad readings before fault
 
+// -----------------------------------------------------------------------------
+// Fault event log: fault/warning transitions kept in a RAM ring and fetched by
+// the host with FAULTLOG <since_seq>. Uncomment to mirror the ring to EEPROM so
+// the history survives a power cycle (costs one EEPROM write per transition).
+// #define FAULTLOG_EEPROM_MIRROR
+
+enum FaultLogType : uint8_t {
+  FLOG_OVERCURRENT = 0,
+  FLOG_THERMAL,
+  FLOG_UNDERCURRENT,
+  FLOG_TEMPWARN
+};
+
+struct FaultLogEntry {
+  uint32_t seq;       // 1-based, increments per entry
+  uint32_t ms;        // millis() when the transition was seen
+  uint8_t  ch;        // channel 1-4, 0 for board-level events
+  uint8_t  type;      // FaultLogType
+  uint8_t  set;       // 1 = set, 0 = cleared
+  uint8_t  reserved;
+};
+
+static const uint8_t  FAULT_LOG_SIZE          = 32;
+static FaultLogEntry  faultLog[FAULT_LOG_SIZE];
+static uint32_t       faultLogNextSeq         = 1;
+static uint32_t       faultLogSince           = 0;      // cursor of the FAULTLOG report being emitted
+static bool           faultLogReportBusy      = false;  // a FAULTLOG report is queued or being emitted
+// Range of the report being emitted, fixed when its first line is generated
+static uint32_t       faultLogReportFirst     = 0;
+static uint32_t       faultLogReportCount     = 0;
+static uint32_t       faultLogReportNext      = 0;
+static uint32_t       faultLogReportDropped   = 0;
+static bool           loggedOvercurrent[4]    = {false,false,false,false};
+static bool           loggedThermal[4]        = {false,false,false,false};
+static bool           loggedUndercurrent[4]   = {false,false,false,false};
+static bool           loggedTempWarn          = false;
+
+// EEPROM mirror lives well clear of the configuration block
+static const int      ADDR_FAULTLOG_MAGIC     = 512;
+static const uint16_t FAULTLOG_MAGIC          = 0xFA17;
+static const int      ADDR_FAULTLOG_NEXTSEQ   = ADDR_FAULTLOG_MAGIC + sizeof(uint32_t);
+static const int      ADDR_FAULTLOG_ENTRIES   = ADDR_FAULTLOG_NEXTSEQ + sizeof(uint32_t);
+
 // -----------------------------------------------------------------------------
 // Digital switch input pins (replacing analog MUX)
 static const uint8_t extSwitchPins[4] = {0, 1, 2, 3};  // D0-D3 for external switches
@@ -109,7 +157,9 @@ static uint16_t crc16_update_buffer(uint16_t crc, const uint8_t* data, size_t le
   return crc;
 }
 
-static uint16_t calculateConfigCRC() {
+// CRC of the settings that existed before TELRATE/TELMODE; configs saved by
+// that firmware carry this CRC and 0xFF in the telemetry bytes
+static uint16_t calculateLegacyConfigCRC() {
   uint16_t crc = 0xFFFF;
   
   // Hash all configuration data in the same order it's saved
@@ -128,6 +178,63 @@ static uint16_t calculateConfigCRC() {
   return crc;
 }
 
+static uint16_t calculateConfigCRC() {
+  // Telemetry settings are hashed as the bytes saveConfig() stores
+  uint16_t crc = calculateLegacyConfigCRC();
+  crc = crc16_update(crc, telemetryRateHz);
+  crc = crc16_update(crc, (uint8_t)telemetryMode);
+  
+  return crc;
+}
+
+// Fault log helpers
+static void faultLogAppend(uint8_t ch, FaultLogType type, bool set) {
+  uint8_t slot = (faultLogNextSeq - 1) % FAULT_LOG_SIZE;
+  faultLog[slot] = FaultLogEntry{faultLogNextSeq, millis(), ch, (uint8_t)type, (uint8_t)set, 0};
+  faultLogNextSeq++;
+#ifdef FAULTLOG_EEPROM_MIRROR
+  EEPROM.put(ADDR_FAULTLOG_ENTRIES + slot*sizeof(FaultLogEntry), faultLog[slot]);
+  EEPROM.put(ADDR_FAULTLOG_NEXTSEQ, faultLogNextSeq);
+#endif
+}
+
+static void faultLogLoad() {
+#ifdef FAULTLOG_EEPROM_MIRROR
+  uint16_t m = 0; EEPROM.get(ADDR_FAULTLOG_MAGIC, m);
+  if (m == FAULTLOG_MAGIC) {
+    EEPROM.get(ADDR_FAULTLOG_NEXTSEQ, faultLogNextSeq);
+    for (uint8_t i = 0; i < FAULT_LOG_SIZE; i++) {
+      EEPROM.get(ADDR_FAULTLOG_ENTRIES + i*sizeof(FaultLogEntry), faultLog[i]);
+    }
+  } else {
+    EEPROM.put(ADDR_FAULTLOG_MAGIC, FAULTLOG_MAGIC);
+    EEPROM.put(ADDR_FAULTLOG_NEXTSEQ, faultLogNextSeq);
+  }
+#endif
+}
+
+// Compare fault/warning flags with what is already logged, append changes
+static void recordFaultTransitions(bool tempWarn) {
+  for (uint8_t i = 0; i < 4; i++) {
+    if (faultOvercurrent[i] != loggedOvercurrent[i]) {
+      loggedOvercurrent[i] = faultOvercurrent[i];
+      faultLogAppend(i + 1, FLOG_OVERCURRENT, faultOvercurrent[i]);
+    }
+    if (faultThermal[i] != loggedThermal[i]) {
+      loggedThermal[i] = faultThermal[i];
+      faultLogAppend(i + 1, FLOG_THERMAL, faultThermal[i]);
+    }
+    if (warningUndercurrent[i] != loggedUndercurrent[i]) {
+      loggedUndercurrent[i] = warningUndercurrent[i];
+      faultLogAppend(i + 1, FLOG_UNDERCURRENT, warningUndercurrent[i]);
+    }
+  }
+  if (tempWarn != loggedTempWarn) {
+    loggedTempWarn = tempWarn;
+    faultLogAppend(0, FLOG_TEMPWARN, tempWarn);
+  }
+}
+
 // Read digital switch inputs directly
 static uint8_t getExtSwitchMask() {
   uint8_t mask = 0;
@@ -203,6 +310,7 @@ static void applyPress(uint8_t ch, bool pressed) {
 
 void PDMManager::init() {
   loadConfig();
+  faultLogLoad();
   for (uint8_t i=0;i<4;i++){
     pinMode(switchPins[i], OUTPUT);
     digitalWrite(switchPins[i], LOW);
@@ -540,6 +648,8 @@ void PDMManager::update() {
       currentLEDStates[i] = LED_STATE_GREEN;
     }
   } // End of for loop
+
+  recordFaultTransitions(!sensorError && T >= tempWarnThreshold);
 }
 
 
@@ -653,6 +763,8 @@ void PDMManager::saveConfig() {
   EEPROM.put(ADDR_CAN_SPEED,  (uint8_t)canSpeedKbps);
   EEPROM.put(ADDR_PDM_NODEID, pdmNodeID);
   EEPROM.put(ADDR_KP_KEYNODE, keypadNodeID);
+  EEPROM.put(ADDR_TEL_RATE,   telemetryRateHz);
+  EEPROM.put(ADDR_TEL_MODE,   (uint8_t)telemetryMode);
   
   // Calculate and save CRC for data integrity verification
   uint16_t crc = calculateConfigCRC();
@@ -682,23 +794,29 @@ void PDMManager::loadConfig() {
       outputMode[i]  = (mm==MODE_MOMENTARY?MODE_MOMENTARY:MODE_LATCH);
       outputGroup[i] = gg;
     }
-    uint8_t sp,p,k;
+    uint8_t sp,p,k,tr,tm;
     EEPROM.get(ADDR_CAN_SPEED,  sp);
     EEPROM.get(ADDR_PDM_NODEID, p);
     EEPROM.get(ADDR_KP_KEYNODE, k);
+    EEPROM.get(ADDR_TEL_RATE,   tr);
+    EEPROM.get(ADDR_TEL_MODE,   tm);
     canSpeedKbps  = (sp==125||sp==250||sp==500||sp==1000)?sp:1000;
     pdmNodeID     = p;
     keypadNodeID  = k;
+    // Configs saved before these settings existed read back as 0xFF
+    bool legacyLayout = (tr==0xFF && tm==0xFF);
+    telemetryRateHz = (tr>=1&&tr<=maxTelemetryRateHz)?tr:4;
+    telemetryMode   = (tm<=TELEMETRY_BOTH)?(TelemetryMode)tm:TELEMETRY_LEGACY;
     
     // Verify CRC to ensure data integrity
     uint16_t storedCRC;
     EEPROM.get(ADDR_CRC, storedCRC);
-    uint16_t calculatedCRC = calculateConfigCRC();
+    uint16_t calculatedCRC = legacyLayout ? calculateLegacyConfigCRC() : calculateConfigCRC();
     
     if (storedCRC == calculatedCRC) {
       Serial.print(F("OK: Configuration loaded (CRC=0x"));
       Serial.print(storedCRC, HEX);
-      Serial.println(F(")"));
+      Serial.println(legacyLayout ? F(", older layout: TELRATE/TELMODE at defaults until SAVE)") : F(")"));
     } else {
       Serial.print(F("WARN: Config CRC mismatch! Stored=0x"));
       Serial.print(storedCRC, HEX);
@@ -779,6 +897,28 @@ void PDMManager::setKeypadNodeID(uint8_t id) {
 }
 uint8_t PDMManager::getKeypadNodeID() { return keypadNodeID; }
 
+void PDMManager::setTelemetryRate(int hz) {
+  if (hz>=1 && hz<=maxTelemetryRateHz) {
+    telemetryRateHz=(uint8_t)hz;
+    Serial.print(F("OK: Telemetry rate=")); Serial.print(hz); Serial.println(F(" Hz"));
+  } else {
+    Serial.println(F("ERR: invalid telemetry rate (1-50 Hz)"));
+  }
+}
+uint8_t PDMManager::getTelemetryRate() { return telemetryRateHz; }
+
+static const __FlashStringHelper* telemetryModeName(TelemetryMode m) {
+  if (m==TELEMETRY_EXTENDED) return F("EXTENDED");
+  if (m==TELEMETRY_BOTH)     return F("BOTH");
+  return F("LEGACY");
+}
+
+void PDMManager::setTelemetryMode(TelemetryMode m) {
+  telemetryMode=m;
+  Serial.print(F("OK: Telemetry mode=")); Serial.println(telemetryModeName(m));
+}
+TelemetryMode PDMManager::getTelemetryMode() { return telemetryMode; }
+
 float PDMManager::readBatteryVoltage() {
   int raw=analogRead(A5);  // Battery voltage sensing moved to A5 on new hardware
   float v = raw/float(analogResolution)*voltageReference;
@@ -803,23 +943,102 @@ float PDMManager::getLastTemperature()  { return lastTemperature; }
 bool  PDMManager::isTempSensorError()   { return lastSensorErr; }
 
 void PDMManager::printConfig() {
-  Serial.println(F("---- PDM Configuration ----"));
-  for (uint8_t i=0;i<4;i++){
-    Serial.print(F("CH"));Serial.print(i+1);
-    Serial.print(F(": OC="));Serial.print(ocThresholds[i],2); Serial.print(F("A"));
-    Serial.print(F(", INR="));Serial.print(inrushThresholds[i],2); Serial.print(F("A/"));
-    Serial.print(inrushTimeLimits[i]); Serial.print(F("ms"));
-    Serial.print(F(", UWR="));Serial.print(underWarnThresholds[i],2); Serial.print(F("A"));
-    Serial.print(F(", Mode=")); Serial.print(outputMode[i]==MODE_LATCH?F("L"):F("M"));
-    Serial.print(F(", Grp="));  Serial.println(outputGroup[i]);
+  for (uint8_t i = 0; printConfigLine(Serial, i); i++) {}
+}
+
+// One line of the configuration report per call, so the CLI can emit SHOW
+// incrementally through OutputQueue. Returns false past the last line.
+bool PDMManager::printConfigLine(Print& out, uint8_t index) {
+  if (index == 0) {
+    out.println(F("---- PDM Configuration ----"));
+  } else if (index <= 4) {
+    uint8_t i = index - 1;
+    out.print(F("CH"));out.print(i+1);
+    out.print(F(": OC="));out.print(ocThresholds[i],2); out.print(F("A"));
+    out.print(F(", INR="));out.print(inrushThresholds[i],2); out.print(F("A/"));
+    out.print(inrushTimeLimits[i]); out.print(F("ms"));
+    out.print(F(", UWR="));out.print(underWarnThresholds[i],2); out.print(F("A"));
+    out.print(F(", Mode=")); out.print(outputMode[i]==MODE_LATCH?F("L"):F("M"));
+    out.print(F(", Grp="));  out.println(outputGroup[i]);
+  } else {
+    switch (index) {
+      case 5:  out.print(F("TempWarn="));out.print(tempWarnThreshold,1);out.println(F(" C")); break;
+      case 6:  out.print(F("TempTrip="));out.print(tempTripThreshold,1);out.println(F(" C")); break;
+      case 7:  out.print(F("CAN Speed=")); out.print(canSpeedKbps); out.println(F(" kbps")); break;
+      case 8:  out.print(F("PDM NodeID=0x")); out.println(pdmNodeID,HEX); break;
+      case 9:  out.print(F("Keypad NodeID=0x")); out.println(keypadNodeID,HEX); break;
+      case 10: out.print(F("CAN Rx Address=0x")); out.println(digitalOutCobId,HEX); break;
+      case 11: out.print(F("Telemetry Rate=")); out.print(telemetryRateHz); out.println(F(" Hz")); break;
+      case 12: out.print(F("Telemetry Mode=")); out.println(telemetryModeName(telemetryMode)); break;
+      case 13: out.println(F("---------------------------")); break;
+      default: return false;
+    }
+  }
+  return true;
+}
+
+// -----------------------------------------------------------------------------
+// Fault event log report (FAULTLOG <since_seq>), one line per call:
+//   FLOG <seq> <millis> <ch> OC|THERMAL|UNDER|TEMPWARN SET|CLR
+//   FLOG END next=<next seq> now=<millis> dropped=<entries lost to wrap>
+// Only one report runs at a time: the range is fixed at its first line, and
+// commands handled between lines must not move it.
+bool PDMManager::beginFaultLogReport(uint32_t sinceSeq) {
+  if (faultLogReportBusy) return false;
+  faultLogReportBusy = true;
+  faultLogSince = sinceSeq;
+  return true;
+}
+
+void PDMManager::cancelFaultLogReport() {
+  faultLogReportBusy = false;
+}
+
+bool PDMManager::printFaultLogLine(Print& out, uint8_t index) {
+  static const char* const typeNames[] = {"OC", "THERMAL", "UNDER", "TEMPWARN"};
+  if (index == 0) {
+    uint32_t oldest = faultLogNextSeq > FAULT_LOG_SIZE ? faultLogNextSeq - FAULT_LOG_SIZE : 1;
+    faultLogReportFirst   = max(faultLogSince + 1, oldest);
+    faultLogReportCount   = faultLogNextSeq > faultLogReportFirst ? faultLogNextSeq - faultLogReportFirst : 0;
+    faultLogReportNext    = faultLogNextSeq;
+    faultLogReportDropped = faultLogSince + 1 < oldest ? oldest - faultLogSince - 1 : 0;
+  }
+  uint32_t count = faultLogReportCount;
+
+  if (index < count) {
+    uint32_t seq = faultLogReportFirst + index;
+    const FaultLogEntry& e = faultLog[(seq - 1) % FAULT_LOG_SIZE];
+    if (e.seq == 0) return true;  // cleared slot, nothing to print
+    if (e.seq != seq) {           // overwritten since the report started
+      faultLogReportDropped++;
+      return true;
+    }
+    out.print(F("FLOG ")); out.print(e.seq);
+    out.print(F(" "));     out.print(e.ms);
+    out.print(F(" "));     out.print(e.ch);
+    out.print(F(" "));     out.print(typeNames[e.type < 4 ? e.type : 0]);
+    out.println(e.set ? F(" SET") : F(" CLR"));
+    return true;
+  }
+  if (index == count) {
+    out.print(F("FLOG END next=")); out.print(faultLogReportNext);
+    out.print(F(" now="));          out.print(millis());
+    out.print(F(" dropped="));      out.println(faultLogReportDropped);
+    return true;
+  }
+  faultLogReportBusy = false;
+  return false;
+}
+
+void PDMManager::clearFaultLog() {
+  // Sequence numbers keep counting so host cursors stay valid
+  for (uint8_t i = 0; i < FAULT_LOG_SIZE; i++) {
+    faultLog[i] = FaultLogEntry{0, 0, 0, 0, 0, 0};
+#ifdef FAULTLOG_EEPROM_MIRROR
+    EEPROM.put(ADDR_FAULTLOG_ENTRIES + i*sizeof(FaultLogEntry), faultLog[i]);
+#endif
   }
-  Serial.print(F("TempWarn="));Serial.print(tempWarnThreshold,1);Serial.println(F(" C"));
-  Serial.print(F("TempTrip="));Serial.print(tempTripThreshold,1);Serial.println(F(" C"));
-  Serial.print(F("CAN Speed=")); Serial.print(canSpeedKbps); Serial.println(F(" kbps"));
-  Serial.print(F("PDM NodeID=0x")); Serial.println(pdmNodeID,HEX);
-  Serial.print(F("Keypad NodeID=0x")); Serial.println(keypadNodeID,HEX);
-  Serial.print(F("CAN Rx Address=0x")); Serial.println(digitalOutCobId,HEX);
-  Serial.println(F("---------------------------"));
+  Serial.println(F("OK: Fault log cleared"));
 }
 
 void PDMManager::setDigitalOutID(uint16_t id) {
@@ -17,6 +17,13 @@ enum OutputMode {
   MODE_MOMENTARY
 };
 
+// Which CAN telemetry frames are sent (see CANHandler::sendTelemetry)
+enum TelemetryMode {
+  TELEMETRY_LEGACY = 0,   // 0x380+node only
+  TELEMETRY_EXTENDED,     // multiplexed 0x480+node only
+  TELEMETRY_BOTH
+};
+
 class PDMManager {
 public:
   // Core
@@ -24,6 +31,7 @@ public:
   static void processExternalInputs();
   static void update();
   static void printConfig();
+  static bool printConfigLine(Print& out, uint8_t index);
   static void saveConfig();
   static void loadConfig();
 
@@ -65,6 +73,10 @@ public:
   static uint8_t getPDMNodeID();
   static void setKeypadNodeID(uint8_t id);
   static uint8_t getKeypadNodeID();
+  static void setTelemetryRate(int hz);  // Range-checked before narrowing
+  static uint8_t getTelemetryRate();
+  static void setTelemetryMode(TelemetryMode m);
+  static TelemetryMode getTelemetryMode();
 
   // Telemetry helpers
   static float readBatteryVoltage();
@@ -73,6 +85,12 @@ public:
   static bool  isOvercurrentFault(uint8_t ch);
   static bool  isThermalFault(uint8_t ch);
 
+  // Fault event log (FAULTLOG)
+  static bool beginFaultLogReport(uint32_t sinceSeq);  // false while a report is pending
+  static void cancelFaultLogReport();
+  static bool printFaultLogLine(Print& out, uint8_t index);
+  static void clearFaultLog();
+
   // For NeoPixel
   static float getLastTemperature();
   static bool  isTempSensorError();
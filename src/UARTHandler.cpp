@@ -2,298 +2,505 @@
 #include "PDMManager.h"
 #include "CANHandler.h"
 #include "Logger.h"
+#include "LoopProfiler.h"
+#include "OutputQueue.h"
+#include "EventReporter.h"
 #include <Arduino.h>
 
-void UARTHandler::process() {
-  if (!Serial.available()) return;
-  String line = Serial.readStringUntil('\n');
-  line.trim();
-  if (line.length()==0) return;
+char    UARTHandler::lineBuf[UARTHandler::LINE_BUF_SIZE];
+uint8_t UARTHandler::lineLen      = 0;
+bool    UARTHandler::lineOverflow = false;
 
-  // Echo the received command for debugging
-  Serial.print(F("Received: "));
-  Serial.println(line);
+// -----------------------------------------------------------------------------
+// Firmware identification. PDM_BUILD_ID is set on every PlatformIO build by
+// scripts/build_id.py (git describe plus a hash of the sources), or from
+// build_flags (-DPDM_BUILD_ID=\"...\"). Builds outside PlatformIO fall back
+// to the compile time of this file, which host tools do not trust on its own.
+// The marker stays in flash so host tools can read the build id straight out
+// of a .hex image and compare it with the VERSION reply before flashing.
+#define PDM_FW_VERSION "1.0"
+#ifndef PDM_BUILD_ID
+#define PDM_BUILD_ID __DATE__ " " __TIME__
+#endif
+static const char buildMarker[] = "PDM-BUILD:" PDM_BUILD_ID;
+static const uint8_t BUILD_MARKER_PREFIX_LEN = 10;
 
-  char buf[64];
-  line.toCharArray(buf, sizeof(buf));
-  char* tok = strtok(buf," ");
-  String cmd = tok ? String(tok) : "";
+// -----------------------------------------------------------------------------
+// Command handlers
+// Each handler receives the first two whitespace-separated arguments (empty
+// string when absent). Arguments point into the static line buffer, so no heap
+// String objects are created while parsing.
 
-  tok = strtok(NULL," ");
-  String a1 = tok ? String(tok) : "";
-  tok = strtok(NULL," ");
-  String a2 = tok ? String(tok) : "";
+typedef void (*CommandHandler)(const char* a1, const char* a2);
 
-  if (cmd=="OC") {
-    uint8_t ch=a1.toInt()-1;
-    PDMManager::setOvercurrentThreshold(ch, a2.toFloat());
-  }
-  else if (cmd=="INRUSH") {
-    uint8_t ch=a1.toInt()-1;
-    PDMManager::setInrushThreshold(ch, a2.toFloat());
-  }
-  else if (cmd=="INRUSHTIME") {
-    uint8_t ch=a1.toInt()-1;
-    PDMManager::setInrushTimeLimit(ch,a2.toInt());
-  }
-  else if (cmd=="UNDERWARN") {
-    uint8_t ch=a1.toInt()-1;
-    PDMManager::setUndercurrentWarning(ch, a2.toFloat());
-  }
-  else if (cmd=="TEMPWARN") {
-    PDMManager::setTempWarnThreshold(a1.toFloat());
-  }
-  else if (cmd=="TEMPTRIP") {
-    PDMManager::setTempTripThreshold(a1.toFloat());
-  }
-  else if (cmd=="MODE") {
-    uint8_t ch=a1.toInt()-1;
-    if (a2=="LATCH")      PDMManager::setOutputMode(ch,MODE_LATCH);
-    else if (a2=="MOMENTARY") PDMManager::setOutputMode(ch,MODE_MOMENTARY);
-    else Serial.println("ERR: MODE LATCH|MOMENTARY");
-  }
-  else if (cmd=="GROUP") {
-    uint8_t ch=a1.toInt()-1;
-    PDMManager::setOutputGroup(ch, a2.toInt());
-  }
-  else if (cmd=="CANSPEED") {
-    PDMManager::setCANSpeed(a1.toInt());
-  }
-  else if (cmd=="NODEID") {
-    if (a1=="PDM")     PDMManager::setPDMNodeID(strtol(a2.c_str(),NULL,0));
-    else if (a1=="KEYPAD") PDMManager::setKeypadNodeID(strtol(a2.c_str(),NULL,0));
-    else Serial.println("ERR: NODEID PDM|KEYPAD <hex|dec>");
-  }
+struct CommandEntry {
+  const char*    name;
+  CommandHandler handler;
+};
 
-  else if (cmd == "DIGOUT") {
-    // usage: DIGOUT <hex|dec>
-    if (a1.length()) {
-      uint16_t id = strtol(a1.c_str(), nullptr, 0);
-      PDMManager::setDigitalOutID(id);
-    } else {
-      Serial.println("ERR: DIGOUT <hex|dec>");
-    }
+static void cmdOvercurrent(const char* a1, const char* a2) {
+  uint8_t ch = atoi(a1) - 1;
+  PDMManager::setOvercurrentThreshold(ch, atof(a2));
+}
+
+static void cmdInrush(const char* a1, const char* a2) {
+  uint8_t ch = atoi(a1) - 1;
+  PDMManager::setInrushThreshold(ch, atof(a2));
+}
+
+static void cmdInrushTime(const char* a1, const char* a2) {
+  uint8_t ch = atoi(a1) - 1;
+  PDMManager::setInrushTimeLimit(ch, atol(a2));
+}
+
+static void cmdUnderWarn(const char* a1, const char* a2) {
+  uint8_t ch = atoi(a1) - 1;
+  PDMManager::setUndercurrentWarning(ch, atof(a2));
+}
+
+static void cmdTempWarn(const char* a1, const char*) {
+  PDMManager::setTempWarnThreshold(atof(a1));
+}
+
+static void cmdTempTrip(const char* a1, const char*) {
+  PDMManager::setTempTripThreshold(atof(a1));
+}
+
+static void cmdMode(const char* a1, const char* a2) {
+  uint8_t ch = atoi(a1) - 1;
+  if (strcmp(a2, "LATCH") == 0)          PDMManager::setOutputMode(ch, MODE_LATCH);
+  else if (strcmp(a2, "MOMENTARY") == 0) PDMManager::setOutputMode(ch, MODE_MOMENTARY);
+  else Serial.println(F("ERR: MODE LATCH|MOMENTARY"));
+}
+
+static void cmdGroup(const char* a1, const char* a2) {
+  uint8_t ch = atoi(a1) - 1;
+  PDMManager::setOutputGroup(ch, atoi(a2));
+}
+
+static void cmdCANSpeed(const char* a1, const char*) {
+  PDMManager::setCANSpeed(atoi(a1));
+}
+
+static void cmdNodeID(const char* a1, const char* a2) {
+  if (strcmp(a1, "PDM") == 0)         PDMManager::setPDMNodeID(strtol(a2, NULL, 0));
+  else if (strcmp(a1, "KEYPAD") == 0) PDMManager::setKeypadNodeID(strtol(a2, NULL, 0));
+  else Serial.println(F("ERR: NODEID PDM|KEYPAD <hex|dec>"));
+}
+
+static void cmdTelRate(const char* a1, const char*) {
+  // Kept as an int so 260 is rejected rather than wrapping to 4
+  PDMManager::setTelemetryRate(atoi(a1));
+}
+
+static void cmdTelMode(const char* a1, const char*) {
+  if (strcmp(a1, "LEGACY") == 0)        PDMManager::setTelemetryMode(TELEMETRY_LEGACY);
+  else if (strcmp(a1, "EXTENDED") == 0) PDMManager::setTelemetryMode(TELEMETRY_EXTENDED);
+  else if (strcmp(a1, "BOTH") == 0)     PDMManager::setTelemetryMode(TELEMETRY_BOTH);
+  else Serial.println(F("ERR: TELMODE LEGACY|EXTENDED|BOTH"));
+}
+
+static void cmdDigOut(const char* a1, const char*) {
+  // usage: DIGOUT <hex|dec>
+  if (a1[0]) {
+    uint16_t id = strtol(a1, nullptr, 0);
+    PDMManager::setDigitalOutID(id);
+  } else {
+    Serial.println(F("ERR: DIGOUT <hex|dec>"));
   }
+}
 
-  else if (cmd == "LOG") {
-    // usage: LOG <level>
-    if (a1.length()) {
-      int level = a1.toInt();
-      if (level >= 0 && level <= 2) {
-        Logger::setLevel((LogLevel)level);
-      } else {
-        Serial.println("ERR: LOG 0|1|2 (0=Normal, 1=StateChanges, 2=+CAN)");
-      }
+static void cmdLog(const char* a1, const char*) {
+  // usage: LOG <level>
+  if (a1[0]) {
+    int level = atoi(a1);
+    if (level >= 0 && level <= 2) {
+      Logger::setLevel((LogLevel)level);
     } else {
-      Serial.print("Current log level: ");
-      Serial.println((int)Logger::getLevel());
+      Serial.println(F("ERR: LOG 0|1|2 (0=Normal, 1=StateChanges, 2=+CAN)"));
     }
+  } else {
+    Serial.print(F("Current log level: "));
+    Serial.println((int)Logger::getLevel());
   }
+}
 
-  else if (cmd == "TEMPRAW") {
-    // Show raw temperature sensor data for LM335 with 2kΩ pull-up
-    int rawT = analogRead(A4);
-    float vT = rawT / 1023.0f * 5.0f;     // Voltage at A4
-    
-    // LM335 with 2kΩ pull-up voltage divider calculation
-    float resistance_lm335 = (2000.0f * vT) / (5.0f - vT);
-    float kelvin = resistance_lm335 / 10.0f;  // LM335: R ≈ 10Ω per Kelvin
-    float celsius = kelvin - 273.15f;
-    
-    Serial.print("LM335 + 2kΩ pullup - Raw: ");
-    Serial.print(rawT);
-    Serial.print("/1023, Voltage: ");
-    Serial.print(vT, 3);
-    Serial.println("V");
-    
-    Serial.print("LM335 Resistance: ");
-    Serial.print(resistance_lm335, 0);
-    Serial.print("Ω, Temperature: ");
-    Serial.print(celsius, 1);
-    Serial.println("°C");
-    
-    // Expected at 25°C: R=2980Ω, V=2.99V, Raw=611
-    Serial.println("Expected 25°C: R=2980Ω, V=2.99V, Raw=611");
+static void cmdEvents(const char* a1, const char*) {
+  // usage: EVENTS ON|OFF
+  if (strcmp(a1, "ON") == 0)       EventReporter::setEnabled(true);
+  else if (strcmp(a1, "OFF") == 0) EventReporter::setEnabled(false);
+  else if (a1[0] == '\0') {
+    Serial.print(F("Events: "));
+    Serial.print(EventReporter::isEnabled() ? F("ON") : F("OFF"));
+    Serial.print(F(" seq="));
+    Serial.println(EventReporter::getNextSeq());
   }
+  else Serial.println(F("ERR: EVENTS ON|OFF"));
+}
 
-  else if (cmd == "TEMPDETAIL") {
-    // Show detailed temperature sensor debug information
-    Serial.println(F("=== Temperature Sensor Detail ==="));
-    
-    // Read raw values
-    int rawT = analogRead(A4);
-    float vT = rawT / 1023.0f * 5.0f;
-    float resistance = (2000.0f * vT) / (5.0f - vT);
-    float kelvin = resistance / 10.0f;
-    float rawTemp = kelvin - 273.15f;
-    
-    Serial.print(F("Raw ADC: ")); Serial.print(rawT); Serial.print(F("/1023"));
-    Serial.print(F(", Voltage: ")); Serial.print(vT, 3); Serial.println(F("V"));
-    Serial.print(F("LM335 Resistance: ")); Serial.print(resistance, 1); Serial.println(F(" ohms"));
-    Serial.print(F("Raw Temperature: ")); Serial.print(rawTemp, 2); Serial.println(F("°C"));
-    Serial.print(F("Filtered Temperature: ")); Serial.print(PDMManager::getLastTemperature(), 2); Serial.println(F("°C"));
-    Serial.print(F("Sensor Error: ")); Serial.println(PDMManager::isTempSensorError() ? "YES" : "NO");
-    Serial.print(F("Battery Voltage: ")); Serial.print(PDMManager::readBatteryVoltage(), 2); Serial.println(F("V"));
-    Serial.println(F("==============================="));
-  }
+static void cmdTempRaw(const char*, const char*) {
+  // Show raw temperature sensor data for LM335 with 2kΩ pull-up
+  int rawT = analogRead(A4);
+  float vT = rawT / 1023.0f * 5.0f;     // Voltage at A4
+  
+  // LM335 with 2kΩ pull-up voltage divider calculation
+  float resistance_lm335 = (2000.0f * vT) / (5.0f - vT);
+  float kelvin = resistance_lm335 / 10.0f;  // LM335: R ≈ 10Ω per Kelvin
+  float celsius = kelvin - 273.15f;
+  
+  Serial.print("LM335 + 2kΩ pullup - Raw: ");
+  Serial.print(rawT);
+  Serial.print("/1023, Voltage: ");
+  Serial.print(vT, 3);
+  Serial.println("V");
+  
+  Serial.print("LM335 Resistance: ");
+  Serial.print(resistance_lm335, 0);
+  Serial.print("Ω, Temperature: ");
+  Serial.print(celsius, 1);
+  Serial.println("°C");
+  
+  // Expected at 25°C: R=2980Ω, V=2.99V, Raw=611
+  Serial.println("Expected 25°C: R=2980Ω, V=2.99V, Raw=611");
+}
 
-  else if (cmd == "ANALOGRAW") {
-    // Show all analog readings for debugging
-    Serial.println("Raw Analog Readings:");
-    for (int i = 0; i <= 5; i++) {
-      int raw = analogRead(A0 + i);
-      float voltage = raw / 1023.0f * 5.0f;
-      Serial.print("A"); Serial.print(i); 
-      Serial.print(": "); Serial.print(raw);
-      Serial.print(" ("); Serial.print(voltage, 3); Serial.println("V)");
-    }
-  }
+static void cmdTempDetail(const char*, const char*) {
+  // Show detailed temperature sensor debug information
+  Serial.println(F("=== Temperature Sensor Detail ==="));
+  
+  // Read raw values
+  int rawT = analogRead(A4);
+  float vT = rawT / 1023.0f * 5.0f;
+  float resistance = (2000.0f * vT) / (5.0f - vT);
+  float kelvin = resistance / 10.0f;
+  float rawTemp = kelvin - 273.15f;
+  
+  Serial.print(F("Raw ADC: ")); Serial.print(rawT); Serial.print(F("/1023"));
+  Serial.print(F(", Voltage: ")); Serial.print(vT, 3); Serial.println(F("V"));
+  Serial.print(F("LM335 Resistance: ")); Serial.print(resistance, 1); Serial.println(F(" ohms"));
+  Serial.print(F("Raw Temperature: ")); Serial.print(rawTemp, 2); Serial.println(F("°C"));
+  Serial.print(F("Filtered Temperature: ")); Serial.print(PDMManager::getLastTemperature(), 2); Serial.println(F("°C"));
+  Serial.print(F("Sensor Error: ")); Serial.println(PDMManager::isTempSensorError() ? "YES" : "NO");
+  Serial.print(F("Battery Voltage: ")); Serial.print(PDMManager::readBatteryVoltage(), 2); Serial.println(F("V"));
+  Serial.println(F("==============================="));
+}
 
-  else if (cmd=="SHOW"||cmd=="PRINT") {
-    PDMManager::printConfig();
-  }
-  else if (cmd=="SAVE") {
-    PDMManager::saveConfig();
-  }
-  else if (cmd=="LOAD") {
-    PDMManager::loadConfig();
+static void cmdAnalogRaw(const char*, const char*) {
+  // Show all analog readings for debugging
+  Serial.println("Raw Analog Readings:");
+  for (int i = 0; i <= 5; i++) {
+    int raw = analogRead(A0 + i);
+    float voltage = raw / 1023.0f * 5.0f;
+    Serial.print("A"); Serial.print(i); 
+    Serial.print(": "); Serial.print(raw);
+    Serial.print(" ("); Serial.print(voltage, 3); Serial.println("V)");
   }
-  else if (cmd=="STATUS") {
-    Serial.println(F("===== PDM SYSTEM STATUS ====="));
-    
-    // System Information
-    Serial.print(F("System Uptime: "));
-    Serial.print(millis() / 1000);
-    Serial.println(F(" seconds"));
-    
-    // Last Input Mode
-    Serial.print(F("Last Input Mode: "));
-    InputMode mode = CANHandler::getLastInputMode();
-    switch (mode) {
-      case INPUT_MODE_NONE:        Serial.println(F("NONE")); break;
-      case INPUT_MODE_DIGITAL:     Serial.println(F("DIGITAL BUTTONS")); break;
-      case INPUT_MODE_CAN_KEYPAD:  Serial.println(F("CAN KEYPAD")); break;
-      case INPUT_MODE_CAN_DIGOUT:  Serial.println(F("CAN DIGITAL OUTPUT")); break;
-      default:                     Serial.println(F("UNKNOWN")); break;
-    }
-    
-    // CAN Status
-    Serial.print(F("CAN Status: "));
-    if (CANHandler::isCANOK()) {
-      Serial.println(F("OK"));
-    } else {
-      Serial.println(F("TIMEOUT/ERROR"));
-    }
-    
-    // Battery Voltage
-    Serial.print(F("Battery Voltage: "));
-    Serial.print(PDMManager::readBatteryVoltage(), 2);
-    Serial.println(F(" V"));
-    
-    // Temperature
-    Serial.print(F("Board Temperature: "));
-    if (PDMManager::isTempSensorError()) {
-      Serial.println(F("SENSOR ERROR"));
-    } else {
-      Serial.print(PDMManager::getLastTemperature(), 1);
-      Serial.println(F(" °C"));
-    }
-    
-    Serial.println(F(""));
-    Serial.println(F("Channel Status:"));
-    Serial.println(F("CH | ON/OFF | Current | Mode | Group | LED State | Warnings/Faults"));
-    Serial.println(F("---|--------|---------|------|-------|-----------|------------------"));
-    
-    LEDState ledStates[4];
-    PDMManager::getLEDStates(ledStates);
-    
-    for (uint8_t ch = 0; ch < 4; ch++) {
-      Serial.print(ch + 1);
-      Serial.print(F("  | "));
-      
-      // Channel ON/OFF status
-      if (PDMManager::isChannelActive(ch)) {
-        Serial.print(F("  ON   | "));
+}
+
+static void cmdLoopStat(const char* a1, const char*) {
+  // usage: LOOPSTAT [RESET]
+  LoopProfiler::printStats();
+  if (strcmp(a1, "RESET") == 0) LoopProfiler::reset();
+}
+
+static void cmdVersion(const char*, const char*) {
+  Serial.print(F("VERSION "));
+  Serial.print(F(PDM_FW_VERSION));
+  Serial.print(F(" build="));
+  Serial.println(buildMarker + BUILD_MARKER_PREFIX_LEN);
+}
+
+// -----------------------------------------------------------------------------
+// Multi-line reports, emitted one line at a time through OutputQueue
+
+static bool statusLine(Print& out, uint8_t index) {
+  switch (index) {
+    case 0:
+      out.println(F("===== PDM SYSTEM STATUS ====="));
+      return true;
+
+    case 1:  // System Information
+      out.print(F("System Uptime: "));
+      out.print(millis() / 1000);
+      out.println(F(" seconds"));
+      return true;
+
+    case 2:  // Last Input Mode
+      out.print(F("Last Input Mode: "));
+      switch (CANHandler::getLastInputMode()) {
+        case INPUT_MODE_NONE:        out.println(F("NONE")); break;
+        case INPUT_MODE_DIGITAL:     out.println(F("DIGITAL BUTTONS")); break;
+        case INPUT_MODE_CAN_KEYPAD:  out.println(F("CAN KEYPAD")); break;
+        case INPUT_MODE_CAN_DIGOUT:  out.println(F("CAN DIGITAL OUTPUT")); break;
+        default:                     out.println(F("UNKNOWN")); break;
+      }
+      return true;
+
+    case 3:  // CAN Status
+      out.print(F("CAN Status: "));
+      out.println(CANHandler::isCANOK() ? F("OK") : F("TIMEOUT/ERROR"));
+      return true;
+
+    case 4:  // Battery Voltage
+      out.print(F("Battery Voltage: "));
+      out.print(PDMManager::readBatteryVoltage(), 2);
+      out.println(F(" V"));
+      return true;
+
+    case 5:  // Temperature
+      out.print(F("Board Temperature: "));
+      if (PDMManager::isTempSensorError()) {
+        out.println(F("SENSOR ERROR"));
       } else {
-        Serial.print(F("  OFF  | "));
+        out.print(PDMManager::getLastTemperature(), 1);
+        out.println(F(" °C"));
       }
-      
+      return true;
+
+    case 6:  out.println(F("")); return true;
+    case 7:  out.println(F("Channel Status:")); return true;
+    case 8:  out.println(F("CH | ON/OFF | Current | Mode | Group | LED State | Warnings/Faults")); return true;
+    case 9:  out.println(F("---|--------|---------|------|-------|-----------|------------------")); return true;
+
+    case 10: case 11: case 12: case 13: {
+      uint8_t ch = index - 10;
+      LEDState ledStates[4];
+      PDMManager::getLEDStates(ledStates);
+
+      out.print(ch + 1);
+      out.print(F("  | "));
+
+      // Channel ON/OFF status
+      out.print(PDMManager::isChannelActive(ch) ? F("  ON   | ") : F("  OFF  | "));
+
       // Current reading
-      Serial.print(PDMManager::getChannelCurrent(ch), 2);
-      Serial.print(F(" A | "));
-      
+      out.print(PDMManager::getChannelCurrent(ch), 2);
+      out.print(F(" A | "));
+
       // Mode
-      if (PDMManager::getOutputMode(ch) == MODE_LATCH) {
-        Serial.print(F(" L  | "));
-      } else {
-        Serial.print(F(" M  | "));
-      }
-      
+      out.print(PDMManager::getOutputMode(ch) == MODE_LATCH ? F(" L  | ") : F(" M  | "));
+
       // Group
-      Serial.print(F("  "));
-      Serial.print(PDMManager::getOutputGroup(ch));
-      Serial.print(F("   | "));
-      
+      out.print(F("  "));
+      out.print(PDMManager::getOutputGroup(ch));
+      out.print(F("   | "));
+
       // LED State
       switch (ledStates[ch]) {
-        case LED_STATE_OFF:       Serial.print(F("   OFF   | ")); break;
-        case LED_STATE_GREEN:     Serial.print(F("  GREEN  | ")); break;
-        case LED_STATE_BLUE:      Serial.print(F("  BLUE   | ")); break;
-        case LED_STATE_AMBER:     Serial.print(F("  AMBER  | ")); break;
-        case LED_STATE_RED:       Serial.print(F("   RED   | ")); break;
-        case LED_STATE_RED_FLASH: Serial.print(F("RED FLASH| ")); break;
-        default:                  Serial.print(F(" UNKNOWN | ")); break;
+        case LED_STATE_OFF:       out.print(F("   OFF   | ")); break;
+        case LED_STATE_GREEN:     out.print(F("  GREEN  | ")); break;
+        case LED_STATE_BLUE:      out.print(F("  BLUE   | ")); break;
+        case LED_STATE_AMBER:     out.print(F("  AMBER  | ")); break;
+        case LED_STATE_RED:       out.print(F("   RED   | ")); break;
+        case LED_STATE_RED_FLASH: out.print(F("RED FLASH| ")); break;
+        default:                  out.print(F(" UNKNOWN | ")); break;
       }
-      
+
       // Fault status
       bool hasFaults = false;
       if (PDMManager::isOvercurrentFault(ch)) {
-        Serial.print(F("OVERCURRENT "));
+        out.print(F("OVERCURRENT "));
         hasFaults = true;
       }
       if (PDMManager::isThermalFault(ch)) {
-        Serial.print(F("THERMAL "));
+        out.print(F("THERMAL "));
         hasFaults = true;
       }
       if (PDMManager::isUndercurrentWarning(ch)) {
-        Serial.print(F("UNDERCURRENT "));
+        out.print(F("UNDERCURRENT "));
         hasFaults = true;
       }
       if (!hasFaults) {
-        Serial.print(F("OK"));
+        out.print(F("OK"));
       }
-      Serial.println();
+      out.println();
+      return true;
     }
-    
-    Serial.println(F("=============================="));
+
+    case 14:
+      out.println(F("=============================="));
+      return true;
+
+    default:
+      return false;
   }
-  else if (cmd=="HELP" || cmd=="?") {
-    Serial.println(F("===== PDM CLI Commands ====="));
-    Serial.println(F("OC <ch> <amps>          - Set overcurrent threshold"));
-    Serial.println(F("INRUSH <ch> <amps>      - Set inrush threshold"));
-    Serial.println(F("INRUSHTIME <ch> <ms>    - Set inrush time limit"));
-    Serial.println(F("UNDERWARN <ch> <amps>   - Set undercurrent warning"));
-    Serial.println(F("TEMPWARN <temp>         - Set temperature warning"));
-    Serial.println(F("TEMPTRIP <temp>         - Set temperature trip"));
-    Serial.println(F("MODE <ch> LATCH|MOMENTARY - Set channel mode"));
-    Serial.println(F("GROUP <ch> <group>      - Set channel group"));
-    Serial.println(F("CANSPEED <kbps>         - Set CAN speed"));
-    Serial.println(F("NODEID PDM|KEYPAD <id>  - Set node IDs"));
-    Serial.println(F("DIGOUT <id>             - Set digital output CAN ID"));
-    Serial.println(F("LOG <level>             - Set logging level (0=Normal, 1=State, 2=+CAN)"));
-    Serial.println(F("TEMPRAW                 - Show raw temperature sensor data"));
-    Serial.println(F("TEMPDETAIL              - Show detailed temperature sensor debug info"));
-    Serial.println(F("ANALOGRAW               - Show all analog pin readings"));
-    Serial.println(F("SHOW/PRINT              - Display configuration"));
-    Serial.println(F("STATUS                  - Display system status"));
-    Serial.println(F("SAVE                    - Save config to EEPROM"));
-    Serial.println(F("LOAD                    - Load config from EEPROM"));
-    Serial.println(F("HELP/?                  - Show this help"));
-    Serial.println(F("============================"));
+}
+
+static const char* const helpLines[] = {
+  "===== PDM CLI Commands =====",
+  "OC <ch> <amps>          - Set overcurrent threshold",
+  "INRUSH <ch> <amps>      - Set inrush threshold",
+  "INRUSHTIME <ch> <ms>    - Set inrush time limit",
+  "UNDERWARN <ch> <amps>   - Set undercurrent warning",
+  "TEMPWARN <temp>         - Set temperature warning",
+  "TEMPTRIP <temp>         - Set temperature trip",
+  "MODE <ch> LATCH|MOMENTARY - Set channel mode",
+  "GROUP <ch> <group>      - Set channel group",
+  "CANSPEED <kbps>         - Set CAN speed",
+  "NODEID PDM|KEYPAD <id>  - Set node IDs",
+  "DIGOUT <id>             - Set digital output CAN ID",
+  "TELRATE <hz>            - Set CAN telemetry rate (1-50 Hz)",
+  "TELMODE LEGACY|EXTENDED|BOTH - Set CAN telemetry frames",
+  "LOG <level>             - Set logging level (0=Normal, 1=State, 2=+CAN)",
+  "EVENTS ON|OFF           - Push EVT lines on state changes",
+  "TEMPRAW                 - Show raw temperature sensor data",
+  "TEMPDETAIL              - Show detailed temperature sensor debug info",
+  "ANALOGRAW               - Show all analog pin readings",
+  "LOOPSTAT [RESET]        - Show loop timing (us), optionally reset",
+  "SHOW/PRINT              - Display configuration",
+  "STATUS                  - Display system status",
+  "FAULTLOG [seq|CLEAR]    - Fault events after <seq>, or clear log",
+  "VERSION                 - Show firmware version and build id",
+  "SAVE                    - Save config to EEPROM",
+  "LOAD                    - Load config from EEPROM",
+  "HELP/?                  - Show this help",
+  "============================",
+};
+
+static bool helpLine(Print& out, uint8_t index) {
+  if (index >= sizeof(helpLines) / sizeof(helpLines[0])) return false;
+  out.println(helpLines[index]);
+  return true;
+}
+
+static void queueReport(LineGenerator gen) {
+  if (!OutputQueue::enqueue(gen)) {
+    Serial.println(F("ERR: Output busy, retry"));
   }
-  else {
-    Serial.print(F("ERR: Unknown command '"));
-    Serial.print(cmd);
-    Serial.println(F("' - Type HELP for commands"));
+}
+
+static void cmdShow(const char*, const char*) {
+  queueReport(PDMManager::printConfigLine);
+}
+
+static void cmdSave(const char*, const char*) {
+  PDMManager::saveConfig();
+}
+
+static void cmdLoad(const char*, const char*) {
+  PDMManager::loadConfig();
+}
+
+static void cmdFaultLog(const char* a1, const char*) {
+  // usage: FAULTLOG [<since_seq>|CLEAR]
+  if (strcmp(a1, "CLEAR") == 0) {
+    PDMManager::clearFaultLog();
+    return;
+  }
+  if (!PDMManager::beginFaultLogReport(strtoul(a1, NULL, 0))) {
+    Serial.println(F("ERR: FAULTLOG busy, retry"));
+    return;
+  }
+  if (!OutputQueue::enqueue(PDMManager::printFaultLogLine)) {
+    PDMManager::cancelFaultLogReport();
+    Serial.println(F("ERR: Output busy, retry"));
   }
 }
+
+static void cmdStatus(const char*, const char*) {
+  queueReport(statusLine);
+}
+
+static void cmdHelp(const char*, const char*) {
+  queueReport(helpLine);
+}
+
+// Dispatch table - matched against the first token of each line (case-sensitive)
+static const CommandEntry commandTable[] = {
+  { "OC",         cmdOvercurrent },
+  { "INRUSH",     cmdInrush      },
+  { "INRUSHTIME", cmdInrushTime  },
+  { "UNDERWARN",  cmdUnderWarn   },
+  { "TEMPWARN",   cmdTempWarn    },
+  { "TEMPTRIP",   cmdTempTrip    },
+  { "MODE",       cmdMode        },
+  { "GROUP",      cmdGroup       },
+  { "CANSPEED",   cmdCANSpeed    },
+  { "NODEID",     cmdNodeID      },
+  { "DIGOUT",     cmdDigOut      },
+  { "TELRATE",    cmdTelRate     },
+  { "TELMODE",    cmdTelMode     },
+  { "LOG",        cmdLog         },
+  { "EVENTS",     cmdEvents      },
+  { "TEMPRAW",    cmdTempRaw     },
+  { "TEMPDETAIL", cmdTempDetail  },
+  { "ANALOGRAW",  cmdAnalogRaw   },
+  { "LOOPSTAT",   cmdLoopStat    },
+  { "SHOW",       cmdShow        },
+  { "PRINT",      cmdShow        },
+  { "SAVE",       cmdSave        },
+  { "LOAD",       cmdLoad        },
+  { "STATUS",     cmdStatus      },
+  { "FAULTLOG",   cmdFaultLog    },
+  { "VERSION",    cmdVersion     },
+  { "HELP",       cmdHelp        },
+  { "?",          cmdHelp        },
+};
+static const uint8_t COMMAND_COUNT = sizeof(commandTable) / sizeof(commandTable[0]);
+
+// -----------------------------------------------------------------------------
+// Non-blocking line accumulator: consumes whatever bytes are already buffered
+// (bounded per pass) and dispatches once a full line has arrived. Never waits
+// on the serial port, so loop() keeps running while a command trickles in.
+void UARTHandler::process() {
+  // Drain pending report output first. While a line is only partly sent, leave
+  // new input in the RX buffer so command replies never split a report line.
+  OutputQueue::service();
+  if (OutputQueue::isLinePending()) return;
+
+  uint8_t budget = RX_BYTES_PER_PASS;
+  while (budget-- && Serial.available()) {
+    char c = (char)Serial.read();
+
+    if (c == '\n' || c == '\r') {
+      if (lineOverflow) {
+        Serial.println(F("ERR: Command too long"));
+        lineOverflow = false;
+        lineLen = 0;
+      } else if (lineLen > 0) {
+        lineBuf[lineLen] = '\0';
+        lineLen = 0;
+        dispatch(lineBuf);
+        return;  // one command per pass keeps loop() latency bounded
+      }
+      continue;
+    }
+
+    if (lineOverflow) continue;                     // drop rest of oversized line
+    if (lineLen == 0 && (c == ' ' || c == '\t')) continue;  // skip leading whitespace
+    if (lineLen < LINE_BUF_SIZE - 1) {
+      lineBuf[lineLen++] = c;
+    } else {
+      lineOverflow = true;
+    }
+  }
+}
+
+void UARTHandler::dispatch(char* line) {
+  // trim trailing whitespace
+  size_t len = strlen(line);
+  while (len > 0 && (line[len-1] == ' ' || line[len-1] == '\t')) line[--len] = '\0';
+  if (len == 0) return;
+
+  // Echo the received command for debugging
+  Serial.print(F("Received: "));
+  Serial.println(line);
+
+  char* tok = strtok(line, " ");
+  const char* cmd = tok ? tok : "";
+  tok = strtok(NULL, " ");
+  const char* a1 = tok ? tok : "";
+  tok = strtok(NULL, " ");
+  const char* a2 = tok ? tok : "";
+
+  for (uint8_t i = 0; i < COMMAND_COUNT; i++) {
+    if (strcmp(cmd, commandTable[i].name) == 0) {
+      commandTable[i].handler(a1, a2);
+      return;
+    }
+  }
+
+  Serial.print(F("ERR: Unknown command '"));
+  Serial.print(cmd);
+  Serial.println(F("' - Type HELP for commands"));
+}
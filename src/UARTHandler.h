@@ -1,11 +1,20 @@
 #ifndef UART_HANDLER_H
 #define UART_HANDLER_H
 
+#include <Arduino.h>
+
 class UARTHandler {
 public:
   static void process();
 private:
   UARTHandler() = delete;
+  static void dispatch(char* line);
+
+  static const uint8_t LINE_BUF_SIZE      = 64;  // max command length incl. terminator
+  static const uint8_t RX_BYTES_PER_PASS  = 64;  // cap on bytes consumed per loop() pass
+  static char    lineBuf[LINE_BUF_SIZE];
+  static uint8_t lineLen;
+  static bool    lineOverflow;
 };
 
 #endif
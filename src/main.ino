@@ -5,6 +5,8 @@
 #include "CANHandler.h"
 #include "UARTHandler.h"
 #include "Logger.h"
+#include "LoopProfiler.h"
+#include "EventReporter.h"
 
 static unsigned long lastCANLedMs = 0;
 static const unsigned long CAN_LED_PERIOD = 100;  // 10 Hz (was 67ms ≈15Hz)
@@ -91,7 +93,7 @@ if (millis() - lastNeo >= 100) {
 
 void setup() {
   Serial.begin(115200);
-  Serial.setTimeout(100);  // 100ms timeout for parseInt/parseFloat to prevent blocking
+  Serial.setTimeout(100);  // 100ms timeout for any Stream parse helpers (CLI input itself is non-blocking)
   
   // Wait for Serial connection with timeout for standalone operation
   unsigned long serialTimeout = millis() + 2000; // 2 second timeout
@@ -113,6 +115,8 @@ void setup() {
   strip2.begin();
   strip2.show();
   
+  LoopProfiler::reset();
+
   // Initialize hardware watchdog timer (1 second timeout)
   WDT.begin(1000000); // 1000000 microseconds = 1 second
   Serial.println(F("Hardware Watchdog Timer enabled (1s timeout)"));
@@ -121,13 +125,20 @@ void setup() {
 }
 
 void loop() {
+  LoopProfiler::beginLoop();
   UARTHandler::process();  // Enable UART command processing
+  LoopProfiler::endStage(STAGE_UART);
   PDMManager::processExternalInputs();
+  LoopProfiler::endStage(STAGE_INPUTS);
   CANHandler::process();
+  LoopProfiler::endStage(STAGE_CAN);
   PDMManager::update();
+  LoopProfiler::endStage(STAGE_UPDATE);
   updateNeoPixels();
+  LoopProfiler::endStage(STAGE_NEOPIXEL);
   CANHandler::sendTelemetry();
   CANHandler::checkWatchdog();
+  EventReporter::process();
   
   // Pet the watchdog - system is running normally
   WDT.refresh();
@@ -155,4 +166,6 @@ if (now - lastCANLedMs >= CAN_LED_PERIOD) {
     CANHandler::sendKeypadLEDBlinkStatus(keypadStates);
   }
 }
+  LoopProfiler::endStage(STAGE_TELEMETRY);
+  LoopProfiler::endLoop();
 }